@@ -5,29 +5,84 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 
 from config import config
+from app.replicas import RoutingSession
 
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 
 
-def create_app(config_name="development"):
+def create_app(config_name="development", **config_overrides):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.config.update(config_overrides)
 
+    from app.metrics import metrics
+
+    metrics.set_engine_options(app)
     db.init_app(app)
     migrate.init_app(app, db)
 
+    from app.replicas import read_replicas
+
+    read_replicas.init_app(app)
+
+    from app.cache import table_versions, response_cache, token_cache
+
+    table_versions.configure(app.config.get("TABLE_VERSIONS_PATH"))
+    if app.config.get("RESPONSE_CACHE_PATH") and not table_versions.shared:
+        raise RuntimeError(
+            "RESPONSE_CACHE_PATH needs TABLE_VERSIONS_PATH, otherwise writes made "
+            "by one worker never invalidate the entries shared with the others."
+        )
+    response_cache.configure(
+        app.config.get("RESPONSE_CACHE_MAX_BYTES", 0),
+        app.config.get("RESPONSE_CACHE_PATH"),
+        app.config.get("RESPONSE_CACHE_SHARED_MAX_BYTES", 0),
+        None if table_versions.shared else app.config.get("RESPONSE_CACHE_TTL"),
+    )
+    token_cache.configure(app.config.get("TOKEN_CACHE_SIZE", 0))
+
+    from app.passwords import password_hasher
+
+    password_hasher.configure(
+        app.config.get("PASSWORD_HASH_WORKERS", 0),
+        app.config.get("PASSWORD_HASH_QUEUE_SIZE", 0),
+        app.config.get("PASSWORD_HASH_METHOD", "scrypt"),
+        app.config.get("PASSWORD_SALT_LENGTH", 16),
+    )
+
+    from app.instrumentation import instrumentation
+
+    instrumentation.init_app(app)
+
+    from app.queries import repeated_query_detector, access_pattern_log
+
+    repeated_query_detector.init_app(app)
+    access_pattern_log.configure(app.config.get("ACCESS_PATTERN_LOG"))
+    metrics.init_app(app)
+
+    from app.autocomplete import autocomplete
+
+    autocomplete.init_app(app)
+
     from app.commands import db_manage_bp
     from app.errors import errors_bp
     from app.artists import artists_bp
     from app.albums import albums_bp
     from app.auth import auth_bp
+    from app.search import search_bp
+    from app.stats import stats_bp
+    from app.monitoring import monitoring_bp, metrics_bp
 
     app.register_blueprint(db_manage_bp)
     app.register_blueprint(errors_bp)
     app.register_blueprint(artists_bp, url_prefix="/api")
     app.register_blueprint(albums_bp, url_prefix="/api")
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
+    app.register_blueprint(search_bp, url_prefix="/api")
+    app.register_blueprint(stats_bp, url_prefix="/api")
+    app.register_blueprint(monitoring_bp, url_prefix="/api")
+    app.register_blueprint(metrics_bp)
 
     return app
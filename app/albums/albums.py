@@ -2,35 +2,55 @@
 Module for manage albums.
 """
 
-from webargs.flaskparser import use_args
-from flask import jsonify, request
+from flask import abort, jsonify, request
+from marshmallow import ValidationError
+from sqlalchemy import insert, update, delete, select
 
 from app import db
+from app.cache import response_cache
 from app.models import (
     Album,
     AlbumSchema,
     album_schema,
     Artist,
 )
+from app.serializers import get_serializer
 from app.utils import (
+    use_args,
     validate_content_type,
     get_schema_args,
+    apply_projection,
+    apply_eager_loading,
     apply_orders,
     apply_filter,
     get_pagination,
     token_required,
+    conditional,
+    row_conditional,
+    cached,
+    read_replica,
+    get_bulk_items,
+    load_bulk,
+    check_bulk_errors,
+    get_bulk_criteria,
+    export_response,
 )
 from app.albums import albums_bp
 
 
 @albums_bp.route("/albums", methods=["GET"])
+@conditional("Albums", "Artists")
+@cached("Albums", "Artists")
+@read_replica
 def get_albums():
     query = Album.query
-    schema_args = get_schema_args(Album)
+    serializer = get_serializer(AlbumSchema, **get_schema_args(Album))
+    query = apply_projection(Album, query, serializer.schema)
+    query = apply_eager_loading(Album, query, serializer.schema)
     query = apply_orders(Album, query)
     query = apply_filter(Album, query)
-    items, pagination = get_pagination(query, "albums.get_albums")
-    albums = AlbumSchema(**schema_args).dump(items)
+    items, pagination = get_pagination(Album, query, "albums.get_albums")
+    albums = serializer.dump(items)
 
     return jsonify(
         {
@@ -42,16 +62,27 @@ def get_albums():
     )
 
 
+@albums_bp.route("/albums/export", methods=["GET"])
+def export_albums():
+    return export_response(Album, AlbumSchema)
+
+
 @albums_bp.route("/albums/<int:album_id>", methods=["GET"])
+@row_conditional(Album, AlbumSchema)
+@cached("Albums", "Artists")
+@read_replica
 def get_album_detail(album_id: int):
-    album = Album.query.get_or_404(
+    serializer = get_serializer(AlbumSchema)
+    query = apply_eager_loading(Album, Album.query, serializer.schema)
+    album = query.get_or_404(
         album_id, description=f"Album with id {album_id} not found."
     )
-    return jsonify({"success": True, "data": album_schema.dump(album)})
+    return jsonify({"success": True, "data": serializer.dump(album)})
 
 
 @albums_bp.route("/albums/<int:album_id>", methods=["PUT"])
 @token_required
+@row_conditional(Album, AlbumSchema)
 @validate_content_type
 @use_args(album_schema, error_status_code=400)
 def update_album(user_id: int, args: dict, album_id: int):
@@ -70,18 +101,21 @@ def update_album(user_id: int, args: dict, album_id: int):
     album.description = args["description"]
     album.release_year = args["release_year"]
     db.session.commit()
+    response_cache.invalidate("Albums", "Artists")
 
     return jsonify({"success": True, "data": album_schema.dump(album)})
 
 
 @albums_bp.route("albums/<int:album_id>", methods=["DELETE"])
 @token_required
+@row_conditional(Album, AlbumSchema)
 def delete_album(user_id: int, album_id: int):
     album = Album.query.get_or_404(
         album_id, description=f"Album with id {album_id} not found."
     )
     db.session.delete(album)
     db.session.commit()
+    response_cache.invalidate("Albums", "Artists")
 
     return jsonify(
         {"success": True, "data": f"Album with id {album_id} has been deleted."}
@@ -89,12 +123,15 @@ def delete_album(user_id: int, album_id: int):
 
 
 @albums_bp.route("artists/<int:artist_id>/albums", methods=["GET"])
+@conditional("Albums", "Artists")
+@cached("Albums", "Artists")
+@read_replica
 def get_all_artist_albums(artist_id):
     Artist.query.get_or_404(
         artist_id, description=f"Artist with id {artist_id} not found."
     )
     albums = Album.query.filter(Album.artist_id == artist_id).all()
-    items = AlbumSchema(many=True, exclude=["artist"]).dump(albums)
+    items = get_serializer(AlbumSchema, many=True, exclude=["artist"]).dump(albums)
 
     return jsonify({"success": True, "data": items, "number_of_records": len(items)})
 
@@ -110,5 +147,82 @@ def create_album(user_id: int, args: dict, artist_id: int):
     album = Album(artist_id=artist_id, **args)
     db.session.add(album)
     db.session.commit()
+    response_cache.invalidate("Albums", "Artists")
 
     return jsonify({"success": True, "data": album_schema.dump(album)}), 201
+
+
+@albums_bp.route("/albums/bulk", methods=["POST"])
+@token_required
+@validate_content_type
+def create_albums_bulk(user_id: int):
+    schema = AlbumSchema(many=True, exclude=["artist"])
+    rows, errors = load_bulk(schema, get_bulk_items())
+    artist_ids = {row.get("artist_id") for row in rows.values()}
+    existing_ids = set(
+        db.session.scalars(select(Artist.id).where(Artist.id.in_(artist_ids)))
+    )
+    for index, row in list(rows.items()):
+        if row.get("artist_id") not in existing_ids:
+            errors[index] = {"artist_id": ["Artist does not exist."]}
+            del rows[index]
+    check_bulk_errors(errors)
+    if rows:
+        db.session.execute(insert(Album), list(rows.values()))
+        db.session.commit()
+        response_cache.invalidate("Albums", "Artists")
+
+    return (
+        jsonify(
+            {
+                "success": True,
+                "data": {"created": len(rows), "errors": errors},
+            }
+        ),
+        201,
+    )
+
+
+@albums_bp.route("/albums/bulk", methods=["PATCH"])
+@token_required
+@validate_content_type
+def update_albums_bulk(user_id: int):
+    criteria = get_bulk_criteria(Album)
+    try:
+        values = AlbumSchema(partial=True, exclude=["artist"]).load(
+            request.get_json().get("data") or {}
+        )
+    except ValidationError as err:
+        abort(400, description=err.messages)
+    if not values:
+        abort(400, description="Provide data to update.")
+    if "artist_id" in values:
+        Artist.query.get_or_404(
+            values["artist_id"],
+            description=f"Artist with id {values['artist_id']} not found.",
+        )
+
+    result = db.session.execute(
+        update(Album)
+        .where(*criteria)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    response_cache.invalidate("Albums", "Artists")
+
+    return jsonify({"success": True, "data": {"updated": result.rowcount}})
+
+
+@albums_bp.route("/albums/bulk", methods=["DELETE"])
+@token_required
+@validate_content_type
+def delete_albums_bulk(user_id: int):
+    criteria = get_bulk_criteria(Album)
+    result = db.session.execute(
+        delete(Album).where(*criteria).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    response_cache.invalidate("Albums", "Artists")
+
+    return jsonify({"success": True, "data": {"deleted": result.rowcount}})
@@ -2,34 +2,55 @@
 Module for manage artists.
 """
 
-from webargs.flaskparser import use_args
-from flask import jsonify
+from flask import abort, jsonify, request
+from marshmallow import ValidationError
+from sqlalchemy import insert, update, delete, select
 
 from app import db
+from app.cache import response_cache
 from app.models import (
     Artist,
     ArtistSchema,
     artist_schema,
+    Album,
 )
+from app.serializers import get_serializer
 from app.utils import (
+    use_args,
     validate_content_type,
     get_schema_args,
+    apply_projection,
+    apply_eager_loading,
     apply_orders,
     apply_filter,
     get_pagination,
     token_required,
+    conditional,
+    row_conditional,
+    cached,
+    read_replica,
+    get_bulk_items,
+    load_bulk,
+    check_bulk_errors,
+    get_bulk_criteria,
+    export_response,
 )
 from app.artists import artists_bp
 
 
 @artists_bp.route("/artists", methods=["GET"])
+@conditional("Artists", "Albums")
+@cached("Artists", "Albums")
+@read_replica
 def get_artists():
     query = Artist.query
-    schema_args = get_schema_args(Artist)
+    serializer = get_serializer(ArtistSchema, **get_schema_args(Artist))
+    query = apply_projection(Artist, query, serializer.schema)
+    query = apply_eager_loading(Artist, query, serializer.schema)
     query = apply_orders(Artist, query)
     query = apply_filter(Artist, query)
-    items, pagination = get_pagination(query, "artists.get_artists")
-    artists = ArtistSchema(**schema_args).dump(items)
+    items, pagination = get_pagination(Artist, query, "artists.get_artists")
+    artists = serializer.dump(items)
 
     return jsonify(
         {
@@ -41,12 +62,22 @@ def get_artists():
     )
 
 
+@artists_bp.route("/artists/export", methods=["GET"])
+def export_artists():
+    return export_response(Artist, ArtistSchema)
+
+
 @artists_bp.route("/artists/<int:artist_id>", methods=["GET"])
+@row_conditional(Artist, ArtistSchema)
+@cached("Artists", "Albums")
+@read_replica
 def get_artist_detail(artist_id: int):
-    artist = Artist.query.get_or_404(
+    serializer = get_serializer(ArtistSchema)
+    query = apply_eager_loading(Artist, Artist.query, serializer.schema)
+    artist = query.get_or_404(
         artist_id, description=f"Artist with id {artist_id} not found."
     )
-    return jsonify({"success": True, "data": artist_schema.dump(artist)})
+    return jsonify({"success": True, "data": serializer.dump(artist)})
 
 
 @artists_bp.route("/artists", methods=["POST"])
@@ -57,6 +88,7 @@ def create_artist(user_id: int, args: dict):
     artist = Artist(**args)
     db.session.add(artist)
     db.session.commit()
+    response_cache.invalidate("Artists", "Albums")
 
     return (
         jsonify(
@@ -69,8 +101,85 @@ def create_artist(user_id: int, args: dict):
     )
 
 
+@artists_bp.route("/artists/bulk", methods=["POST"])
+@token_required
+@validate_content_type
+def create_artists_bulk(user_id: int):
+    schema = ArtistSchema(many=True, exclude=["albums"])
+    rows, errors = load_bulk(schema, get_bulk_items())
+    check_bulk_errors(errors)
+    if rows:
+        db.session.execute(insert(Artist), list(rows.values()))
+        db.session.commit()
+        response_cache.invalidate("Artists", "Albums")
+
+    return (
+        jsonify(
+            {
+                "success": True,
+                "data": {"created": len(rows), "errors": errors},
+            }
+        ),
+        201,
+    )
+
+
+@artists_bp.route("/artists/bulk", methods=["PATCH"])
+@token_required
+@validate_content_type
+def update_artists_bulk(user_id: int):
+    criteria = get_bulk_criteria(Artist)
+    try:
+        values = ArtistSchema(partial=True, exclude=["albums"]).load(
+            request.get_json().get("data") or {}
+        )
+    except ValidationError as err:
+        abort(400, description=err.messages)
+    if not values:
+        abort(400, description="Provide data to update.")
+
+    result = db.session.execute(
+        update(Artist)
+        .where(*criteria)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    response_cache.invalidate("Artists", "Albums")
+
+    return jsonify({"success": True, "data": {"updated": result.rowcount}})
+
+
+@artists_bp.route("/artists/bulk", methods=["DELETE"])
+@token_required
+@validate_content_type
+def delete_artists_bulk(user_id: int):
+    criteria = get_bulk_criteria(Artist)
+    albums_result = db.session.execute(
+        delete(Album)
+        .where(Album.artist_id.in_(select(Artist.id).where(*criteria)))
+        .execution_options(synchronize_session=False)
+    )
+    result = db.session.execute(
+        delete(Artist).where(*criteria).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    response_cache.invalidate("Artists", "Albums")
+
+    return jsonify(
+        {
+            "success": True,
+            "data": {
+                "deleted": result.rowcount,
+                "deleted_albums": albums_result.rowcount,
+            },
+        }
+    )
+
+
 @artists_bp.route("/artists/<int:artist_id>", methods=["PUT"])
 @token_required
+@row_conditional(Artist, ArtistSchema)
 @validate_content_type
 @use_args(artist_schema, error_status_code=400)
 def update_artist(user_id: int, args: dict, artist_id: int):
@@ -81,18 +190,21 @@ def update_artist(user_id: int, args: dict, artist_id: int):
     artist.label = args["label"]
     artist.birth_date = args["birth_date"]
     db.session.commit()
+    response_cache.invalidate("Artists", "Albums")
 
     return jsonify({"success": True, "data": artist_schema.dump(artist)})
 
 
 @artists_bp.route("/artists/<int:artist_id>", methods=["DELETE"])
 @token_required
+@row_conditional(Artist, ArtistSchema)
 def delete_artist(user_id: int, artist_id: int):
     artist = Artist.query.get_or_404(
         artist_id, description=f"Artist with id {artist_id} not found."
     )
     db.session.delete(artist)
     db.session.commit()
+    response_cache.invalidate("Artists", "Albums")
     return jsonify(
         {
             "success": True,
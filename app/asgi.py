@@ -0,0 +1,451 @@
+"""
+ASGI serving mode: read endpoints on SQLAlchemy's async engine.
+"""
+
+from io import BytesIO
+from threading import Event
+import asyncio
+import sys
+
+from flask import current_app, jsonify, make_response, request
+from flask_sqlalchemy.pagination import Pagination
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.exceptions import HTTPException, NotFound
+
+from app import db
+from app.autocomplete import autocomplete
+from app.cache import response_cache, table_versions
+from app.models import Artist, ArtistSchema, Album, AlbumSchema
+from app.queries import access_pattern_log
+from app.serializers import get_serializer
+from app.utils import (
+    SQLITE_HAS_STATISTICS,
+    _get_etag,
+    apply_eager_loading,
+    apply_filter,
+    apply_orders,
+    apply_projection,
+    count_cache,
+    count_cache_key,
+    count_statement,
+    estimate_count_statement,
+    get_cache_key,
+    get_cursor_page,
+    get_filters,
+    get_page_args,
+    get_page_links,
+    get_schema_args,
+    prepare_cursor_query,
+    record_access_pattern,
+    tag_row_response,
+)
+
+
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "mysql": "aiomysql"}
+
+ASYNC_VIEWS = {}
+
+
+def async_database_uri(uri):
+    """Swaps the driver of a database URI for its asyncio counterpart."""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return url
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def async_view(endpoint, *tables, row_etag=False):
+    """Serves the GET requests of a Flask endpoint with a coroutine, with the
+    ETag and response cache handling of ``conditional`` and ``cached``, or of
+    ``row_conditional`` for detail endpoints when ``row_etag`` is set.
+    """
+
+    def decorator(func):
+        ASYNC_VIEWS[endpoint] = (func, tables, row_etag)
+        return func
+
+    return decorator
+
+
+class LoadedPagination(Pagination):
+    """Pagination over a page of items that were already loaded."""
+
+    def _query_items(self):
+        return self._query_args["items"]
+
+    def _query_count(self):
+        return None
+
+
+async def _run_blocking(store, func, *args):
+    """Runs func in a worker thread when the store is backed by a file, so its
+    I/O stays off the event loop; in-memory stores are called directly.
+    """
+    if store.path is None:
+        return func(*args)
+    return await asyncio.to_thread(func, *args)
+
+
+async def _get_count(session, model, query, strategy):
+    filters = get_filters(model)
+    if strategy == "estimated" and not filters:
+        dialect_name = session.bind.dialect.name
+        statement = estimate_count_statement(model, dialect_name)
+        if statement is not None and (
+            dialect_name != "sqlite" or await session.scalar(SQLITE_HAS_STATISTICS)
+        ):
+            total = await session.scalar(statement)
+            if total is not None:
+                return total, strategy
+    if strategy == "cached":
+        key = await _run_blocking(table_versions, count_cache_key, model, filters)
+        total = count_cache.get(key)
+        if total is None:
+            total = await session.scalar(count_statement(query))
+            count_cache.set(
+                key, total, current_app.config.get("PAGINATION_COUNT_TTL", 60)
+            )
+        return total, strategy
+    if strategy == "none":
+        return None, strategy
+    return await session.scalar(count_statement(query)), "exact"
+
+
+async def get_pagination(session, model, query, func_name):
+    """Async counterpart of ``app.utils.get_pagination``."""
+    if access_pattern_log.path is not None:
+        await asyncio.to_thread(record_access_pattern, model)
+    if "cursor" in request.args:
+        query, keys, limit = prepare_cursor_query(model, query)
+        items = (await session.scalars(query.limit(limit + 1))).all()
+        return get_cursor_page(list(items), keys, limit, func_name)
+
+    page, limit, strategy = get_page_args()
+    # Out of range values fall back like paginate(error_out=False) does.
+    per_page = limit if limit > 0 else 20
+    offset = (max(page, 1) - 1) * per_page
+    items = (await session.scalars(query.limit(per_page).offset(offset))).all()
+    paginate_obj = LoadedPagination(
+        page=max(page, 1),
+        per_page=per_page,
+        max_per_page=None,
+        error_out=False,
+        count=False,
+        items=list(items),
+    )
+    paginate_obj.total, strategy = await _get_count(session, model, query, strategy)
+    return paginate_obj.items, get_page_links(paginate_obj, page, strategy, func_name)
+
+
+async def _get_or_404(session, query, description):
+    item = (await session.scalars(query)).first()
+    if item is None:
+        raise NotFound(description=description)
+    return item
+
+
+@async_view("artists.get_artists", "Artists", "Albums")
+async def get_artists(session):
+    query = select(Artist)
+    serializer = get_serializer(ArtistSchema, **get_schema_args(Artist))
+    query = apply_projection(Artist, query, serializer.schema)
+    query = apply_eager_loading(Artist, query, serializer.schema)
+    query = apply_orders(Artist, query)
+    query = apply_filter(Artist, query)
+    items, pagination = await get_pagination(
+        session, Artist, query, "artists.get_artists"
+    )
+    artists = serializer.dump(items)
+
+    return jsonify(
+        {
+            "success": True,
+            "data": artists,
+            "number_of_records": len(artists),
+            "pagination": pagination,
+        }
+    )
+
+
+@async_view("artists.get_artist_detail", "Artists", "Albums", row_etag=True)
+async def get_artist_detail(session, artist_id):
+    serializer = get_serializer(ArtistSchema)
+    query = apply_eager_loading(Artist, select(Artist), serializer.schema)
+    artist = await _get_or_404(
+        session,
+        query.where(Artist.id == artist_id),
+        f"Artist with id {artist_id} not found.",
+    )
+    return jsonify({"success": True, "data": serializer.dump(artist)})
+
+
+@async_view("albums.get_albums", "Albums", "Artists")
+async def get_albums(session):
+    query = select(Album)
+    serializer = get_serializer(AlbumSchema, **get_schema_args(Album))
+    query = apply_projection(Album, query, serializer.schema)
+    query = apply_eager_loading(Album, query, serializer.schema)
+    query = apply_orders(Album, query)
+    query = apply_filter(Album, query)
+    items, pagination = await get_pagination(session, Album, query, "albums.get_albums")
+    albums = serializer.dump(items)
+
+    return jsonify(
+        {
+            "success": True,
+            "data": albums,
+            "number_of_records": len(albums),
+            "pagination": pagination,
+        }
+    )
+
+
+@async_view("albums.get_album_detail", "Albums", "Artists", row_etag=True)
+async def get_album_detail(session, album_id):
+    serializer = get_serializer(AlbumSchema)
+    query = apply_eager_loading(Album, select(Album), serializer.schema)
+    album = await _get_or_404(
+        session,
+        query.where(Album.id == album_id),
+        f"Album with id {album_id} not found.",
+    )
+    return jsonify({"success": True, "data": serializer.dump(album)})
+
+
+@async_view("albums.get_all_artist_albums", "Albums", "Artists")
+async def get_all_artist_albums(session, artist_id):
+    await _get_or_404(
+        session,
+        select(Artist.id).where(Artist.id == artist_id),
+        f"Artist with id {artist_id} not found.",
+    )
+    albums = await session.scalars(select(Album).where(Album.artist_id == artist_id))
+    items = get_serializer(AlbumSchema, many=True, exclude=["artist"]).dump(
+        albums.all()
+    )
+
+    return jsonify({"success": True, "data": items, "number_of_records": len(items)})
+
+
+def _make_environ(scope, body):
+    """Builds the WSGI environ of an ASGI HTTP request."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin1"),
+        "PATH_INFO": scope["path"].encode().decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin1").upper().replace("-", "_")
+        if name == "CONTENT_LENGTH":
+            continue
+        key = name if name == "CONTENT_TYPE" else f"HTTP_{name}"
+        value = value.decode("latin1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _iter_wsgi(app, environ, put, closed):
+    """Runs a WSGI request in the calling thread, handing the response start
+    and each body chunk to put until the response ends or closed is set.
+    """
+    started = []
+
+    def start_response(status, headers, exc_info=None):
+        started[:] = [int(status.split(" ", 1)[0]), headers]
+
+    sent = False
+    try:
+        iterable = app(environ, start_response)
+        try:
+            for chunk in iterable:
+                if closed.is_set():
+                    break
+                if chunk:
+                    if not sent:
+                        put(("start", started))
+                        sent = True
+                    put(("body", chunk))
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+        if not sent:
+            put(("start", started))
+    except BaseException as error:
+        put(("error", error))
+    else:
+        put(("end", None))
+
+
+async def _send_start(send, status, headers):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (name.lower().encode("latin1"), value.encode("latin1"))
+                for name, value in headers
+            ],
+        }
+    )
+
+
+class AsyncApp:
+    """ASGI application running the views registered with ``async_view`` on
+    the event loop, through an async engine on the same database. Every other
+    request is handed to the Flask app in a worker thread.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        uri = flask_app.config.get("ASYNC_DATABASE_URI")
+        if not uri:
+            # The engine URL has relative SQLite paths resolved by the extension.
+            with flask_app.app_context():
+                uri = async_database_uri(db.engine.url)
+        try:
+            self.engine = create_async_engine(
+                uri, **flask_app.config.get("ASYNC_ENGINE_OPTIONS", {})
+            )
+        except ImportError as error:
+            raise RuntimeError(
+                f"The ASGI mode needs an asyncio database driver for {uri}, "
+                f"e.g. pip install {', '.join(ASYNC_DRIVERS.values())}."
+            ) from error
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        environ = _make_environ(scope, body)
+        try:
+            endpoint, view_args = self.flask_app.url_map.bind_to_environ(
+                environ
+            ).match()
+        except HTTPException:
+            endpoint = None
+        if scope["method"] != "GET" or endpoint not in ASYNC_VIEWS:
+            return await self._stream_wsgi(environ, send)
+        response = await self._dispatch(environ, endpoint, view_args)
+        await _send_start(send, response.status_code, response.headers.to_wsgi_list())
+        await send({"type": "http.response.body", "body": response.get_data()})
+
+    async def _stream_wsgi(self, environ, send):
+        """Serves a request with the Flask app in a worker thread, forwarding
+        each chunk of the body as it is produced so streamed responses such
+        as the exports never sit in memory as a whole.
+        """
+        loop = asyncio.get_running_loop()
+        # A bounded queue makes the worker wait while the client is slow.
+        queue = asyncio.Queue(maxsize=8)
+        closed = Event()
+
+        def put(message):
+            asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+        worker = loop.run_in_executor(
+            None, _iter_wsgi, self.flask_app, environ, put, closed
+        )
+        kind = None
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == "error":
+                    raise value
+                if kind == "end":
+                    await send({"type": "http.response.body", "body": b""})
+                    break
+                if kind == "start":
+                    await _send_start(send, *value)
+                else:
+                    await send(
+                        {"type": "http.response.body", "body": value, "more_body": True}
+                    )
+        finally:
+            if kind not in ("end", "error"):
+                # Unblock and stop the worker when the client went away.
+                closed.set()
+                while kind not in ("end", "error"):
+                    kind, _ = await queue.get()
+            await worker
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if self.flask_app.config.get("AUTOCOMPLETE_WARMUP"):
+                    await asyncio.to_thread(self._warm_up)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _warm_up(self):
+        with self.flask_app.app_context():
+            autocomplete.warm_up()
+
+    async def _dispatch(self, environ, endpoint, view_args):
+        app = self.flask_app
+        func, tables, row_etag = ASYNC_VIEWS[endpoint]
+        with app.request_context(environ):
+            try:
+                response = app.preprocess_request()
+                if response is None:
+                    response = await self._run_view(func, tables, row_etag, view_args)
+            except Exception as error:
+                try:
+                    response = app.handle_user_exception(error)
+                except Exception as error:
+                    response = app.handle_exception(error)
+            return app.process_response(make_response(response))
+
+    async def _run_view(self, func, tables, row_etag, view_args):
+        etag = None
+        if table_versions.shared and not row_etag:
+            etag = await _run_blocking(table_versions, _get_etag, tables)
+        if etag is not None and request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        key = body = None
+        if response_cache.max_bytes:
+            key = await _run_blocking(table_versions, get_cache_key, tables)
+            body = await _run_blocking(response_cache, response_cache.get, key)
+        if body is not None:
+            response = current_app.response_class(body, mimetype="application/json")
+        else:
+            async with self.sessionmaker() as session:
+                response = make_response(await func(session, **view_args))
+            if key is not None and response.status_code == 200:
+                await _run_blocking(
+                    response_cache, response_cache.set, key, response.get_data(), tables
+                )
+        if row_etag:
+            return tag_row_response(response)
+        if etag is not None and response.status_code < 300:
+            response.set_etag(etag)
+        return response
@@ -3,17 +3,24 @@ Authorization for app.
 """
 
 from flask import abort, jsonify
-from webargs.flaskparser import use_args
 
 from app import db
 from app.auth import auth_bp
+from app.cache import token_cache
 from app.models import (
     user_schema,
     User,
     UserSchema,
     user_password_update,
 )
-from app.utils import validate_content_type, token_required, check_exists
+from app.replicas import read_replicas
+from app.utils import (
+    use_args,
+    validate_content_type,
+    token_required,
+    read_replica,
+    check_exists,
+)
 
 
 @auth_bp.route("/register", methods=["POST"])
@@ -30,6 +37,7 @@ def register(args: dict):
     user = User(**args)
     db.session.add(user)
     db.session.commit()
+    read_replicas.mark_write(user.id)
     token = user.generate_jwt()
 
     return jsonify({"success": True, "token": token}), 201
@@ -44,6 +52,9 @@ def login(args: dict):
         abort(401, description="Invalid user")
     if not user.is_password_valid(args["password"]):
         abort(401, description="Invalid password")
+    if user.needs_rehash():
+        user.password = user.generate_hashed_password(args["password"])
+        db.session.commit()
 
     token = user.generate_jwt()
 
@@ -52,6 +63,7 @@ def login(args: dict):
 
 @auth_bp.route("/me", methods=["GET"])
 @token_required
+@read_replica
 def get_current_user(user_id):
     user = User.query.get_or_404(
         user_id, description=f"User with id {user_id} not found"
@@ -72,6 +84,7 @@ def get_update_user_password(user_id, args):
 
     user.password = user.generate_hashed_password(args["new_password"])
     db.session.commit()
+    token_cache.evict_user(user_id)
 
     return jsonify({"success": True, "data": user_schema.dump(user)})
 
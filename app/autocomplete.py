@@ -0,0 +1,226 @@
+"""
+In-memory prefix index for artist name and album title autocomplete.
+"""
+
+from bisect import bisect_left
+from threading import Lock
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.cache import table_versions
+from app.models import Artist, Album
+
+
+SEPARATOR = "\0"
+
+
+class PrefixIndex:
+    """Sorted array of ``key\\0name\\0id`` strings searched with bisect.
+
+    One string per entry keeps the index compact; names are truncated to
+    ``max_length`` characters so no entry can grow unbounded.
+    """
+
+    def __init__(self, max_length=50):
+        self.max_length = max_length
+        self.entries = []
+
+    def _entry(self, id, name):
+        name = name[: self.max_length]
+        return f"{name.casefold()}{SEPARATOR}{name}{SEPARATOR}{id}"
+
+    def build(self, rows):
+        self.entries = sorted(self._entry(id, name) for id, name in rows if name)
+
+    def add(self, id, name):
+        if not name:
+            return
+        entry = self._entry(id, name)
+        position = bisect_left(self.entries, entry)
+        if position == len(self.entries) or self.entries[position] != entry:
+            self.entries.insert(position, entry)
+
+    def remove(self, id, name):
+        if not name:
+            return
+        entry = self._entry(id, name)
+        position = bisect_left(self.entries, entry)
+        if position < len(self.entries) and self.entries[position] == entry:
+            del self.entries[position]
+
+    def search(self, prefix, limit):
+        prefix = prefix.casefold()[: self.max_length]
+        entries = self.entries
+        position = bisect_left(entries, prefix)
+        matches = []
+        while position < len(entries) and len(matches) < limit:
+            entry = entries[position]
+            if not entry.startswith(prefix):
+                break
+            _, name, id = entry.split(SEPARATOR)
+            matches.append({"id": int(id), "name": name})
+            position += 1
+        return matches
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class Autocomplete:
+    """Prefix indexes per entity kind, built on first use.
+
+    ORM writes committed in this process are applied incrementally. Any other
+    write, such as a bulk statement or a commit in another worker process,
+    moves the table version past the one the index was built for, and the
+    index is rebuilt on the next lookup.
+    """
+
+    SOURCES = {"artist": (Artist, "name"), "album": (Album, "title")}
+
+    def __init__(self):
+        self._lock = Lock()
+        self.configure()
+
+    def configure(self, max_length=50):
+        with self._lock:
+            self.max_length = max_length
+            self._indexes = {}
+            self._versions = {}
+
+    def init_app(self, app):
+        """Configures the indexes and, with ``AUTOCOMPLETE_WARMUP``, builds them
+        before the first request is handled instead of on the first lookup.
+        """
+        self.configure(app.config.get("AUTOCOMPLETE_MAX_LENGTH", 50))
+        if not app.config.get("AUTOCOMPLETE_WARMUP"):
+            return
+        pending = [True]
+
+        @app.before_request
+        def _warm_up_autocomplete():
+            if pending:
+                pending.clear()
+                self.warm_up()
+
+    def _table(self, kind):
+        return self.SOURCES[kind][0].__tablename__
+
+    def _get_index(self, kind):
+        table = self._table(kind)
+        index = self._indexes.get(kind)
+        if index is None or self._versions[kind] != table_versions.get(table)[0]:
+            model, column = self.SOURCES[kind]
+            index = PrefixIndex(self.max_length)
+            index.build(db.session.execute(select(model.id, getattr(model, column))))
+            self._indexes[kind] = index
+            # Read after the build, so a commit landing during it is either
+            # already counted or applied on top, where adding is idempotent.
+            self._versions[kind] = table_versions.get(table)[0]
+        return index
+
+    def warm_up(self):
+        """Builds the index of every kind that is missing or outdated."""
+        with self._lock:
+            for kind in self.SOURCES:
+                self._get_index(kind)
+
+    def search(self, kind, prefix, limit=10):
+        """Returns up to limit {"id", "name"} entries of kind whose name starts
+        with prefix, case-insensitively, in name order.
+        """
+        with self._lock:
+            return self._get_index(kind).search(prefix, limit)
+
+    def invalidate(self, *kinds):
+        with self._lock:
+            for kind in kinds:
+                self._indexes.pop(kind, None)
+
+    def apply(self, changes, touched):
+        """Applies the (kind, id, old name, new name) changes of one commit.
+
+        Each commit bumps the version of the tables it wrote by one, so an
+        index is only kept current when its version moved by exactly that;
+        otherwise another writer got in between and the index is dropped.
+        """
+        with self._lock:
+            for kind in touched:
+                index = self._indexes.get(kind)
+                if index is None:
+                    continue
+                version = table_versions.get(self._table(kind))[0]
+                if version != self._versions[kind] + 1:
+                    del self._indexes[kind]
+                    continue
+                self._versions[kind] = version
+                for change_kind, id, old, new in changes:
+                    if change_kind == kind:
+                        index.remove(id, old)
+                        index.add(id, new)
+
+
+autocomplete = Autocomplete()
+
+MODEL_KINDS = {model: kind for kind, (model, _) in Autocomplete.SOURCES.items()}
+TABLE_KINDS = {model.__tablename__: kind for model, kind in MODEL_KINDS.items()}
+
+
+def _names(obj, column):
+    """Returns the name an object had before the flush and the one it has now."""
+    history = inspect(obj).attrs[column].history
+    new = getattr(obj, column)
+    return (history.deleted[0] if history.deleted else new), new
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_autocomplete_changes(session, flush_context):
+    changes = session.info.setdefault("autocomplete_changes", [])
+    touched = session.info.setdefault("autocomplete_touched", set())
+    for objects, state in (
+        (session.new, "new"),
+        (session.dirty, "dirty"),
+        (session.deleted, "deleted"),
+    ):
+        for obj in objects:
+            kind = MODEL_KINDS.get(type(obj))
+            if kind is None:
+                continue
+            touched.add(kind)
+            old, new = _names(obj, Autocomplete.SOURCES[kind][1])
+            if state == "new":
+                changes.append((kind, obj.id, None, new))
+            elif state == "deleted":
+                changes.append((kind, obj.id, old, None))
+            elif old != new:
+                changes.append((kind, obj.id, old, new))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_autocomplete_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    kind = TABLE_KINDS.get(getattr(table, "name", None))
+    if kind is not None:
+        info = orm_execute_state.session.info
+        info.setdefault("autocomplete_touched", set()).add(kind)
+        info.setdefault("autocomplete_bulk", set()).add(kind)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_autocomplete_changes(session):
+    changes = session.info.pop("autocomplete_changes", ())
+    touched = session.info.pop("autocomplete_touched", set())
+    bulk = session.info.pop("autocomplete_bulk", set())
+    if bulk:
+        autocomplete.invalidate(*bulk)
+    if touched - bulk:
+        autocomplete.apply(changes, touched - bulk)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_autocomplete_changes(session, previous_transaction):
+    for key in ("autocomplete_changes", "autocomplete_touched", "autocomplete_bulk"):
+        session.info.pop(key, None)
@@ -0,0 +1,386 @@
+"""
+Caching helpers for app.
+"""
+
+from collections import OrderedDict
+from threading import Lock, local
+import hashlib
+import secrets
+import sqlite3
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class TTLCache:
+    """Bounded, thread-safe LRU cache whose entries expire after a TTL."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedFile:
+    """SQLite file on local disk shared by every worker process on the host."""
+
+    def __init__(self):
+        self._local = local()
+        self.path = None
+
+    def _connect(self):
+        if getattr(self._local, "path", None) != self.path:
+            self._local.conn = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None
+            )
+            self._local.conn.execute("PRAGMA journal_mode=WAL")
+            self._local.path = self.path
+        return self._local.conn
+
+
+class TableVersions(SharedFile):
+    """Per-table counters bumped after every committed write to the table.
+
+    Counters live in process memory unless a path is configured, in which case
+    they are kept in a SQLite file shared by every worker process on the host.
+    Process-local counters miss the writes of other processes, so they are
+    only reliable with a single worker. The epoch changes whenever the
+    counters start over, so (epoch, versions) never repeats for different data.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._versions = {}
+        self._lock = Lock()
+        self.epoch = secrets.token_hex(8)
+
+    def configure(self, path):
+        self.path = str(path) if path else None
+        if self.path is None:
+            return
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS table_versions "
+            "(name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO table_versions (name, version) VALUES ('', ?)",
+            (int(secrets.token_hex(4), 16),),
+        )
+        self.epoch = conn.execute(
+            "SELECT version FROM table_versions WHERE name = ''"
+        ).fetchone()[0]
+
+    @property
+    def shared(self):
+        return self.path is not None
+
+    def get(self, *tables):
+        if self.path is not None:
+            versions = dict(
+                self._connect().execute(
+                    "SELECT name, version FROM table_versions WHERE name IN "
+                    f"({', '.join('?' * len(tables))})",
+                    tables,
+                )
+            )
+            return tuple(versions.get(table, 0) for table in tables)
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump(self, *tables):
+        if self.path is not None:
+            self._connect().executemany(
+                "INSERT INTO table_versions (name, version) VALUES (?, 1) "
+                "ON CONFLICT (name) DO UPDATE SET version = version + 1",
+                [(table,) for table in tables],
+            )
+            return
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+
+class ResponseCache(SharedFile):
+    """Response bodies cached in an in-process LRU bounded by bytes, backed by
+    an optional shared tier on local disk.
+
+    Entries are tagged with the tables they were built from so writes to those
+    tables can drop them from both tiers. With a ttl, in-process entries also
+    expire after that many seconds, which bounds their staleness when writes
+    made by other processes cannot be seen.
+    """
+
+    def __init__(self, max_bytes=0):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.shared_max_bytes = 0
+        self.ttl = None
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.counters = {}
+        self.clear()
+
+    def configure(self, max_bytes, path=None, shared_max_bytes=0, ttl=None):
+        self.max_bytes = max_bytes
+        self.shared_max_bytes = shared_max_bytes
+        self.ttl = ttl
+        self.path = str(path) if path else None
+        self.clear()
+        if self.path is not None:
+            self._connect().execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, "
+                "tables TEXT NOT NULL, body BLOB NOT NULL, size INTEGER NOT NULL, "
+                "accessed REAL NOT NULL)"
+            )
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _set_local(self, key, body, tables):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._data[key] = (body, tables, expires_at)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (evicted, _, _) = self._data.popitem(last=False)
+                self.size -= len(evicted)
+                self.counters["evictions"] += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[2] is not None:
+                if entry[2] <= time.monotonic():
+                    del self._data[key]
+                    self.size -= len(entry[0])
+                    entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.counters["local_hits"] += 1
+                return entry[0]
+        if self.path is not None:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT body, tables FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE responses SET accessed = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                self._count("shared_hits")
+                self._set_local(key, row[0], row[1])
+                return row[0]
+        self._count("misses")
+        return None
+
+    def set(self, key, body, tables):
+        tags = f"|{'|'.join(tables)}|"
+        self._set_local(key, body, tags)
+        if self.path is None or len(body) > self.shared_max_bytes:
+            return
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, tables, body, size, accessed) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, tags, body, len(body), time.time()),
+        )
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total[0] > self.shared_max_bytes:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                "ORDER BY accessed LIMIT MAX(1, (SELECT COUNT(*) FROM responses) / 4))"
+            )
+
+    def invalidate(self, *tables):
+        """Drops every entry built from any of the given tables."""
+        with self._lock:
+            for key, (body, tags, _) in list(self._data.items()):
+                if any(f"|{table}|" in tags for table in tables):
+                    del self._data[key]
+                    self.size -= len(body)
+            self.counters["invalidations"] += 1
+        if self.path is not None:
+            self._connect().executemany(
+                "DELETE FROM responses WHERE tables LIKE ?",
+                [(f"%|{table}|%",) for table in tables],
+            )
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+            self.counters = dict.fromkeys(
+                ("local_hits", "shared_hits", "misses", "evictions", "invalidations"),
+                0,
+            )
+
+    def stats(self):
+        with self._lock:
+            stats = {**self.counters, "entries": len(self._data), "bytes": self.size}
+        requests = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            (stats["local_hits"] + stats["shared_hits"]) / requests if requests else 0.0
+        )
+        if self.path is not None:
+            entries, size = (
+                self._connect()
+                .execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses")
+                .fetchone()
+            )
+            stats["shared_entries"], stats["shared_bytes"] = entries, size
+        return stats
+
+
+class TokenCache:
+    """Bounded cache of verified JWT payloads keyed by a digest of the token.
+
+    Entries never outlive the token's own ``exp`` claim.
+    """
+
+    def __init__(self, maxsize=0):
+        self.maxsize = maxsize
+        self._lock = Lock()
+        self.clear()
+
+    def configure(self, maxsize):
+        self.maxsize = maxsize
+        self.clear()
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def _remove(self, digest):
+        payload, _ = self._data.pop(digest)
+        digests = self._by_user.get(payload.get("user_id"))
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._by_user[payload.get("user_id")]
+
+    def get(self, token):
+        digest = self._digest(token)
+        with self._lock:
+            entry = self._data.get(digest)
+            if entry is not None and entry[1] <= time.time():
+                self._remove(digest)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(digest)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, token, payload, ttl):
+        expires_at = min(payload.get("exp", 0), time.time() + ttl)
+        if not self.maxsize or expires_at <= time.time():
+            return
+        digest = self._digest(token)
+        with self._lock:
+            if digest in self._data:
+                self._remove(digest)
+            self._data[digest] = (payload, expires_at)
+            self._by_user.setdefault(payload.get("user_id"), set()).add(digest)
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+
+    def evict_user(self, user_id):
+        """Evicts every cached token of the user, so its next request decodes
+        the JWT again. This is not revocation: the tokens themselves stay
+        valid until their ``exp`` claim.
+        """
+        with self._lock:
+            for digest in list(self._by_user.get(user_id, ())):
+                self._remove(digest)
+
+    def clear(self):
+        with self._lock:
+            self._data = OrderedDict()
+            self._by_user = {}
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "entries": len(self._data),
+            }
+
+
+table_versions = TableVersions()
+response_cache = ResponseCache()
+token_cache = TokenCache()
+
+
+def _written_tables(session):
+    return session.info.setdefault("written_tables", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__table__", None)
+        if table is not None:
+            _written_tables(session).add(table.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_executed_tables(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None:
+        _written_tables(orm_execute_state.session).add(table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_table_versions(session):
+    tables = session.info.pop("written_tables", None)
+    if tables:
+        table_versions.bump(*tables)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_written_tables(session, previous_transaction):
+    session.info.pop("written_tables", None)
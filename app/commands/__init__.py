@@ -5,4 +5,4 @@ from flask import Blueprint
 
 db_manage_bp = Blueprint("db_manage_cmd", __name__, cli_group=None)
 
-from app.commands import db_manage_commands
+from app.commands import db_manage_commands, perf_commands
@@ -0,0 +1,74 @@
+"""
+Deterministic synthetic catalog for load and scale testing.
+"""
+
+from datetime import date, timedelta
+import math
+import random
+
+
+SYLLABLES = "ka lo mi ne ro sa ti vu ze pa dy gr ox el bo fi ja ku no re sh ta".split()
+WORDS = (
+    "night city dream street fire gold rain ghost blue echo heart light river smoke "
+    "stone wave wild zero north silver shadow storm honey glass velvet neon"
+).split()
+LABEL_SUFFIXES = ("Records", "Music", "Sound", "Label", "Beats", "Collective")
+LATEST_RELEASE_YEAR = 2024
+
+
+def _name(rng, syllables):
+    return "".join(rng.choice(SYLLABLES) for _ in range(syllables)).capitalize()
+
+
+class CatalogGenerator:
+    """Produces artist and album rows with realistic, skewed distributions.
+
+    Album counts per artist are log-normal around the requested mean, labels
+    follow a Zipf distribution, birth dates are normal around 1985 and release
+    years lean towards recent years. The same seed always yields the same rows.
+    """
+
+    def __init__(self, seed, albums_per_artist, labels=200):
+        self.rng = random.Random(seed)
+        self.albums_per_artist = albums_per_artist
+        self.labels = [
+            f"{_name(self.rng, 2)} {self.rng.choice(LABEL_SUFFIXES)}"
+            for _ in range(labels)
+        ]
+        weights = [1 / rank for rank in range(1, labels + 1)]
+        total = sum(weights)
+        self._label_weights = [sum(weights[: i + 1]) / total for i in range(labels)]
+        self._sigma = 1.0
+        self._mu = math.log(max(albums_per_artist, 1e-9)) - self._sigma**2 / 2
+
+    def artist(self, artist_id):
+        rng = self.rng
+        birth_year = min(max(int(rng.gauss(1985, 10)), 1940), 2005)
+        return {
+            "id": artist_id,
+            "name": f"{_name(rng, rng.randint(2, 4))} {_name(rng, 2)}"[:50],
+            "label": rng.choices(self.labels, cum_weights=self._label_weights)[0],
+            "birth_date": date(birth_year, 1, 1) + timedelta(days=rng.randrange(365)),
+        }
+
+    def album_count(self):
+        if not self.albums_per_artist:
+            return 0
+        return int(self.rng.lognormvariate(self._mu, self._sigma) + 0.5)
+
+    def album(self, album_id, artist):
+        rng = self.rng
+        first_year = artist["birth_date"].year + 16
+        span = max(LATEST_RELEASE_YEAR - first_year, 0)
+        return {
+            "id": album_id,
+            "title": " ".join(rng.choices(WORDS, k=rng.randint(1, 3))).title()[:50],
+            "number_of_songs": rng.randint(6, 22),
+            "description": (
+                f"{rng.choice(WORDS).title()} album by {artist['name']}."
+                if rng.random() < 0.7
+                else None
+            ),
+            "release_year": first_year + int(span * rng.random() ** 0.5),
+            "artist_id": artist["id"],
+        }
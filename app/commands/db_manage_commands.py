@@ -2,15 +2,44 @@
 Manage commands for db.
 """
 
+import click
+from marshmallow import ValidationError
+from sqlalchemy import delete, func, insert, inspect, literal, select
 from sqlalchemy.sql import text
 
 import json
+import time
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
 
 from app import db
-from app.models import Artist, Album
+from app.models import (
+    Artist,
+    ArtistImportSchema,
+    Album,
+    AlbumImportSchema,
+    ArtistStats,
+    YearStats,
+    TotalStats,
+    ImportProgress,
+)
 from app.commands import db_manage_bp
+from app.commands.catalog_generator import CatalogGenerator
+from app.queries import AccessPatternLog
+from app.triggers import SEARCH_COLUMNS, maintenance_triggers, search_rebuild
+from app.utils import get_filter_argument
+
+
+ADVICE_MODELS = {"Artists": Artist, "Albums": Album}
+RANGE_SELECTIVITY = 1 / 3
+PER_PAGE_SAMPLE = 5
+
+IMPORT_SCHEMAS = {
+    "artists": lambda: ArtistImportSchema(many=True, exclude=["albums"]),
+    "albums": lambda: AlbumImportSchema(many=True, exclude=["artist"]),
+}
 
 
 def load_json_data(filename):
@@ -21,6 +50,237 @@ def load_json_data(filename):
     return data_json
 
 
+def _is_truncated(error, buffer):
+    """Tells whether a decoding error may go away with more data: it is inside
+    a string running to the end of the buffer, or close enough to the end to be
+    a cut off literal such as ``false``.
+    """
+    if error.msg.startswith("Unterminated string"):
+        return True
+    return error.pos >= len(buffer) - len("false")
+
+
+def iter_json_records(file, chunk_size=64 * 1024):
+    """Yields objects of a JSON array or NDJSON file without loading it whole.
+
+    A malformed record raises ValueError with its index and character offset
+    as soon as it is read; only a record cut off by the end of the buffer
+    waits for the next chunk.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    consumed = index = 0
+    eof = False
+    started = False
+    while True:
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if not started and buffer[position : position + 1] == "[":
+                position += 1
+                started = True
+                continue
+            if buffer[position : position + 1] == "]":
+                return
+            if position == len(buffer):
+                break
+            started = True
+            try:
+                obj, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as error:
+                if not eof and _is_truncated(error, buffer):
+                    break
+                raise ValueError(
+                    f"Malformed record {index} at offset {consumed + position}: "
+                    f"{error.msg} at offset {consumed + error.pos}."
+                ) from error
+            yield obj
+            index += 1
+            position = end
+        consumed += position
+        buffer = buffer[position:]
+        if eof:
+            return
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def _explain(statement, filtered):
+    """Returns the plan lines of a statement and whether it scans or sorts.
+
+    Walking an index in sort order only counts as a full scan when rows are
+    filtered on the way, otherwise the LIMIT stops it early.
+    """
+    engine = db.engine
+    compiled = statement.compile(engine)
+    params = compiled.construct_params()
+    if compiled.positiontup is not None:
+        params = tuple(params[name] for name in compiled.positiontup)
+    connection = db.session.connection()
+    if engine.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+        plan = [row[-1] for row in rows]
+        full_scan = any(
+            line.startswith("SCAN") and (filtered or "INDEX" not in line)
+            for line in plan
+        )
+        sort = any("TEMP B-TREE" in line for line in plan)
+        return plan, full_scan, sort
+    rows = connection.exec_driver_sql(f"EXPLAIN {compiled}", params).mappings().all()
+    plan = [
+        f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} "
+        f"{row['Extra'] or ''}".strip()
+        for row in rows
+    ]
+    full_scan = any(
+        row["type"] == "ALL" or (filtered and row["type"] == "index") for row in rows
+    )
+    sort = any("filesort" in (row["Extra"] or "") for row in rows)
+    return plan, full_scan, sort
+
+
+def _advise(table, filters, sort, indexes):
+    """Builds the index proposal for one observed filter/sort combination."""
+    model = ADVICE_MODELS[table]
+    criteria = []
+    for column, operator in filters:
+        attribute = getattr(model, column)
+        value = db.session.scalar(
+            select(attribute).where(attribute.is_not(None)).limit(1)
+        )
+        criteria.append(get_filter_argument(attribute, value, operator))
+    statement = select(model).where(*criteria).limit(PER_PAGE_SAMPLE)
+    for column, direction in sort:
+        attribute = getattr(model, column)
+        statement = statement.order_by(
+            attribute.desc() if direction == "desc" else attribute
+        )
+    plan, full_scan, needs_sort = _explain(statement, bool(criteria))
+    if not full_scan and not needs_sort:
+        return None
+
+    equality = [column for column, operator in filters if operator == "=="]
+    ranges = [column for column, operator in filters if operator != "=="]
+    columns = []
+    for column in [*equality, *(column for column, _ in sort), *ranges[:1]]:
+        if column not in columns:
+            columns.append(column)
+    if any(index[: len(columns)] == columns for index in indexes):
+        return None
+
+    rows = db.session.scalar(select(func.count()).select_from(model)) or 0
+    estimated = float(rows)
+    for column in equality:
+        distinct = db.session.scalar(
+            select(func.count(getattr(model, column).distinct()))
+        )
+        estimated /= max(distinct or 1, 1)
+    if ranges:
+        estimated *= RANGE_SELECTIVITY
+    examined = rows if full_scan else estimated
+    return {
+        "columns": columns,
+        "plan": plan,
+        "rows": examined,
+        "estimated": estimated,
+        "saving": examined - estimated + (estimated if needs_sort else 0),
+    }
+
+
+def _filter_existing_ids(model_class, rows, errors):
+    ids = {row["id"] for row in rows.values() if "id" in row}
+    taken_ids = set(
+        db.session.scalars(select(model_class.id).where(model_class.id.in_(ids)))
+    )
+    for index, row in list(rows.items()):
+        if "id" not in row:
+            continue
+        if row["id"] in taken_ids:
+            errors[index] = {"id": ["Record with this id already exists."]}
+            del rows[index]
+        taken_ids.add(row["id"])
+
+
+def _filter_missing_artists(rows, errors):
+    artist_ids = {row.get("artist_id") for row in rows.values()}
+    existing_ids = set(
+        db.session.scalars(select(Artist.id).where(Artist.id.in_(artist_ids)))
+    )
+    for index, row in list(rows.items()):
+        if row.get("artist_id") not in existing_ids:
+            errors[index] = {"artist_id": ["Artist does not exist."]}
+            del rows[index]
+
+
+def _drop_triggers():
+    dialect = db.session.get_bind().dialect
+    for name, _ in maintenance_triggers(dialect.name):
+        quoted = dialect.identifier_preparer.quote(name)
+        db.session.execute(text(f"DROP TRIGGER IF EXISTS {quoted}"))
+
+
+def _restore_triggers():
+    """Recreates the triggers maintaining the search indexes and summary tables
+    and rebuilds what they maintain in one pass each.
+    """
+    dialect_name = db.session.get_bind().dialect.name
+    for _, statement in maintenance_triggers(dialect_name):
+        db.session.execute(text(statement))
+    if dialect_name == "sqlite":
+        for table in SEARCH_COLUMNS:
+            db.session.execute(text(search_rebuild(table)))
+    _rebuild_stats()
+
+
+def _missing_triggers():
+    """Returns the names of the maintenance triggers absent from the database."""
+    dialect_name = db.session.get_bind().dialect.name
+    if dialect_name == "sqlite":
+        query = text("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    elif dialect_name == "mysql":
+        query = text(
+            "SELECT TRIGGER_NAME FROM information_schema.TRIGGERS "
+            "WHERE TRIGGER_SCHEMA = DATABASE()"
+        )
+    else:
+        return []
+    existing = set(db.session.scalars(query))
+    return [
+        name for name, _ in maintenance_triggers(dialect_name) if name not in existing
+    ]
+
+
+@contextmanager
+def deferred_triggers(defer):
+    """Runs a bulk load, refusing to start when maintenance triggers are missing.
+
+    With defer the triggers are dropped for the duration of the load, and the
+    search indexes and summary tables of the whole database are rebuilt once at
+    the end instead of being updated per written row. This only pays off for
+    loads that are large compared to the existing data, and writes made by the
+    API in the meantime are only indexed by the final rebuild.
+    """
+    missing = _missing_triggers()
+    if missing:
+        raise click.ClickException(
+            f"Maintenance triggers are missing: {', '.join(missing)}. "
+            "Restore them with 'flask db_manage rebuild-indexes' first."
+        )
+    if not defer:
+        yield
+        return
+    _drop_triggers()
+    db.session.commit()
+    try:
+        yield
+    finally:
+        db.session.rollback()
+        _restore_triggers()
+        db.session.commit()
+
+
 @db_manage_bp.cli.group()
 def db_manage():
     """Database management commands."""
@@ -54,6 +314,210 @@ def add_data():
         print(f"Unexpected error: {e}")
 
 
+@db_manage.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--model", type=click.Choice(sorted(IMPORT_SCHEMAS)), required=True)
+@click.option("--batch-size", default=5000, show_default=True)
+@click.option("--resume", is_flag=True, help="Continue after the last committed batch.")
+@click.option(
+    "--defer-triggers",
+    is_flag=True,
+    help="Drop the search and statistics triggers while writing, rebuild at the end.",
+)
+def import_data(path, model, batch_size, resume, defer_triggers):
+    """Import artists or albums from a JSON array or NDJSON file."""
+    source = f"{model}:{path.resolve()}"[:255]
+    progress = db.session.get(ImportProgress, source)
+    if progress is None:
+        progress = ImportProgress(source=source, records=0)
+        db.session.add(progress)
+    elif not resume:
+        progress.records = 0
+    skipped = progress.records
+    model_class = Artist if model == "artists" else Album
+    schema = IMPORT_SCHEMAS[model]()
+
+    imported = invalid = 0
+    start = time.perf_counter()
+    with open(path, encoding="utf-8") as file, deferred_triggers(defer_triggers):
+        records = islice(iter_json_records(file), skipped, None)
+        while True:
+            try:
+                batch = list(islice(records, batch_size))
+            except ValueError as error:
+                raise click.ClickException(
+                    f"{error} Fix it and continue with --resume."
+                ) from error
+            if not batch:
+                break
+            try:
+                loaded, errors = schema.load(batch, many=True), {}
+            except ValidationError as err:
+                loaded, errors = err.valid_data, dict(err.messages)
+            rows = {i: row for i, row in enumerate(loaded) if i not in errors}
+            _filter_existing_ids(model_class, rows, errors)
+            if model == "albums":
+                _filter_missing_artists(rows, errors)
+            if rows:
+                db.session.execute(insert(model_class), list(rows.values()))
+            progress.records += len(batch)
+            db.session.commit()
+
+            imported += len(rows)
+            invalid += len(errors)
+            first_record = progress.records - len(batch)
+            for index, messages in errors.items():
+                print(f"Record {first_record + index} skipped: {messages}")
+            elapsed = time.perf_counter() - start
+            print(
+                f"Imported {imported} records, skipped {invalid} "
+                f"({imported / elapsed:.0f} rows/s)."
+            )
+
+    if skipped:
+        print(f"Resumed after {skipped} already imported records.")
+    print("Data has been successfully imported to database.")
+
+
+@db_manage.command()
+@click.option("--artists", default=1000, show_default=True)
+@click.option("--albums-per-artist", default=10.0, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+@click.option("--batch-size", default=10000, show_default=True)
+@click.option(
+    "--defer-triggers",
+    is_flag=True,
+    help="Drop the search and statistics triggers while writing, rebuild at the end.",
+)
+def generate(artists, albums_per_artist, seed, batch_size, defer_triggers):
+    """Generate a synthetic catalog of artists and albums."""
+    generator = CatalogGenerator(seed, albums_per_artist)
+    artist_id = db.session.scalar(select(func.max(Artist.id))) or 0
+    album_id = db.session.scalar(select(func.max(Album.id))) or 0
+    artist_rows, album_rows = [], []
+    total_albums = 0
+    start = time.perf_counter()
+
+    def flush():
+        db.session.execute(insert(Artist.__table__), artist_rows)
+        if album_rows:
+            db.session.execute(insert(Album.__table__), album_rows)
+        db.session.commit()
+        artist_rows.clear()
+        album_rows.clear()
+
+    with deferred_triggers(defer_triggers):
+        for index in range(artists):
+            artist_id += 1
+            artist = generator.artist(artist_id)
+            artist_rows.append(artist)
+            for _ in range(generator.album_count()):
+                album_id += 1
+                album_rows.append(generator.album(album_id, artist))
+                total_albums += 1
+            if len(artist_rows) >= batch_size or len(album_rows) >= batch_size:
+                flush()
+                elapsed = time.perf_counter() - start
+                print(
+                    f"Generated {index + 1} artists, {total_albums} albums "
+                    f"({(index + 1 + total_albums) / elapsed:.0f} rows/s)."
+                )
+        if artist_rows:
+            flush()
+    print(f"Generated {artists} artists and {total_albums} albums.")
+
+
+@db_manage.command("index-advice")
+@click.argument("log", type=click.Path(exists=True, dir_okay=False))
+@click.option("--top", default=10, show_default=True)
+def index_advice(log, top):
+    """Propose indexes for the filter/sort combinations in an access log."""
+    patterns = AccessPatternLog.read(log)
+    inspector = inspect(db.engine)
+    proposals = []
+    for (table, filters, sort), seen in patterns.items():
+        if table not in ADVICE_MODELS or not (filters or sort):
+            continue
+        indexes = [index["column_names"] for index in inspector.get_indexes(table)]
+        proposal = _advise(table, filters, sort, indexes)
+        if proposal is not None:
+            benefit = seen * proposal["saving"]
+            proposals.append((benefit, seen, table, filters, sort, proposal))
+
+    if not proposals:
+        print("Existing indexes serve all observed filter/sort combinations.")
+        return
+    proposals.sort(key=lambda item: item[0], reverse=True)
+    for benefit, seen, table, filters, sort, proposal in proposals[:top]:
+        shape = ", ".join(
+            [f"{column} {operator}" for column, operator in filters]
+            + [f"sort {column} {direction}" for column, direction in sort]
+        )
+        columns = proposal["columns"]
+        print(f"{table} ({shape}) seen {seen}x")
+        print(f"  plan: {'; '.join(proposal['plan'])}")
+        print(
+            f'  CREATE INDEX ix_{table}_{"_".join(columns)} '
+            f'ON {table} ({", ".join(columns)});'
+        )
+        print(
+            f"  rows examined per query ~{proposal['rows']:.0f} -> "
+            f"~{proposal['estimated']:.0f}, benefit score {benefit:.3g}"
+        )
+
+
+def _rebuild_stats():
+    """Refills the summary tables from all albums."""
+    songs = func.coalesce(func.sum(Album.number_of_songs), 0)
+    db.session.execute(delete(ArtistStats))
+    db.session.execute(delete(YearStats))
+    db.session.execute(delete(TotalStats))
+    db.session.execute(
+        insert(ArtistStats).from_select(
+            ["artist_id", "albums", "songs", "first_release_year", "last_release_year"],
+            select(
+                Album.artist_id,
+                func.count(),
+                songs,
+                func.min(Album.release_year),
+                func.max(Album.release_year),
+            ).group_by(Album.artist_id),
+        )
+    )
+    db.session.execute(
+        insert(YearStats).from_select(
+            ["release_year", "albums", "songs"],
+            select(Album.release_year, func.count(), songs)
+            .where(Album.release_year.is_not(None))
+            .group_by(Album.release_year),
+        )
+    )
+    db.session.execute(
+        insert(TotalStats).from_select(
+            ["id", "albums", "songs"], select(literal(1), func.count(), songs)
+        )
+    )
+
+
+@db_manage.command("rebuild-stats")
+def rebuild_stats():
+    """Recompute the artist, release year and total statistics from all albums."""
+    _rebuild_stats()
+    db.session.commit()
+    artists = db.session.scalar(select(func.count()).select_from(ArtistStats))
+    years = db.session.scalar(select(func.count()).select_from(YearStats))
+    print(f"Rebuilt statistics of {artists} artists and {years} release years.")
+
+
+@db_manage.command("rebuild-indexes")
+def rebuild_indexes():
+    """Recreate the search and statistics triggers and rebuild their data."""
+    _drop_triggers()
+    _restore_triggers()
+    db.session.commit()
+    print("Rebuilt search indexes, statistics and their triggers.")
+
+
 @db_manage.command()
 def remove_data():
     """Remove all data from database."""
@@ -0,0 +1,208 @@
+"""
+Load generation commands.
+"""
+
+import click
+from flask import current_app
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import json
+import random
+import statistics
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from pathlib import Path
+from threading import Lock, Thread
+
+from app.commands import db_manage_bp
+
+
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def load_scenario(path):
+    """Loads a scenario file and checks its requests are well formed."""
+    scenario = json.loads(Path(path).read_text())
+    requests = scenario.get("requests")
+    if not requests:
+        raise click.BadParameter("Scenario has no requests.", param_hint="SCENARIO")
+    for request in requests:
+        missing = {"name", "path"} - request.keys()
+        if missing:
+            raise click.BadParameter(
+                f"Request is missing {', '.join(sorted(missing))}.",
+                param_hint="SCENARIO",
+            )
+        if request.get("weight", 1) <= 0:
+            raise click.BadParameter(
+                f"Request {request['name']!r} needs a positive weight.",
+                param_hint="SCENARIO",
+            )
+    return scenario
+
+
+def render(template, values):
+    """Substitutes {placeholders} in all strings of a request template."""
+    if isinstance(template, str):
+        return template.format_map(values)
+    if isinstance(template, list):
+        return [render(item, values) for item in template]
+    if isinstance(template, dict):
+        return {key: render(value, values) for key, value in template.items()}
+    return template
+
+
+def send(url, method="GET", payload=None, token=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.read()
+
+
+def authenticate(base_url, user):
+    """Registers the scenario user if needed and returns its token."""
+    send(f"{base_url}/api/auth/register", "POST", user)
+    credentials = {"username": user["username"], "password": user["password"]}
+    status, body = send(f"{base_url}/api/auth/login", "POST", credentials)
+    if status != 200:
+        raise click.ClickException(f"Login failed with status {status}: {body!r}")
+    return json.loads(body)["token"]
+
+
+def histogram(latencies):
+    counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+    for latency in latencies:
+        for index, bound in enumerate(HISTOGRAM_BUCKETS):
+            if latency < bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+    return counts
+
+
+@db_manage_bp.cli.group()
+def perf():
+    """Load testing commands."""
+    pass
+
+
+@perf.command("run")
+@click.argument("scenario", type=click.Path(exists=True, dir_okay=False))
+@click.option("--url", help="Target a running server instead of the app in-process.")
+@click.option("--concurrency", default=8, show_default=True)
+@click.option("--duration", default=10.0, show_default=True, help="Seconds to run.")
+@click.option("--requests", "max_requests", type=int, help="Stop after N requests.")
+@click.option("--seed", default=0, show_default=True)
+def run(scenario, url, concurrency, duration, max_requests, seed):
+    """Replay a weighted request mix from a JSON scenario file."""
+    scenario = load_scenario(scenario)
+    server = None
+    if url is None:
+        server = make_server(
+            "127.0.0.1",
+            0,
+            current_app._get_current_object(),
+            threaded=True,
+            request_handler=QuietRequestHandler,
+        )
+        Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}"
+    url = url.rstrip("/")
+
+    user = scenario.get("user", {})
+    requests = scenario["requests"]
+    token = None
+    if user and any(request.get("auth") for request in requests):
+        token = authenticate(url, user)
+    variables = scenario.get("variables", {})
+    weights = [request.get("weight", 1) for request in requests]
+
+    results = defaultdict(list)
+    errors = defaultdict(int)
+    lock = Lock()
+    sequence = count(1)
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.perf_counter() < deadline:
+            number = next(sequence)
+            if max_requests is not None and number > max_requests:
+                return
+            request = rng.choices(requests, weights)[0]
+            values = {**user, "n": number}
+            for name, (low, high) in variables.items():
+                values[name] = rng.randint(low, high)
+            start = time.perf_counter()
+            try:
+                status, _ = send(
+                    url + render(request["path"], values),
+                    request.get("method", "GET"),
+                    render(request.get("json"), values),
+                    token if request.get("auth") else None,
+                )
+            except OSError:
+                status = None
+            latency = (time.perf_counter() - start) * 1000
+            with lock:
+                results[request["name"]].append(latency)
+                if status is None or status >= 400:
+                    errors[request["name"]] += 1
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(concurrency) as executor:
+            for future in [executor.submit(worker, i) for i in range(concurrency)]:
+                future.result()
+    finally:
+        if server is not None:
+            server.shutdown()
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(latencies) for latencies in results.values())
+    print(
+        f"{total} requests in {elapsed:.1f}s with {concurrency} threads "
+        f"({total / elapsed:.1f} req/s), "
+        f"{sum(errors.values()) / max(total, 1):.1%} errors."
+    )
+    print(
+        f"{'endpoint':<28}{'requests':>9}{'req/s':>9}{'errors':>8}"
+        f"{'mean':>11}{'p50':>11}{'p99':>11}"
+    )
+    for request in requests:
+        latencies = sorted(results.get(request["name"], []))
+        if not latencies:
+            continue
+        name = request["name"]
+        print(
+            f"{name:<28}{len(latencies):>9}{len(latencies) / elapsed:>9.1f}"
+            f"{errors[name] / len(latencies):>8.1%}"
+            f"{statistics.mean(latencies):>8.1f} ms"
+            f"{latencies[len(latencies) // 2]:>8.1f} ms"
+            f"{latencies[max(int(len(latencies) * 0.99) - 1, 0)]:>8.1f} ms"
+        )
+        bounds = [f"<{bound}ms" for bound in HISTOGRAM_BUCKETS] + ["more"]
+        print(
+            "    "
+            + " ".join(
+                f"{bound}:{bucket}"
+                for bound, bucket in zip(bounds, histogram(latencies))
+                if bucket
+            )
+        )
@@ -29,7 +29,8 @@ def not_found_error(error):
 @errors_bp.app_errorhandler(400)
 def bad_request_error(error):
     """400 error."""
-    message = error.data.get("messages", {}).get("json", {})
+    data = getattr(error, "data", None)
+    message = data.get("messages", {}).get("json", {}) if data else error.description
     return ErrorResponse(message, 400).to_response()
 
 
@@ -53,3 +54,13 @@ def internal_server_error(error):
 @errors_bp.app_errorhandler(409)
 def conflict_error(error):
     return ErrorResponse(error.description, 409).to_response()
+
+
+@errors_bp.app_errorhandler(412)
+def precondition_failed_error(error):
+    return ErrorResponse(error.description, 412).to_response()
+
+
+@errors_bp.app_errorhandler(503)
+def service_unavailable_error(error):
+    return ErrorResponse(error.description, 503).to_response()
@@ -0,0 +1,168 @@
+"""
+Per-request phase timings reported in the Server-Timing header.
+"""
+
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+import json
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class Timings:
+    """Accumulated phase durations and SQL statistics of one request."""
+
+    __slots__ = ("start", "phases", "statements", "sql")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.statements = 0
+        self.sql = 0.0
+
+    def add(self, name, duration):
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def header(self, total):
+        metrics = [
+            f"{name};dur={value * 1000:.2f}" for name, value in self.phases.items()
+        ]
+        metrics.append(
+            f'sql;dur={self.sql * 1000:.2f};desc="{self.statements} statements"'
+        )
+        metrics.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+class Instrumentation:
+    """Measures request phases when enabled. Disabled, every hook is a single
+    attribute check and no request or engine listeners are registered.
+    """
+
+    def __init__(self):
+        self.configure()
+
+    def configure(self, enabled=False, log=False):
+        self.enabled = enabled
+        self.log = log
+
+    def init_app(self, app):
+        self.configure(
+            app.config.get("INSTRUMENTATION_ENABLED", False),
+            app.config.get("INSTRUMENTATION_LOG", False),
+        )
+        if not self.enabled:
+            return
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.json = TimedJSONProvider(app)
+
+        # Listening on the Engine class also times the replica engines and the
+        # sync engine behind the ASGI mode's async engine.
+        for name, listener in (
+            ("before_cursor_execute", self._before_execute),
+            ("after_cursor_execute", self._after_execute),
+            ("handle_error", self._discard_execute),
+        ):
+            if not event.contains(Engine, name, listener):
+                event.listen(Engine, name, listener)
+
+    @staticmethod
+    def current():
+        if not has_request_context():
+            return None
+        return g.get("timings")
+
+    def phase(self, name):
+        timings = self.current() if self.enabled else None
+        if timings is None:
+            return nullcontext()
+        return self._measure(timings, name)
+
+    @staticmethod
+    @contextmanager
+    def _measure(timings, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings.add(name, time.perf_counter() - start)
+
+    def _start_request(self):
+        g.timings = Timings()
+
+    def _finish_request(self, response):
+        timings = g.pop("timings", None)
+        if timings is None:
+            return response
+        total = time.perf_counter() - timings.start
+        response.headers["Server-Timing"] = timings.header(total)
+        if self.log:
+            current_app.logger.info(
+                json.dumps(
+                    {
+                        "method": request.method,
+                        "path": request.full_path.rstrip("?"),
+                        "endpoint": request.endpoint,
+                        "status": response.status_code,
+                        "total_ms": round(total * 1000, 3),
+                        "sql_ms": round(timings.sql * 1000, 3),
+                        "statements": timings.statements,
+                        **{
+                            f"{name}_ms": round(value * 1000, 3)
+                            for name, value in timings.phases.items()
+                        },
+                    }
+                )
+            )
+        return response
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, many):
+        conn.info["query_start"] = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, many):
+        start = conn.info.pop("query_start", None)
+        if start is None:
+            return
+        timings = self.current()
+        if timings is not None:
+            timings.statements += 1
+            timings.sql += time.perf_counter() - start
+
+    def _discard_execute(self, exception_context):
+        """Drops the start time of a failed statement, which never reaches
+        after_cursor_execute.
+        """
+        if exception_context.connection is not None:
+            exception_context.connection.info.pop("query_start", None)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider recording the time spent encoding responses."""
+
+    def dumps(self, obj, **kwargs):
+        with instrumentation.phase("json"):
+            return super().dumps(obj, **kwargs)
+
+
+instrumentation = Instrumentation()
+
+
+def timed(name):
+    """Records the decorated function's duration under the given phase."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return func(*args, **kwargs)
+            with instrumentation.phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
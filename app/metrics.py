@@ -0,0 +1,356 @@
+"""
+Prometheus metrics for app, aggregated across worker processes.
+"""
+
+from collections import defaultdict
+from pathlib import Path
+from threading import Lock
+import atexit
+import fcntl
+import json
+import os
+import tempfile
+import time
+import uuid
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "http_requests_total": ("counter", "Requests by endpoint, method and status."),
+    "http_request_duration_seconds": ("histogram", "Request latency by endpoint."),
+    "db_pool_checkouts_total": ("counter", "Connections checked out of the pool."),
+    "db_pool_wait_seconds": ("summary", "Time spent waiting for a pool connection."),
+    "db_pool_checked_out": ("gauge", "Connections currently checked out."),
+    "db_pool_overflow": ("gauge", "Connections opened beyond the pool size."),
+    "db_pool_size": ("gauge", "Configured pool size."),
+    "response_cache_hits_total": ("counter", "Response cache hits."),
+    "response_cache_misses_total": ("counter", "Response cache misses."),
+    "response_cache_evictions_total": ("counter", "Response cache evictions."),
+    "response_cache_entries": ("gauge", "Entries in the local response cache."),
+    "response_cache_bytes": ("gauge", "Bytes held by the local response cache."),
+    "token_cache_hits_total": ("counter", "Token cache hits."),
+    "token_cache_misses_total": ("counter", "Token cache misses."),
+    "token_cache_entries": ("gauge", "Entries in the token cache."),
+}
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def _read_snapshot(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _fold(snapshots):
+    """Sums the counters and histograms of snapshots into one, without gauges."""
+    counters = defaultdict(float)
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            counters[name, labels] += value
+        for name, labels, values in snapshot["histograms"]:
+            merged = histograms.setdefault((name, labels), [0] * len(values))
+            for index, value in enumerate(values):
+                merged[index] += value
+    return {
+        "pid": None,
+        "started": None,
+        "counters": [[*key, value] for key, value in counters.items()],
+        "gauges": [],
+        "histograms": [[*key, value] for key, value in histograms.items()],
+    }
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class TimedQueuePool(QueuePool):
+    """Queue pool recording how long checkouts wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe_pool_wait(time.perf_counter() - start)
+
+
+class Metrics:
+    """Request, pool and cache metrics of this process.
+
+    With a directory configured each process periodically writes a snapshot
+    to ``<pid>-<uuid>.json`` there and a scrape merges the snapshots of all
+    workers. Snapshots of exited workers are folded into ``retired.json``,
+    which keeps their counters and histograms but not their gauges; the
+    uuid keeps a reused pid from overwriting them first.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._pools = []
+        self._pid = None
+        self.configure()
+        atexit.register(self._flush_at_exit)
+
+    def configure(self, enabled=False, directory=None, flush_interval=5):
+        self.enabled = enabled
+        self.directory = Path(directory) if directory else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self._pools.clear()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = defaultdict(float)
+            self.histograms = {}
+            self._flushed = 0.0
+
+    def set_engine_options(self, app):
+        """Makes the engine use a pool that records checkout wait times. Must
+        run before the database extension is initialised.
+        """
+        uri = app.config.get("SQLALCHEMY_DATABASE_URI") or ""
+        in_memory = uri in ("sqlite://", "sqlite:///:memory:")
+        if not app.config.get("METRICS_ENABLED") or in_memory:
+            return
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "poolclass": TimedQueuePool,
+            **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+        }
+
+    def init_app(self, app):
+        self.configure(
+            app.config.get("METRICS_ENABLED", False),
+            app.config.get("METRICS_DIR"),
+            app.config.get("METRICS_FLUSH_INTERVAL", 5),
+        )
+        if not self.enabled:
+            return
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+        from app import db
+
+        with app.app_context():
+            engine = db.engine
+        self._pools.append(engine)
+        event.listen(engine, "checkout", self._checkout)
+
+    def _start_request(self):
+        g.metrics_start = time.perf_counter()
+
+    def _finish_request(self, response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or "unmatched"
+        blueprint = request.blueprint or ""
+        duration = time.perf_counter() - start
+        labels = _labels(blueprint=blueprint, endpoint=endpoint)
+        status_labels = _labels(
+            blueprint=blueprint,
+            endpoint=endpoint,
+            method=request.method,
+            status=response.status_code,
+        )
+        with self._lock:
+            self.counters[("http_requests_total", status_labels)] += 1
+            key = ("http_request_duration_seconds", labels)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    histogram[index] += 1
+            histogram[-2] += duration
+            histogram[-1] += 1
+            flush = (
+                self.directory is not None
+                and time.monotonic() - self._flushed >= self.flush_interval
+            )
+        if flush:
+            self.flush()
+        return response
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.counters[("db_pool_checkouts_total", "")] += 1
+
+    def observe_pool_wait(self, duration):
+        with self._lock:
+            self.counters[("db_pool_wait_seconds_sum", "")] += duration
+            self.counters[("db_pool_wait_seconds_count", "")] += 1
+
+    def _gauges(self):
+        from app.cache import response_cache, token_cache
+
+        gauges, counters = {}, {}
+        for engine in self._pools:
+            pool = engine.pool
+            if isinstance(pool, QueuePool):
+                gauges[("db_pool_checked_out", "")] = pool.checkedout()
+                gauges[("db_pool_overflow", "")] = max(pool.overflow(), 0)
+                gauges[("db_pool_size", "")] = pool.size()
+        responses = response_cache.stats()
+        for tier in ("local", "shared"):
+            key = ("response_cache_hits_total", _labels(tier=tier))
+            counters[key] = responses[f"{tier}_hits"]
+        counters[("response_cache_misses_total", "")] = responses["misses"]
+        counters[("response_cache_evictions_total", "")] = responses["evictions"]
+        gauges[("response_cache_entries", "")] = responses["entries"]
+        gauges[("response_cache_bytes", "")] = responses["bytes"]
+        tokens = token_cache.stats()
+        counters[("token_cache_hits_total", "")] = tokens["hits"]
+        counters[("token_cache_misses_total", "")] = tokens["misses"]
+        gauges[("token_cache_entries", "")] = tokens["entries"]
+        return gauges, counters
+
+    def _identity(self):
+        """Returns the pid, start time and snapshot file name of this process,
+        renewed in a forked child.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._started = time.time()
+                self._name = f"{self._pid}-{uuid.uuid4().hex}.json"
+            return self._pid, self._started, self._name
+
+    def snapshot(self):
+        pid, started, _ = self._identity()
+        gauges, cache_counters = self._gauges()
+        with self._lock:
+            counters = {**self.counters, **cache_counters}
+            histograms = {key: list(value) for key, value in self.histograms.items()}
+        return {
+            "pid": pid,
+            "started": started,
+            "counters": [[*key, value] for key, value in counters.items()],
+            "gauges": [[*key, value] for key, value in gauges.items()],
+            "histograms": [[*key, value] for key, value in histograms.items()],
+        }
+
+    def flush(self):
+        """Writes this process' snapshot atomically to the shared directory."""
+        with self._lock:
+            self._flushed = time.monotonic()
+        _, _, name = self._identity()
+        self._write(self.directory / name, self.snapshot())
+
+    def _write(self, path, snapshot):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump(snapshot, file)
+        os.replace(tmp_path, path)
+
+    def _flush_at_exit(self):
+        if self.enabled and self.directory is not None:
+            self.flush()
+
+    def _collect(self):
+        if self.directory is None:
+            return [self.snapshot()]
+        self.flush()
+        retired_path = self.directory / "retired.json"
+        with open(self.directory / "retired.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            snapshots = {}
+            for path in self.directory.glob("*.json"):
+                snapshot = _read_snapshot(path)
+                if snapshot is not None:
+                    snapshots[path] = snapshot
+            dead = self._find_dead(snapshots, retired_path)
+            if dead:
+                retired = [snapshots.pop(path) for path in dead]
+                if retired_path in snapshots:
+                    retired.append(snapshots[retired_path])
+                snapshots[retired_path] = _fold(retired)
+                self._write(retired_path, snapshots[retired_path])
+                for path in dead:
+                    path.unlink(missing_ok=True)
+        return list(snapshots.values())
+
+    @staticmethod
+    def _find_dead(snapshots, retired_path):
+        """Returns the snapshots of exited processes. Of several snapshots
+        sharing a pid only the last started can belong to a live process.
+        """
+        latest = {}
+        for path, snapshot in snapshots.items():
+            if path == retired_path:
+                continue
+            started = snapshot.get("started") or 0
+            previous = latest.get(snapshot["pid"])
+            if previous is None or started > (snapshots[previous].get("started") or 0):
+                latest[snapshot["pid"]] = path
+        live = {
+            path
+            for pid, path in latest.items()
+            if pid == os.getpid() or _pid_alive(pid)
+        }
+        return [path for path in snapshots if path not in live and path != retired_path]
+
+    def render(self):
+        """Returns the merged metrics in the Prometheus text exposition format."""
+        counters = defaultdict(float)
+        gauges = defaultdict(float)
+        histograms = {}
+        for snapshot in self._collect():
+            for name, labels, value in snapshot["counters"]:
+                counters[name, labels] += value
+            for name, labels, value in snapshot["gauges"]:
+                gauges[name, labels] += value
+            for name, labels, values in snapshot["histograms"]:
+                merged = histograms.setdefault((name, labels), [0] * len(values))
+                for index, value in enumerate(values):
+                    merged[index] += value
+
+        lines = []
+        for name, (kind, description) in HELP.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for (metric, labels), values in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    prefix = f"{labels}," if labels else ""
+                    for bound, value in zip(LATENCY_BUCKETS, values):
+                        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {value}')
+                    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {values[-1]}')
+                    lines.append(f"{name}_sum{{{labels}}} {values[-2]}")
+                    lines.append(f"{name}_count{{{labels}}} {values[-1]}")
+                continue
+            if kind == "summary":
+                for suffix in ("_sum", "_count"):
+                    lines.append(
+                        f"{name}{suffix} {counters.get((name + suffix, ''), 0)}"
+                    )
+                continue
+            values = counters if kind == "counter" else gauges
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(
+                        f"{name}{{{labels}}} {value}" if labels else f"{name} {value}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
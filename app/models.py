@@ -14,9 +14,9 @@ from marshmallow import (
 )
 
 from datetime import datetime, timedelta, timezone
-from werkzeug.security import generate_password_hash, check_password_hash
-
 from app import db
+from app.passwords import password_hasher
+from app.triggers import listen_search_ddl, listen_stats_ddl
 
 
 class Artist(db.Model):
@@ -24,9 +24,9 @@ class Artist(db.Model):
 
     __tablename__ = "Artists"
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(50), nullable=False)
+    name = db.Column(db.String(50), nullable=False, index=True)
     label = db.Column(db.String(50))
-    birth_date = db.Column(db.Date)
+    birth_date = db.Column(db.Date, index=True)
     albums = db.relationship(
         "Album", back_populates="artist", cascade="all, delete-orphan"
     )
@@ -48,11 +48,14 @@ class Album(db.Model):
     """Model for music albums."""
 
     __tablename__ = "Albums"
+    __table_args__ = (
+        db.Index("ix_Albums_artist_id_release_year", "artist_id", "release_year"),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(50), nullable=False)
+    title = db.Column(db.String(50), nullable=False, index=True)
     number_of_songs = db.Column(db.Integer)
     description = db.Column(db.Text)
-    release_year = db.Column(db.Integer)
+    release_year = db.Column(db.Integer, index=True)
     artist_id = db.Column(db.Integer, db.ForeignKey("Artists.id"), nullable=False)
     artist = db.relationship("Artist", back_populates="albums")
 
@@ -64,6 +67,37 @@ class Album(db.Model):
         return value
 
 
+class ArtistStats(db.Model):
+    """Album aggregates per artist, kept up to date by triggers on Albums."""
+
+    __tablename__ = "ArtistStats"
+    artist_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    albums = db.Column(db.Integer, nullable=False, default=0)
+    songs = db.Column(db.Integer, nullable=False, default=0)
+    first_release_year = db.Column(db.Integer)
+    last_release_year = db.Column(db.Integer)
+
+
+class YearStats(db.Model):
+    """Album aggregates per release year, kept up to date by triggers on Albums."""
+
+    __tablename__ = "YearStats"
+    release_year = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    albums = db.Column(db.Integer, nullable=False, default=0)
+    songs = db.Column(db.Integer, nullable=False, default=0)
+
+
+class TotalStats(db.Model):
+    """Album aggregates of the whole catalog in a single row, kept up to date by
+    triggers on Albums.
+    """
+
+    __tablename__ = "TotalStats"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    albums = db.Column(db.Integer, nullable=False, default=0)
+    songs = db.Column(db.Integer, nullable=False, default=0)
+
+
 class User(db.Model):
     """Model for users."""
 
@@ -77,7 +111,7 @@ class User(db.Model):
     @staticmethod
     def generate_hashed_password(password):
         """Generate hashed password for user."""
-        return generate_password_hash(password)
+        return password_hasher.hash(password)
 
     def generate_jwt(self):
         """Generate JWT Token for user."""
@@ -90,7 +124,25 @@ class User(db.Model):
 
     def is_password_valid(self, password):
         """Check that the password to login is valid."""
-        return check_password_hash(self.password, password)
+        return password_hasher.verify(self.password, password)
+
+    def needs_rehash(self):
+        """Check that the password hash uses outdated parameters."""
+        return password_hasher.needs_rehash(self.password)
+
+
+class ImportProgress(db.Model):
+    """Model for progress of data imports."""
+
+    __tablename__ = "ImportProgress"
+    source = db.Column(db.String(255), primary_key=True)
+    records = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+listen_search_ddl(Artist.__table__)
+listen_search_ddl(Album.__table__)
+listen_stats_ddl(Album.__table__)
 
 
 class ArtistSchema(Schema):
@@ -133,6 +185,19 @@ class AlbumSchema(Schema):
             raise ValidationError("Release year must be greater than zero.")
 
 
+class ArtistImportSchema(ArtistSchema):
+    """Artist schema that also loads the id, so exports can be imported back."""
+
+    id = fields.Integer(validate=validate.Range(min=1))
+
+
+class AlbumImportSchema(AlbumSchema):
+    """Album schema that also loads the id, so exports can be imported back."""
+
+    id = fields.Integer(validate=validate.Range(min=1))
+    description = fields.String(allow_none=True)
+
+
 class UserSchema(Schema):
     """Class for serialization user."""
 
@@ -154,7 +219,26 @@ class UserPasswordUpdateSchema(Schema):
     )
 
 
+class ArtistStatsSchema(Schema):
+    """Class for serialization artist statistics."""
+
+    albums = fields.Integer()
+    songs = fields.Integer()
+    first_release_year = fields.Integer()
+    last_release_year = fields.Integer()
+
+
+class YearStatsSchema(Schema):
+    """Class for serialization release year statistics."""
+
+    release_year = fields.Integer()
+    albums = fields.Integer()
+    songs = fields.Integer()
+
+
 artist_schema = ArtistSchema()
 album_schema = AlbumSchema()
 user_schema = UserSchema()
 user_password_update = UserPasswordUpdateSchema()
+artist_stats_schema = ArtistStatsSchema()
+year_stats_schema = YearStatsSchema(many=True)
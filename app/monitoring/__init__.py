@@ -0,0 +1,9 @@
+"""Blueprint for app."""
+
+from flask import Blueprint
+
+
+monitoring_bp = Blueprint("monitoring", __name__)
+metrics_bp = Blueprint("metrics", __name__)
+
+from app.monitoring import monitoring
@@ -0,0 +1,27 @@
+"""
+Runtime statistics for app.
+"""
+
+from flask import Response, jsonify
+
+from app.cache import response_cache, token_cache
+from app.metrics import metrics
+from app.monitoring import monitoring_bp, metrics_bp
+
+
+@monitoring_bp.route("/cache/stats", methods=["GET"])
+def get_cache_stats():
+    return jsonify(
+        {
+            "success": True,
+            "data": {
+                "responses": response_cache.stats(),
+                "tokens": token_cache.stats(),
+            },
+        }
+    )
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
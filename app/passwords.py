@@ -0,0 +1,86 @@
+"""
+Password hashing for app.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from threading import BoundedSemaphore, Lock
+
+from flask import abort
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasher:
+    """Runs the password KDF in a process pool so it does not block the
+    request thread. With zero workers hashing happens inline.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = Lock()
+        self.configure()
+
+    def configure(self, workers=0, queue_size=0, method="scrypt", salt_length=16):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            self.workers = workers
+            self.method = method
+            self.salt_length = salt_length
+            self._method_prefix = None
+            self._slots = BoundedSemaphore(workers + queue_size) if workers else None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=get_context("spawn")
+                )
+            return self._executor
+
+    def _discard_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, func, *args):
+        if self._slots is None:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            abort(503, description="Too many authentication requests. Try again.")
+        try:
+            # A worker that died (OOM kill, crash) breaks the whole pool;
+            # replace it and retry once before giving up.
+            for _ in range(2):
+                executor = self._get_executor()
+                try:
+                    return executor.submit(func, *args).result()
+                except BrokenProcessPool:
+                    self._discard_executor(executor)
+        finally:
+            self._slots.release()
+        abort(503, description="Password hashing is unavailable. Try again.")
+
+    def hash(self, password):
+        return self._run(
+            generate_password_hash, password, self.method, self.salt_length
+        )
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Checks whether the hash was made with outdated parameters."""
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash(
+                "", self.method, self.salt_length
+            ).split("$")[0]
+        method, _, rest = pwhash.partition("$")
+        salt = rest.partition("$")[0]
+        return method != self._method_prefix or len(salt) != self.salt_length
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,165 @@
+"""
+Query recording, repeated statement detection and query budgets.
+"""
+
+from collections import Counter
+from contextlib import ContextDecorator
+from threading import Lock
+import json
+import re
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize(statement):
+    """Reduces a statement to its structure: literals and IN lists collapse to ?."""
+    statement = STRING_RE.sub("?", statement)
+    statement = NUMBER_RE.sub("?", statement)
+    statement = IN_LIST_RE.sub("(?)", statement)
+    return WHITESPACE_RE.sub(" ", statement).strip()
+
+
+def find_repeated(statements, threshold=2):
+    """Returns structurally identical statements executed at least threshold times."""
+    counts = Counter(normalize(statement) for statement in statements)
+    return {statement: n for statement, n in counts.items() if n >= threshold}
+
+
+class QueryRecorder:
+    """Collects the statements executed through any engine while active."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(Engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, "before_cursor_execute", self._record)
+        return False
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+class query_budget(ContextDecorator):
+    """Fails when the block runs more than `limit` statements, or when one
+    statement is repeated more than `repeats` times (an N+1 pattern).
+
+        with query_budget(3, repeats=1):
+            client.get("/api/artists")
+    """
+
+    def __init__(self, limit, repeats=None):
+        self.limit = limit
+        self.repeats = repeats
+
+    def __enter__(self):
+        self.recorder = QueryRecorder().__enter__()
+        return self.recorder
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.recorder.__exit__(exc_type, exc, traceback)
+        if exc_type is not None:
+            return False
+        statements = self.recorder.statements
+        if len(statements) > self.limit:
+            listing = "\n".join(f"  {statement}" for statement in statements)
+            raise AssertionError(
+                f"Query budget exceeded: {len(statements)} > {self.limit}\n{listing}"
+            )
+        if self.repeats is not None:
+            repeated = find_repeated(statements, self.repeats + 1)
+            if repeated:
+                listing = "\n".join(f"  {n}x {s}" for s, n in repeated.items())
+                raise AssertionError(f"Repeated statements:\n{listing}")
+        return False
+
+
+class RepeatedQueryDetector:
+    """Logs statements repeated within one request, in debug mode by default."""
+
+    def init_app(self, app):
+        self.threshold = app.config.get("QUERY_REPEAT_THRESHOLD", 3)
+        enabled = app.config.get("QUERY_DETECTOR_ENABLED")
+        if not (app.debug if enabled is None else enabled):
+            return
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+        from app import db
+
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", self._record)
+
+    def _start_request(self):
+        g.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            statements = g.get("statements")
+            if statements is not None:
+                statements.append(statement)
+
+    def _finish_request(self, response):
+        statements = g.pop("statements", None)
+        for statement, n in find_repeated(statements or (), self.threshold).items():
+            current_app.logger.warning(
+                "Repeated query (%dx) in %s %s [%s]: %s",
+                n,
+                request.method,
+                request.path,
+                request.endpoint,
+                statement,
+            )
+        return response
+
+
+class AccessPatternLog:
+    """Appends the filter and sort columns (never the values) of list requests
+    to a JSON lines file, the input of ``flask db_manage index-advice``.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.configure()
+
+    def configure(self, path=None):
+        self.path = path
+
+    def record(self, table, filters, sort):
+        line = json.dumps({"table": table, "filters": filters, "sort": sort})
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+    @staticmethod
+    def read(path):
+        """Counts the (table, filters, sort) combinations recorded in the file."""
+        patterns = Counter()
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                patterns[
+                    (
+                        entry["table"],
+                        tuple(map(tuple, entry["filters"])),
+                        tuple(map(tuple, entry["sort"])),
+                    )
+                ] += 1
+        return patterns
+
+
+repeated_query_detector = RepeatedQueryDetector()
+access_pattern_log = AccessPatternLog()
@@ -0,0 +1,133 @@
+"""
+Read replica routing for app.
+"""
+
+from itertools import count
+from threading import Lock
+import time
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, text
+
+from app.cache import SharedFile, TTLCache
+
+
+class RoutingSession(Session):
+    """Session sending the SELECTs of a request routed to a replica to that
+    replica's engine. Flushes and every other statement go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context() and not self._flushing:
+            key = g.get("read_replica")
+            if key is not None and getattr(clause, "is_select", False):
+                return read_replicas.engines[key]
+        return super().get_bind(mapper, clause, bind, **kwargs)
+
+
+class ReadReplicas(SharedFile):
+    """Replica engines, their health and the users who must read their writes.
+
+    The engines are kept apart from the binds of the database extension so
+    that ``create_all``, ``drop_all`` and migrations never touch a replica.
+
+    A user who wrote is served by the primary for ``sticky_seconds``. The
+    deadlines are kept in process memory, or in the shared SQLite file when a
+    path is configured, so they hold whichever worker the next request hits.
+    Replicas are probed with ``SELECT 1`` at most every ``check_interval``
+    seconds and skipped while the last probe or query failed.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = Lock()
+        self._next = count()
+        self.configure()
+
+    def configure(self, engines=None, sticky_seconds=5, check_interval=10, path=None):
+        for engine in getattr(self, "engines", {}).values():
+            engine.dispose()
+        self.engines = engines or {}
+        self.names = list(self.engines)
+        self.sticky_seconds = sticky_seconds
+        self.check_interval = check_interval
+        self.path = str(path) if path else None
+        self._writes = TTLCache(maxsize=100000)
+        self._health = {}
+        if self.path is not None:
+            self._connect().execute(
+                "CREATE TABLE IF NOT EXISTS recent_writes "
+                "(user_id INTEGER PRIMARY KEY, until REAL NOT NULL)"
+            )
+
+    def init_app(self, app):
+        """Creates a ``replica_<n>`` engine per configured replica URI."""
+        options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+        uris = app.config.get("READ_REPLICA_URIS") or []
+        self.configure(
+            {
+                f"replica_{n}": create_engine(uri, **options)
+                for n, uri in enumerate(uris, start=1)
+            },
+            app.config.get("READ_REPLICA_STICKY_SECONDS", 5),
+            app.config.get("READ_REPLICA_CHECK_INTERVAL", 10),
+            app.config.get("TABLE_VERSIONS_PATH"),
+        )
+
+    def mark_write(self, user_id):
+        if not self.names:
+            return
+        if self.path is not None:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO recent_writes (user_id, until) VALUES (?, ?)",
+                (user_id, time.time() + self.sticky_seconds),
+            )
+            return
+        self._writes.set(user_id, True, self.sticky_seconds)
+
+    def is_sticky(self, user_id):
+        if user_id is None:
+            return False
+        if self.path is not None:
+            until = self._connect().execute(
+                "SELECT until FROM recent_writes WHERE user_id = ?", (user_id,)
+            )
+            row = until.fetchone()
+            return row is not None and row[0] > time.time()
+        return self._writes.get(user_id, False)
+
+    def mark_failed(self, key):
+        with self._lock:
+            self._health[key] = (False, time.monotonic())
+
+    def _healthy(self, key):
+        with self._lock:
+            state = self._health.get(key)
+        if state is not None and time.monotonic() - state[1] < self.check_interval:
+            return state[0]
+        try:
+            with self.engines[key].connect() as conn:
+                conn.execute(text("SELECT 1"))
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._lock:
+            self._health[key] = (healthy, time.monotonic())
+        return healthy
+
+    def choose(self, user_id=None):
+        """Returns the name of a healthy replica to read from, round-robin,
+        or None when the request has to read from the primary.
+        """
+        if not self.names or self.is_sticky(user_id):
+            return None
+        start = next(self._next)
+        for offset in range(len(self.names)):
+            key = self.names[(start + offset) % len(self.names)]
+            if self._healthy(key):
+                return key
+        return None
+
+
+read_replicas = ReadReplicas()
@@ -0,0 +1,8 @@
+"""Blueprints for app."""
+
+from flask import Blueprint
+
+
+search_bp = Blueprint("search", __name__)
+
+from app.search import search
@@ -0,0 +1,155 @@
+"""
+Full-text search and name autocomplete across artists and albums.
+"""
+
+from flask import abort, current_app, jsonify, request, url_for
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload
+import re
+
+from app import db
+from app.autocomplete import autocomplete
+from app.models import Artist, ArtistSchema, Album, AlbumSchema
+from app.serializers import get_serializer
+from app.utils import conditional, cached
+from app.search import search_bp
+
+
+TOKEN_RE = re.compile(r"\w+")
+MAX_TOKENS = 10
+
+SQLITE_SEARCH = """
+    SELECT 'artist' AS type, rowid AS id,
+        -bm25("ArtistsSearch", 10.0, 2.0) AS score
+    FROM "ArtistsSearch" WHERE "ArtistsSearch" MATCH :query
+    UNION ALL
+    SELECT 'album', rowid, -bm25("AlbumsSearch", 10.0, 1.0)
+    FROM "AlbumsSearch" WHERE "AlbumsSearch" MATCH :query
+    ORDER BY score DESC, type, id LIMIT :limit OFFSET :offset
+"""
+SQLITE_COUNT = """
+    SELECT (SELECT COUNT(*) FROM "ArtistsSearch" WHERE "ArtistsSearch" MATCH :query)
+        + (SELECT COUNT(*) FROM "AlbumsSearch" WHERE "AlbumsSearch" MATCH :query)
+"""
+MYSQL_SEARCH = """
+    SELECT 'artist' AS type, id,
+        MATCH(name, label) AGAINST (:query IN BOOLEAN MODE) AS score
+    FROM Artists WHERE MATCH(name, label) AGAINST (:query IN BOOLEAN MODE)
+    UNION ALL
+    SELECT 'album', id, MATCH(title, description) AGAINST (:query IN BOOLEAN MODE)
+    FROM Albums WHERE MATCH(title, description) AGAINST (:query IN BOOLEAN MODE)
+    ORDER BY score DESC, type, id LIMIT :limit OFFSET :offset
+"""
+MYSQL_COUNT = """
+    SELECT (SELECT COUNT(*) FROM Artists
+            WHERE MATCH(name, label) AGAINST (:query IN BOOLEAN MODE))
+        + (SELECT COUNT(*) FROM Albums
+            WHERE MATCH(title, description) AGAINST (:query IN BOOLEAN MODE))
+"""
+
+
+def search_catalog(tokens, limit, offset=0):
+    """Returns the ranked (type, id, score) hits of a page and the total number
+    of hits. Every token must match, as a word prefix.
+    """
+    if db.engine.dialect.name == "mysql":
+        query = " ".join(f"+{token}*" for token in tokens)
+        search, count = MYSQL_SEARCH, MYSQL_COUNT
+    else:
+        query = " ".join(f'"{token}"*' for token in tokens)
+        search, count = SQLITE_SEARCH, SQLITE_COUNT
+    params = {"query": query, "limit": limit, "offset": offset}
+    hits = db.session.execute(text(search), params).all()
+    total = db.session.execute(text(count), params).scalar()
+    return hits, total
+
+
+def _load_hits(hits):
+    artist_ids = [hit.id for hit in hits if hit.type == "artist"]
+    album_ids = [hit.id for hit in hits if hit.type == "album"]
+    artists = {}
+    if artist_ids:
+        serializer = get_serializer(ArtistSchema, exclude=["albums"])
+        artists = {
+            artist.id: serializer.dump(artist)
+            for artist in Artist.query.filter(Artist.id.in_(artist_ids))
+        }
+    albums = {}
+    if album_ids:
+        serializer = get_serializer(AlbumSchema)
+        albums = {
+            album.id: serializer.dump(album)
+            for album in Album.query.options(joinedload(Album.artist)).filter(
+                Album.id.in_(album_ids)
+            )
+        }
+    loaded = {"artist": artists, "album": albums}
+    return [
+        {
+            "type": hit.type,
+            "score": round(hit.score, 4),
+            "item": loaded[hit.type][hit.id],
+        }
+        for hit in hits
+        if hit.id in loaded[hit.type]
+    ]
+
+
+@search_bp.route("/search", methods=["GET"])
+@conditional("Artists", "Albums")
+@cached("Artists", "Albums")
+def search_artists_and_albums():
+    tokens = TOKEN_RE.findall(request.args.get("q", "").lower())[:MAX_TOKENS]
+    if not tokens:
+        abort(400, description="Query parameter q must contain a word to search.")
+    page = max(request.args.get("page", 1, type=int), 1)
+    limit = max(
+        request.args.get("limit", current_app.config.get("PER_PAGE", 5), type=int), 1
+    )
+    hits, total = search_catalog(tokens, limit, (page - 1) * limit)
+    items = _load_hits(hits)
+
+    params = {key: value for key, value in request.args.items() if key != "page"}
+    pagination = {
+        "count_strategy": "exact",
+        "total_pages": -(-total // limit),
+        "total_records": total,
+        "current_page": url_for(
+            "search.search_artists_and_albums", page=page, **params
+        ),
+    }
+    if page * limit < total:
+        pagination["next_page"] = url_for(
+            "search.search_artists_and_albums", page=page + 1, **params
+        )
+    if page > 1:
+        pagination["previous_page"] = url_for(
+            "search.search_artists_and_albums", page=page - 1, **params
+        )
+
+    return jsonify(
+        {
+            "success": True,
+            "data": items,
+            "number_of_records": len(items),
+            "pagination": pagination,
+        }
+    )
+
+
+@search_bp.route("/autocomplete", methods=["GET"])
+def autocomplete_names():
+    prefix = request.args.get("prefix", "").strip()
+    kind = request.args.get("type", "artist")
+    if not prefix:
+        abort(400, description="Query parameter prefix must not be empty.")
+    if kind not in autocomplete.SOURCES:
+        abort(400, description="Query parameter type must be 'artist' or 'album'.")
+    limit = min(
+        max(request.args.get("limit", 10, type=int), 1),
+        current_app.config.get("AUTOCOMPLETE_MAX_LIMIT", 50),
+    )
+    matches = autocomplete.search(kind, prefix, limit)
+    return jsonify(
+        {"success": True, "data": matches, "number_of_records": len(matches)}
+    )
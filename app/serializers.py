@@ -0,0 +1,127 @@
+"""
+Cached schemas and compiled dump functions for app.
+"""
+
+from functools import lru_cache
+
+from marshmallow import fields, missing
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+
+from app.instrumentation import timed
+
+
+def _compile_value(field):
+    """Returns a value -> serialized value function matching field._serialize."""
+    if isinstance(field, fields.Nested):
+        dump_one = compile_schema(field.schema)
+        if field.many:
+            return lambda value: (
+                None if value is None else [dump_one(v) for v in value]
+            )
+        return lambda value: None if value is None else dump_one(value)
+    if isinstance(field, fields.List):
+        inner = _compile_value(field.inner)
+        if inner is None:
+            return None
+        return lambda value: None if value is None else [inner(v) for v in value]
+    if isinstance(field, fields.DateTime):
+        format_func = field.SERIALIZATION_FUNCS.get(
+            field.format or field.DEFAULT_FORMAT
+        )
+        if format_func is not None:
+            return lambda value: None if value is None else format_func(value)
+        data_format = field.format
+        return lambda value: None if value is None else value.strftime(data_format)
+    if isinstance(field, fields.Integer) and not field.as_string:
+        num_type = field.num_type
+        return lambda value: None if value is None else num_type(value)
+    if type(field) in (fields.String, fields.Email):
+        return lambda value: None if value is None else str(value)
+    return None
+
+
+def _compile_field(name, field):
+    """Returns an obj -> serialized value function for a single schema field."""
+    attribute = field.attribute or name
+    compiled = None
+    if field.dump_default is missing:
+        compiled = _compile_value(field)
+    if compiled is None:
+        return lambda obj: field.serialize(name, obj)
+
+    def serialize(obj):
+        value = getattr(obj, attribute, missing)
+        return missing if value is missing else compiled(value)
+
+    return serialize
+
+
+def compile_schema(schema):
+    """Compiles the schema into a specialized obj -> dict function."""
+    if schema._hooks[PRE_DUMP] or schema._hooks[POST_DUMP]:
+        return lambda obj: schema.dump(obj, many=False)
+
+    compiled_fields = [
+        (
+            field.data_key if field.data_key is not None else name,
+            _compile_field(name, field),
+        )
+        for name, field in schema.dump_fields.items()
+    ]
+
+    def dump_one(obj):
+        ret = {}
+        for key, serialize in compiled_fields:
+            value = serialize(obj)
+            if value is not missing:
+                ret[key] = value
+        return ret
+
+    return dump_one
+
+
+class CompiledSerializer:
+    """Schema paired with its compiled dump function."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self._dump_one = compile_schema(schema)
+
+    @timed("serialize")
+    def dump(self, obj):
+        if self.schema.many:
+            return [self._dump_one(item) for item in obj]
+        return self._dump_one(obj)
+
+
+@lru_cache(maxsize=256)
+def _get_serializer(schema_class, only, exclude, many):
+    return CompiledSerializer(schema_class(only=only, exclude=exclude, many=many))
+
+
+def get_serializer(schema_class, only=None, exclude=(), many=False):
+    """Returns a cached serializer for the normalized only/exclude field set."""
+    if only is not None:
+        only = tuple(sorted(set(only)))
+    return _get_serializer(schema_class, only, tuple(sorted(set(exclude))), many)
+
+
+@lru_cache(maxsize=64)
+def get_row_serializer(schema_class, columns):
+    """Returns a row -> dict function for plain column rows, formatting each
+    column like the schema field of the same name (load-only fields included).
+    """
+    schema = schema_class()
+    compiled_columns = []
+    for column in columns:
+        field = schema.fields.get(column)
+        compiled = _compile_value(field) if field is not None else None
+        compiled_columns.append((column, compiled or (lambda value: value)))
+
+    def dump_row(row):
+        return {
+            column: compiled(getattr(row, column))
+            for column, compiled in compiled_columns
+        }
+
+    return dump_row
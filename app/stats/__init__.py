@@ -0,0 +1,8 @@
+"""Blueprints for app."""
+
+from flask import Blueprint
+
+
+stats_bp = Blueprint("stats", __name__)
+
+from app.stats import stats
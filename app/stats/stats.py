@@ -0,0 +1,58 @@
+"""
+Album statistics per artist and per release year.
+"""
+
+from flask import abort, jsonify
+from sqlalchemy import select
+
+from app import db
+from app.models import (
+    Artist,
+    ArtistStats,
+    YearStats,
+    TotalStats,
+    artist_stats_schema,
+    year_stats_schema,
+)
+from app.utils import conditional, cached
+from app.stats import stats_bp
+
+
+@stats_bp.route("/artists/<int:artist_id>/stats", methods=["GET"])
+@conditional("Artists", "Albums")
+@cached("Artists", "Albums")
+def get_artist_stats(artist_id: int):
+    row = db.session.execute(
+        select(Artist.id, ArtistStats)
+        .outerjoin(ArtistStats, ArtistStats.artist_id == Artist.id)
+        .where(Artist.id == artist_id)
+    ).first()
+    if row is None:
+        abort(404, description=f"Artist with id {artist_id} not found.")
+    stats = row.ArtistStats or ArtistStats(albums=0, songs=0)
+
+    return jsonify(
+        {
+            "success": True,
+            "data": {"artist_id": artist_id, **artist_stats_schema.dump(stats)},
+        }
+    )
+
+
+@stats_bp.route("/stats", methods=["GET"])
+@conditional("Albums")
+@cached("Albums")
+def get_stats():
+    totals = db.session.get(TotalStats, 1) or TotalStats(albums=0, songs=0)
+    years = db.session.scalars(select(YearStats).order_by(YearStats.release_year))
+
+    return jsonify(
+        {
+            "success": True,
+            "data": {
+                "albums": totals.albums,
+                "songs": totals.songs,
+                "years": year_stats_schema.dump(years),
+            },
+        }
+    )
@@ -0,0 +1,197 @@
+"""
+Triggers keeping the search indexes and summary tables in sync with Albums
+and Artists. Migrations d41c7e3b8f65 and 7c2f9a4e1b30 carry frozen copies of
+this SQL; tests/test_triggers.py checks they still match.
+"""
+
+from sqlalchemy import DDL, event
+
+
+SEARCH_COLUMNS = {"Artists": ("name", "label"), "Albums": ("title", "description")}
+
+
+def search_triggers(table, columns):
+    """Returns the statements creating the triggers keeping the FTS5 index of a
+    table in sync with every insert, update and delete.
+    """
+    search = f"{table}Search"
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    delete = (
+        f'INSERT INTO "{search}"("{search}", rowid, {names}) '
+        f"VALUES ('delete', old.id, {old});"
+    )
+    insert = f'INSERT INTO "{search}"(rowid, {names}) VALUES (new.id, {new});'
+    return [
+        f'CREATE TRIGGER "{table}_search_insert" AFTER INSERT ON "{table}" '
+        f"BEGIN {insert} END",
+        f'CREATE TRIGGER "{table}_search_delete" AFTER DELETE ON "{table}" '
+        f"BEGIN {delete} END",
+        f'CREATE TRIGGER "{table}_search_update" AFTER UPDATE OF {names} '
+        f'ON "{table}" BEGIN {delete} {insert} END',
+    ]
+
+
+def search_rebuild(table):
+    """Returns the statement rebuilding the FTS5 index of a table in one pass."""
+    return f'INSERT INTO "{table}Search"("{table}Search") VALUES (\'rebuild\')'
+
+
+def search_ddl(table, columns):
+    """Returns the statements creating the FTS5 index of a table and the
+    triggers keeping it in sync with every insert, update and delete.
+    """
+    return [
+        f'CREATE VIRTUAL TABLE "{table}Search" USING fts5({", ".join(columns)}, '
+        f"content='{table}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        *search_triggers(table, columns),
+        search_rebuild(table),
+    ]
+
+
+def listen_search_ddl(table):
+    """Creates the full-text index together with the table."""
+    columns = SEARCH_COLUMNS[table.name]
+    for statement in search_ddl(table.name, columns):
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    fulltext = (
+        f"ALTER TABLE {table.name} ADD FULLTEXT INDEX "
+        f"ix_{table.name}_fulltext ({', '.join(columns)})"
+    )
+    event.listen(table, "after_create", DDL(fulltext).execute_if(dialect="mysql"))
+    drop = f'DROP TABLE IF EXISTS "{table.name}Search"'
+    event.listen(table, "before_drop", DDL(drop).execute_if(dialect="sqlite"))
+
+
+def _stats_changes(dialect, row, sign):
+    """Returns the statements adding (sign 1) or removing (sign -1) one album
+    row, ``new`` or ``old``, to or from the summary tables.
+    """
+    if dialect == "mysql":
+        artist_stats, year_stats, albums = "ArtistStats", "YearStats", "Albums"
+        artist_upsert = year_upsert = (
+            "ON DUPLICATE KEY UPDATE albums = albums + VALUES(albums), "
+            "songs = songs + VALUES(songs)"
+        )
+        dual = " FROM DUAL"
+    else:
+        artist_stats, year_stats, albums = '"ArtistStats"', '"YearStats"', '"Albums"'
+        update = (
+            "DO UPDATE SET albums = albums + excluded.albums, "
+            "songs = songs + excluded.songs"
+        )
+        artist_upsert = f"ON CONFLICT (artist_id) {update}"
+        year_upsert = f"ON CONFLICT (release_year) {update}"
+        dual = ""
+    songs = f"{sign} * COALESCE({row}.number_of_songs, 0)"
+    artist = f"artist_id = {row}.artist_id"
+    year = f"release_year = {row}.release_year"
+    return [
+        f"INSERT INTO {artist_stats} (artist_id, albums, songs) "
+        f"VALUES ({row}.artist_id, {sign}, {songs}) {artist_upsert};",
+        f"UPDATE {artist_stats} SET "
+        f"first_release_year = (SELECT MIN(release_year) FROM {albums} "
+        f"WHERE {artist}), "
+        f"last_release_year = (SELECT MAX(release_year) FROM {albums} "
+        f"WHERE {artist}) WHERE {artist};",
+        f"DELETE FROM {artist_stats} WHERE {artist} AND albums = 0;",
+        f"INSERT INTO {year_stats} (release_year, albums, songs) "
+        f"SELECT {row}.release_year, {sign}, {songs}{dual} "
+        f"WHERE {row}.release_year IS NOT NULL {year_upsert};",
+        f"DELETE FROM {year_stats} WHERE {year} AND albums = 0;",
+    ]
+
+
+def stats_ddl(dialect):
+    """Returns the statements creating the triggers that apply every insert,
+    update and delete on Albums to ArtistStats and YearStats. First and last
+    release years are re-read through the (artist_id, release_year) index.
+    """
+    triggers = {
+        "insert": ("AFTER INSERT", _stats_changes(dialect, "new", 1)),
+        "delete": ("AFTER DELETE", _stats_changes(dialect, "old", -1)),
+        "update": (
+            (
+                "AFTER UPDATE"
+                if dialect == "mysql"
+                else "AFTER UPDATE OF artist_id, number_of_songs, release_year"
+            ),
+            _stats_changes(dialect, "old", -1) + _stats_changes(dialect, "new", 1),
+        ),
+    }
+    if dialect == "mysql":
+        return [
+            f"CREATE TRIGGER Albums_stats_{action} {timing} ON Albums "
+            f"FOR EACH ROW BEGIN {' '.join(body)} END"
+            for action, (timing, body) in triggers.items()
+        ]
+    return [
+        f'CREATE TRIGGER "Albums_stats_{action}" {timing} ON "Albums" '
+        f"BEGIN {' '.join(body)} END"
+        for action, (timing, body) in triggers.items()
+    ]
+
+
+def totals_ddl(dialect):
+    """Returns the statements creating the triggers that apply every insert,
+    update and delete on Albums to the single TotalStats row, which also
+    counts albums without a release year.
+    """
+    if dialect == "mysql":
+        upsert = (
+            "INSERT INTO TotalStats (id, albums, songs) "
+            "VALUES (1, {albums}, {songs}) "
+            "ON DUPLICATE KEY UPDATE albums = albums + VALUES(albums), "
+            "songs = songs + VALUES(songs);"
+        )
+        create = "CREATE TRIGGER Albums_totals_{action} {timing} ON Albums FOR EACH ROW"
+        update = "AFTER UPDATE"
+    else:
+        upsert = (
+            'INSERT INTO "TotalStats" (id, albums, songs) '
+            "VALUES (1, {albums}, {songs}) "
+            "ON CONFLICT (id) DO UPDATE SET albums = albums + excluded.albums, "
+            "songs = songs + excluded.songs;"
+        )
+        create = 'CREATE TRIGGER "Albums_totals_{action}" {timing} ON "Albums"'
+        update = "AFTER UPDATE OF number_of_songs"
+    new, old = "COALESCE(new.number_of_songs, 0)", "COALESCE(old.number_of_songs, 0)"
+    triggers = {
+        "insert": ("AFTER INSERT", 1, new),
+        "delete": ("AFTER DELETE", -1, f"-{old}"),
+        "update": (update, 0, f"{new} - {old}"),
+    }
+    return [
+        f"{create.format(action=action, timing=timing)} "
+        f"BEGIN {upsert.format(albums=albums, songs=songs)} END"
+        for action, (timing, albums, songs) in triggers.items()
+    ]
+
+
+def listen_stats_ddl(table):
+    """Creates the summary triggers together with the Albums table."""
+    for dialect in ("sqlite", "mysql"):
+        for statement in stats_ddl(dialect) + totals_ddl(dialect):
+            event.listen(
+                table, "after_create", DDL(statement).execute_if(dialect=dialect)
+            )
+
+
+def maintenance_triggers(dialect):
+    """Returns the (name, create statement) pairs of the triggers maintaining
+    the search indexes and summary tables, which bulk loads drop and recreate.
+    """
+    actions = ("insert", "delete", "update")
+    triggers = []
+    if dialect == "sqlite":
+        for table, columns in SEARCH_COLUMNS.items():
+            names = [f"{table}_search_{action}" for action in actions]
+            triggers += zip(names, search_triggers(table, columns))
+    if dialect in ("sqlite", "mysql"):
+        names = [f"Albums_stats_{action}" for action in actions]
+        triggers += zip(names, stats_ddl(dialect))
+        names = [f"Albums_totals_{action}" for action in actions]
+        triggers += zip(names, totals_ddl(dialect))
+    return triggers
@@ -3,19 +3,58 @@ Utils for app.
 """
 
 from flask import (
+    g,
     request,
     url_for,
     current_app,
     abort,
+    make_response,
+    Response,
+    stream_with_context,
 )
 
 import jwt
-from werkzeug.exceptions import UnsupportedMediaType
+from webargs.flaskparser import FlaskParser
+from sqlalchemy import and_, or_, false, func, text, inspect, select
+from sqlalchemy.orm import load_only, joinedload, selectinload
+from marshmallow import fields as ma_fields, ValidationError
+from sqlalchemy.exc import DBAPIError
+from werkzeug.exceptions import HTTPException, UnsupportedMediaType
 from functools import wraps
+from datetime import date
+import base64
+import binascii
+import csv
+import hashlib
+import io
+import json
 import re
 
+from app import db
+from app.cache import TTLCache, table_versions, response_cache, token_cache
+from app.instrumentation import instrumentation, timed
+from app.queries import access_pattern_log
+from app.replicas import read_replicas
+from app.serializers import get_row_serializer, get_serializer
+
 
 COMPARISON_OPERATORS_RE = re.compile(r"(.*)\[(gte|gt|lte|lt)]")
+RESERVED_ARGS = {"fields", "sort", "page", "limit", "cursor", "count"}
+COUNT_STRATEGIES = {"exact", "cached", "estimated", "none"}
+
+count_cache = TTLCache()
+
+
+class InstrumentedParser(FlaskParser):
+    """Flask parser timing request argument parsing."""
+
+    def parse(self, *args, **kwargs):
+        with instrumentation.phase("args"):
+            return super().parse(*args, **kwargs)
+
+
+parser = InstrumentedParser()
+use_args = parser.use_args
 
 
 def validate_content_type(func):
@@ -29,16 +68,17 @@ def validate_content_type(func):
     return wrapper
 
 
-def token_required(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        token = None
-        auth = request.headers.get("Authorization")
-        if auth:
-            token = auth.split(" ")[1]
-        if token is None:
-            abort(401, description="Missing token. Please login or register.")
+@timed("auth")
+def _get_token_payload():
+    token = None
+    auth = request.headers.get("Authorization")
+    if auth:
+        token = auth.split(" ")[1]
+    if token is None:
+        abort(401, description="Missing token. Please login or register.")
 
+    payload = token_cache.get(token)
+    if payload is None:
         try:
             payload = jwt.decode(
                 token, current_app.config.get("SECRET_KEY"), algorithms=["HS256"]
@@ -47,12 +87,186 @@ def token_required(func):
             abort(401, description="Expired token. Please login to get new token.")
         except jwt.InvalidTokenError:
             abort(401, description="Invalid token. Please login or register.")
-        else:
-            return func(payload["user_id"], *args, **kwargs)
+        token_cache.set(token, payload, current_app.config.get("TOKEN_CACHE_TTL", 300))
+    return payload
+
+
+def token_required(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        user_id = _get_token_payload()["user_id"]
+        response = func(user_id, *args, **kwargs)
+        if request.method not in {"GET", "HEAD"}:
+            read_replicas.mark_write(user_id)
+        return response
+
+    return wrapper
+
+
+def _get_user_id():
+    """Returns the user of a valid token sent with the request, if any."""
+    if not request.headers.get("Authorization"):
+        return None
+    try:
+        return _get_token_payload()["user_id"]
+    except HTTPException:
+        return None
+
+
+def read_replica(func):
+    """Runs the SELECTs of a read-only view on a healthy read replica.
+
+    Users who wrote recently read from the primary. A replica failing while
+    the view runs is marked unhealthy and the view is retried on the primary.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not read_replicas.names:
+            return func(*args, **kwargs)
+        g.read_replica = read_replicas.choose(_get_user_id())
+        if g.read_replica is None:
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        except DBAPIError:
+            db.session.rollback()
+            read_replicas.mark_failed(g.read_replica)
+            g.read_replica = None
+            return func(*args, **kwargs)
 
     return wrapper
 
 
+def _get_etag(tables):
+    """Derives a strong ETag from the table versions and the requested URL."""
+    args = sorted(request.args.items(multi=True))
+    raw = f"{table_versions.epoch}|{request.path}|{args}|{table_versions.get(*tables)}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional(*tables):
+    """Honors If-None-Match on list reads using table ETags.
+
+    Process-local table versions miss the writes of other workers, so ETags are
+    not emitted unless the versions are shared.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not table_versions.shared:
+                return func(*args, **kwargs)
+            etag = _get_etag(tables)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            response = make_response(func(*args, **kwargs))
+            # Replicas may lag, so their data is not tagged with primary versions.
+            if response.status_code < 300 and not g.get("read_replica"):
+                response.set_etag(etag)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def get_row_etag(data):
+    """Derives a strong ETag from the serialized state of one row."""
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def tag_row_response(response):
+    """Tags a detail response with the ETag of its data, answering 304 when it
+    matches If-None-Match.
+    """
+    if response.status_code != 200 or not response.is_json:
+        return response
+    etag = get_row_etag(response.get_json()["data"])
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def row_conditional(model, schema_class):
+    """Honors If-None-Match on reads and If-Match on writes of one row using an
+    ETag hashed from its detail representation.
+
+    The tag changes only when the row or the rows nested in it change, and
+    needs no table versions shared between workers.
+    """
+
+    def get_current_etag(row_id):
+        row = db.session.get(model, row_id)
+        if row is None:
+            return None
+        return get_row_etag(get_serializer(schema_class).dump(row))
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if request.method in {"GET", "HEAD"}:
+                return tag_row_response(make_response(func(*args, **kwargs)))
+            (row_id,) = request.view_args.values()
+            if request.if_match:
+                etag = get_current_etag(row_id)
+                if etag is not None and not request.if_match.contains(etag):
+                    abort(412, description="Resource has been modified.")
+
+            response = make_response(func(*args, **kwargs))
+            if response.status_code < 300:
+                etag = get_current_etag(row_id)
+                if etag is not None:
+                    response.set_etag(etag)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def get_cache_key(tables):
+    """Keys a response by endpoint, URL arguments and table versions."""
+    return "|".join(
+        str(part)
+        for part in (
+            request.endpoint,
+            sorted(request.view_args.items()),
+            sorted(request.args.items(multi=True)),
+            table_versions.epoch,
+            table_versions.get(*tables),
+        )
+    )
+
+
+def cached(*tables):
+    """Serves successful responses from the response cache."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not response_cache.max_bytes:
+                return func(*args, **kwargs)
+            key = get_cache_key(tables)
+            body = response_cache.get(key)
+            if body is not None:
+                return current_app.response_class(body, mimetype="application/json")
+
+            response = make_response(func(*args, **kwargs))
+            if response.status_code == 200 and not g.get("read_replica"):
+                response_cache.set(key, response.get_data(), tables)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
 def get_schema_args(model):
     """Returns schema arguments with optional field filtering."""
     schema_args = {"many": True}
@@ -64,8 +278,40 @@ def get_schema_args(model):
     return schema_args
 
 
-def apply_orders(model, query):
-    """Applies sorting to the query based on provided sort keys."""
+@timed("query")
+def apply_projection(model, query, schema):
+    """Restricts the loaded columns to the requested fields and sort keys."""
+    if schema.only is None:
+        return query
+    columns = {getattr(model, field) for field in schema.only}
+    columns.update(column_attr for column_attr, _ in get_sort_keys(model))
+    return query.options(load_only(model.id, *columns))
+
+
+def _is_nested(field):
+    if isinstance(field, ma_fields.List):
+        field = field.inner
+    return isinstance(field, (ma_fields.Nested, ma_fields.Pluck))
+
+
+@timed("query")
+def apply_eager_loading(model, query, schema):
+    """Eagerly loads the relationships the schema is going to serialize."""
+    relationships = inspect(model).relationships
+    for name, field in schema.dump_fields.items():
+        relationship = relationships.get(field.attribute or name)
+        if relationship is None or not _is_nested(field):
+            continue
+        attr = getattr(model, relationship.key)
+        query = query.options(
+            selectinload(attr) if relationship.uselist else joinedload(attr)
+        )
+    return query
+
+
+def get_sort_keys(model):
+    """Returns (column, descending) pairs for the requested sort keys."""
+    keys = []
     sort_keys = request.args.get("sort")
     if sort_keys:
         for key in sort_keys.split(","):
@@ -73,17 +319,23 @@ def apply_orders(model, query):
             if key.startswith("-"):
                 key = key[1:]
                 flag = True
-            column_attr = getattr(model, key, None)
-            if column_attr is not None:
-                query = (
-                    query.order_by(column_attr.desc())
-                    if flag
-                    else query.order_by(column_attr)
-                )
+            if key in model.__table__.columns:
+                keys.append((getattr(model, key), flag))
+    return keys
+
+
+@timed("query")
+def apply_orders(model, query):
+    """Applies sorting to the query based on provided sort keys."""
+    for column_attr, flag in get_sort_keys(model):
+        query = (
+            query.order_by(column_attr.desc()) if flag else query.order_by(column_attr)
+        )
     return query
 
 
-def _get_filter_argument(column_name, value, operator):
+def get_filter_argument(column_name, value, operator):
+    """Returns the criterion comparing a column with a value using an operator."""
     operator_mapping = {
         "==": column_name == value,
         "gte": column_name >= value,
@@ -94,42 +346,357 @@ def _get_filter_argument(column_name, value, operator):
     return operator_mapping[operator]
 
 
-def apply_filter(model, query):
-    """Apply filter to records."""
-    for param, value in request.args.items():
-        if param not in {"fields", "sort", "page", "limit"}:
+def get_filters(model, args=None):
+    """Returns the normalized (column, operator, value) filters of the request."""
+    filters = []
+    for param, value in (request.args if args is None else args).items():
+        if param not in RESERVED_ARGS:
             operator = "=="
             match = COMPARISON_OPERATORS_RE.match(param)
             if match is not None:
                 param, operator = match.groups()
-            column_attr = getattr(model, param, None)
-            if column_attr is not None:
+            if param in model.__table__.columns:
                 value = model.additional_validate(param, value)
                 if value is None:
                     continue
-                filter_argument = _get_filter_argument(column_attr, value, operator)
-                query = query.filter(filter_argument)
+                filters.append((param, operator, value))
+    return sorted(filters, key=str)
+
+
+def get_filter_criteria(model, args=None):
+    """Returns SQL criteria for the filters of the request."""
+    return [
+        get_filter_argument(getattr(model, param), value, operator)
+        for param, operator, value in get_filters(model, args)
+    ]
+
+
+@timed("query")
+def apply_filter(model, query):
+    """Apply filter to records."""
+    for filter_argument in get_filter_criteria(model):
+        query = query.filter(filter_argument)
     return query
 
 
-def get_pagination(query, func_name):
-    """Apply pagination to records."""
-    page = request.args.get("page", 1, type=int)
+def _encode_cursor(values):
+    raw = json.dumps(
+        [value.isoformat() if isinstance(value, date) else value for value in values]
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(token, keys):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError
+        return [
+            (
+                date.fromisoformat(value)
+                if value is not None and column_attr.type.python_type is date
+                else value
+            )
+            for (column_attr, _), value in zip(keys, values)
+        ]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        abort(400, description="Invalid cursor.")
+
+
+def _seek_after(column_attr, value, descending):
+    # SQLite and MySQL sort NULLs first in ascending order, last in descending.
+    if value is None:
+        return false() if descending else column_attr.is_not(None)
+    if descending:
+        return or_(column_attr < value, column_attr.is_(None))
+    return column_attr > value
+
+
+def _seek_predicate(keys, values):
+    """Builds the keyset predicate selecting rows after the given sort values."""
+    clauses = []
+    for index, ((column_attr, descending), value) in enumerate(zip(keys, values)):
+        equal = [
+            attr.is_(None) if previous is None else attr == previous
+            for (attr, _), previous in zip(keys[:index], values[:index])
+        ]
+        clauses.append(and_(*equal, _seek_after(column_attr, value, descending)))
+    return or_(*clauses)
+
+
+def prepare_cursor_query(model, query):
+    """Orders the query by the sort keys plus id and seeks past the cursor.
+
+    Returns the query, the sort keys and the requested page size.
+    """
+    cursor = request.args.get("cursor", "")
     limit = request.args.get("limit", current_app.config.get("PER_PAGE", 5), type=int)
-    params = {key: value for key, value in request.args.items() if key != "page"}
-    paginate_obj = query.paginate(page=page, per_page=limit, error_out=False)
+    if limit < 1:
+        abort(400, description="Limit must be a positive integer.")
+    keys = get_sort_keys(model)
+    if not any(column_attr.key == "id" for column_attr, _ in keys):
+        keys.append((model.id, False))
+        query = query.order_by(model.id)
+    if cursor:
+        query = query.filter(_seek_predicate(keys, _decode_cursor(cursor, keys)))
+    return query, keys, limit
+
+
+def get_cursor_page(items, keys, limit, func_name):
+    """Trims the limit + 1 loaded items to a page and links the next page."""
+    cursor = request.args.get("cursor", "")
+    params = {
+        key: value
+        for key, value in request.args.items()
+        if key not in {"page", "cursor"}
+    }
     pagination = {
-        "total_pages": paginate_obj.pages,
-        "total_records": paginate_obj.total,
-        "current_page": url_for(func_name, page=page, **params),
+        "count_strategy": "none",
+        "current_page": url_for(func_name, cursor=cursor, **params),
     }
-    if paginate_obj.has_next:
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = _encode_cursor(
+            [getattr(items[-1], column_attr.key) for column_attr, _ in keys]
+        )
+        pagination["next_cursor"] = next_cursor
+        pagination["next_page"] = url_for(func_name, cursor=next_cursor, **params)
+
+    return items, pagination
+
+
+def get_cursor_pagination(model, query, func_name):
+    """Apply keyset pagination to records, seeking past the cursor sort keys."""
+    query, keys, limit = prepare_cursor_query(model, query)
+    return get_cursor_page(query.limit(limit + 1).all(), keys, limit, func_name)
+
+
+SQLITE_HAS_STATISTICS = text(
+    "SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'"
+)
+
+
+def estimate_count_statement(model, dialect_name):
+    """Returns a statement selecting the row count kept in the database
+    statistics for the whole table, or None when the dialect has none.
+
+    On SQLite the statistics are written by ANALYZE, so run
+    ``SQLITE_HAS_STATISTICS`` first.
+    """
+    if dialect_name == "mysql":
+        return text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ).bindparams(table=model.__tablename__)
+    if dialect_name == "sqlite":
+        # The first number of every stat is the row count of the table.
+        return text(
+            "SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = :table LIMIT 1"
+        ).bindparams(table=model.__tablename__)
+    return None
+
+
+def count_statement(query):
+    """Returns a statement counting the rows of a select, ignoring its order."""
+    return select(func.count()).select_from(query.order_by(None).subquery())
+
+
+def count_cache_key(model, filters):
+    return (model.__tablename__, table_versions.get(model.__tablename__), *filters)
+
+
+def _estimate_count(model):
+    """Returns a cheap row estimate for the whole table of the model, or None
+    when the database keeps no statistics for it.
+    """
+    dialect_name = db.session.get_bind().dialect.name
+    statement = estimate_count_statement(model, dialect_name)
+    if statement is None or (
+        dialect_name == "sqlite" and not db.session.scalar(SQLITE_HAS_STATISTICS)
+    ):
+        return None
+    return db.session.execute(statement).scalar()
+
+
+@timed("count")
+def _get_count(model, query, strategy):
+    """Returns the total number of records and the strategy actually used."""
+    filters = get_filters(model)
+    if strategy == "estimated" and not filters:
+        total = _estimate_count(model)
+        if total is not None:
+            return total, strategy
+    if strategy == "cached":
+        key = count_cache_key(model, filters)
+        total = count_cache.get(key)
+        if total is None:
+            total = query.order_by(None).count()
+            count_cache.set(
+                key, total, current_app.config.get("PAGINATION_COUNT_TTL", 60)
+            )
+        return total, strategy
+    if strategy == "none":
+        return None, strategy
+    return query.order_by(None).count(), "exact"
+
+
+def record_access_pattern(model):
+    """Logs the filtered and sorted columns of the request for index advice."""
+    access_pattern_log.record(
+        model.__tablename__,
+        [[column, operator] for column, operator, _ in get_filters(model)],
+        [
+            [column.key, "desc" if flag else "asc"]
+            for column, flag in get_sort_keys(model)
+        ],
+    )
+
+
+def get_page_args():
+    """Returns the requested page, page size and count strategy."""
+    page = request.args.get("page", 1, type=int)
+    limit = request.args.get("limit", current_app.config.get("PER_PAGE", 5), type=int)
+    strategy = request.args.get(
+        "count", current_app.config.get("PAGINATION_COUNT", "exact")
+    )
+    if strategy not in COUNT_STRATEGIES:
+        abort(400, description=f"Count must be one of: {sorted(COUNT_STRATEGIES)}.")
+    return page, limit, strategy
+
+
+def get_page_links(paginate_obj, page, strategy, func_name):
+    """Returns the pagination block of a page of results."""
+    params = {key: value for key, value in request.args.items() if key != "page"}
+    pagination = {"count_strategy": strategy}
+    if paginate_obj.total is not None:
+        pagination["total_pages"] = paginate_obj.pages
+        pagination["total_records"] = paginate_obj.total
+    pagination["current_page"] = url_for(func_name, page=page, **params)
+
+    has_next = (
+        len(paginate_obj.items) == paginate_obj.per_page
+        if paginate_obj.total is None
+        else paginate_obj.has_next
+    )
+    if has_next:
         pagination["next_page"] = url_for(func_name, page=page + 1, **params)
 
     if paginate_obj.has_prev:
         pagination["previous_page"] = url_for(func_name, page=page - 1, **params)
 
-    return paginate_obj.items, pagination
+    return pagination
+
+
+def get_pagination(model, query, func_name):
+    """Apply pagination to records."""
+    if access_pattern_log.path is not None:
+        record_access_pattern(model)
+    if "cursor" in request.args:
+        return get_cursor_pagination(model, query, func_name)
+
+    page, limit, strategy = get_page_args()
+    paginate_obj = query.paginate(
+        page=page, per_page=limit, error_out=False, count=False
+    )
+    paginate_obj.total, strategy = _get_count(model, query, strategy)
+    return paginate_obj.items, get_page_links(paginate_obj, page, strategy, func_name)
+
+
+def export_response(model, schema_class):
+    """Streams the filtered and sorted table as NDJSON or CSV.
+
+    Rows are fetched as plain column tuples in batches of EXPORT_BATCH_SIZE
+    through a server-side cursor, so memory use does not grow with the table.
+    """
+    fields = get_schema_args(model).get("only") or [
+        column.key for column in model.__table__.columns
+    ]
+    columns = tuple(dict.fromkeys(fields))
+    query = select(*(getattr(model, column) for column in columns))
+    query = apply_orders(model, query)
+    query = apply_filter(model, query)
+    query = query.execution_options(
+        yield_per=current_app.config.get("EXPORT_BATCH_SIZE", 1000)
+    )
+    dump_row = get_row_serializer(schema_class, columns)
+    mimetype = request.accept_mimetypes.best_match(
+        ["application/x-ndjson", "text/csv"], default="application/x-ndjson"
+    )
+
+    def generate_ndjson():
+        for partition in db.session.execute(query).partitions():
+            yield "".join(json.dumps(dump_row(row)) + "\n" for row in partition)
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns)
+        writer.writeheader()
+        for partition in db.session.execute(query).partitions():
+            writer.writerows(dump_row(row) for row in partition)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    generate = generate_csv if mimetype == "text/csv" else generate_ndjson
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+def get_bulk_items():
+    """Returns the list of items sent to a bulk endpoint."""
+    items = request.get_json()
+    if not isinstance(items, list) or not items:
+        abort(400, description="Request body must be a non-empty list of items.")
+    max_items = current_app.config.get("BULK_MAX_ITEMS", 1000)
+    if len(items) > max_items:
+        abort(400, description=f"At most {max_items} items can be sent at once.")
+    return items
+
+
+def load_bulk(schema, items):
+    """Validates all items in one pass, returning valid rows by index and
+    per-item errors."""
+    try:
+        loaded, errors = schema.load(items, many=True), {}
+    except ValidationError as err:
+        loaded, errors = err.valid_data, dict(err.messages)
+    rows = {index: row for index, row in enumerate(loaded) if index not in errors}
+    return rows, errors
+
+
+def check_bulk_errors(errors):
+    """Rejects the whole request on any invalid item unless ?partial=true."""
+    if errors and request.args.get("partial", "false").lower() != "true":
+        abort(400, description=errors)
+
+
+def get_bulk_criteria(model):
+    """Returns criteria selecting the rows targeted by a bulk update or delete.
+
+    The body selects rows by "ids", by a "filter" using the same syntax as the
+    list query arguments, or by both.
+    """
+    body = request.get_json()
+    if not isinstance(body, dict):
+        abort(400, description="Request body must be an object.")
+    criteria = []
+    ids = body.get("ids")
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            abort(400, description="Ids must be a list of integers.")
+        criteria.append(model.id.in_(ids))
+    filters = body.get("filter")
+    if filters is not None:
+        if not isinstance(filters, dict) or not filters:
+            abort(400, description="Filter must be a non-empty object.")
+        args = {param: str(value) for param, value in filters.items()}
+        if len(get_filters(model, args)) != len(args):
+            abort(400, description="Filter contains unknown fields or invalid values.")
+        criteria.extend(get_filter_criteria(model, args))
+    if not criteria:
+        abort(400, description="Provide ids or filter to select records.")
+    return criteria
 
 
 def check_exists(model, args):
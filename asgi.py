@@ -0,0 +1,7 @@
+"""Script to run app as an ASGI application, e.g. with `uvicorn asgi:app`."""
+
+from app import create_app
+from app.asgi import AsyncApp
+
+
+app = AsyncApp(create_app())
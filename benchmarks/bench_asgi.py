@@ -0,0 +1,179 @@
+"""
+Benchmark the read endpoints served by threads (WSGI) against the ASGI mode,
+under many concurrent connections and a simulated database round trip.
+
+Run with:
+    python -m benchmarks.bench_asgi
+    python -m benchmarks.bench_asgi --concurrency 10 100 500 --latency 0.02
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine.interfaces import AdaptedConnection
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app import create_app, db
+from app.asgi import AsyncApp
+from app.commands.db_manage_commands import generate
+
+
+ARTISTS = 1000
+ALBUMS_PER_ARTIST = 5
+PATHS = (
+    lambda i: "/api/artists",
+    lambda i: "/api/albums?sort=-release_year",
+    lambda i: f"/api/artists/{i % ARTISTS + 1}",
+    lambda i: f"/api/albums/{i % ARTISTS + 1}",
+    lambda i: f"/api/artists/{i % ARTISTS + 1}/albums",
+)
+
+
+def add_latency(engine, seconds):
+    """Sleeps once per statement inside SQLite, where the driver runs it, as a
+    stand-in for the round trip to a database server.
+    """
+
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        pending = connection_record.info["pending"] = [False]
+
+        def handler():
+            if pending[0]:
+                pending[0] = False
+                time.sleep(seconds)
+            return 0
+
+        if isinstance(dbapi_connection, AdaptedConnection):
+            dbapi_connection.run_async(
+                lambda conn: conn.set_progress_handler(handler, 1)
+            )
+        else:
+            dbapi_connection.set_progress_handler(handler, 1)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["pending"][0] = True
+
+
+async def asgi_get(asgi_app, path):
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_app(scope, receive, send)
+    return sent[0]["status"]
+
+
+async def run_clients(get, concurrency, requests):
+    """Runs `concurrency` clients each sending `requests` requests in turn."""
+    latencies = []
+
+    async def client(n):
+        for i in range(requests):
+            start = time.perf_counter()
+            status = await get(PATHS[(n + i) % len(PATHS)](n * requests + i))
+            latencies.append(time.perf_counter() - start)
+            assert status == 200, status
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+async def bench(app, args):
+    asgi_app = AsyncApp(app)
+    with app.app_context():
+        add_latency(db.engine, args.latency)
+        db.engine.dispose()
+    add_latency(asgi_app.engine.sync_engine, args.latency)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(args.threads)
+
+    def wsgi_get(path):
+        return app.test_client().get(path).status_code
+
+    async def threaded_get(path):
+        return await loop.run_in_executor(executor, wsgi_get, path)
+
+    async def async_get(path):
+        return await asgi_get(asgi_app, path)
+
+    print(
+        f"{args.threads} threads vs event loop with {args.pool_size} connections, "
+        f"{args.latency * 1000:.1f} ms per statement"
+    )
+    print(
+        f"{'clients':>8}{'wsgi rps':>11}{'p99':>10}{'asgi rps':>11}{'p99':>10}"
+        f"{'speedup':>9}"
+    )
+    for concurrency in args.concurrency:
+        threaded = await run_clients(threaded_get, concurrency, args.requests)
+        asynchronous = await run_clients(async_get, concurrency, args.requests)
+        print(
+            f"{concurrency:>8}{threaded['rps']:>11.0f}{threaded['p99_ms']:>7.0f} ms"
+            f"{asynchronous['rps']:>11.0f}{asynchronous['p99_ms']:>7.0f} ms"
+            f"{asynchronous['rps'] / threaded['rps']:>8.1f}x"
+        )
+    executor.shutdown()
+    await asgi_app.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    db_path = Path(tempfile.mkdtemp()) / "bench.db"
+    app = create_app(
+        "testing",
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}",
+        SQLALCHEMY_ENGINE_OPTIONS={"pool_size": args.threads, "max_overflow": 0},
+        ASYNC_ENGINE_OPTIONS={
+            "poolclass": AsyncAdaptedQueuePool,
+            "pool_size": args.pool_size,
+            "max_overflow": 0,
+        },
+        RESPONSE_CACHE_MAX_BYTES=0,
+        QUERY_DETECTOR_ENABLED=False,
+        METRICS_ENABLED=False,
+    )
+    with app.app_context():
+        db.create_all()
+    app.test_cli_runner().invoke(
+        generate,
+        ["--artists", str(ARTISTS), "--albums-per-artist", str(ALBUMS_PER_ARTIST)],
+    )
+    asyncio.run(bench(app, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark autocomplete lookups on a prefix index of generated artist names.
+
+Run with:
+    python -m benchmarks.bench_autocomplete
+"""
+
+import random
+import sys
+import time
+
+from app.autocomplete import PrefixIndex
+from app.commands.catalog_generator import CatalogGenerator
+
+
+NAMES = 1000000
+LOOKUPS = 100000
+LIMIT = 10
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def main():
+    generator = CatalogGenerator(seed=1, albums_per_artist=0)
+    names = [generator.artist(id)["name"] for id in range(1, NAMES + 1)]
+
+    index = PrefixIndex()
+    start = time.perf_counter()
+    index.build(enumerate(names, start=1))
+    build = time.perf_counter() - start
+    size = sys.getsizeof(index.entries) + sum(map(sys.getsizeof, index.entries))
+    print(
+        f"{len(index)} names, built in {build:.2f} s, {size / len(index):.0f} B/entry"
+    )
+
+    rng = random.Random(2)
+    prefixes = [rng.choice(names)[: rng.randint(1, 6)].lower() for _ in range(LOOKUPS)]
+    timings = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.search(prefix, LIMIT)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(
+        f"lookups: p50 {percentile(timings, 0.5) * 1e6:.1f} us, "
+        f"p99 {percentile(timings, 0.99) * 1e6:.1f} us, "
+        f"max {timings[-1] * 1e6:.1f} us"
+    )
+
+    start = time.perf_counter()
+    for id in range(NAMES + 1, NAMES + 1001):
+        index.add(id, names[id % NAMES])
+    print(f"inserts: {(time.perf_counter() - start) * 1e6 / 1000:.1f} us per name")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark bulk artist creation against the single-row endpoint.
+
+Run with:
+    python -m benchmarks.bench_bulk_create
+"""
+
+from pathlib import Path
+import tempfile
+import time
+
+from app import create_app, db
+
+
+ROWS = 1000
+
+
+def make_client():
+    db_path = Path(tempfile.mkdtemp()) / "bench.db"
+    app = create_app("testing", SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}")
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    credentials = {"username": "bench", "password": "Benchpass"}
+    client.post("/api/auth/register", json={**credentials, "email": "b@example.com"})
+    token = client.post("/api/auth/login", json=credentials).get_json()["token"]
+    return client, {"Authorization": f"Bearer {token}"}
+
+
+def artist(index):
+    return {"name": f"Artist {index}", "label": "Label", "birth_date": "10-08-1998"}
+
+
+def main():
+    client, headers = make_client()
+    start = time.perf_counter()
+    for index in range(ROWS):
+        client.post("/api/artists", json=artist(index), headers=headers)
+    single = time.perf_counter() - start
+
+    client, headers = make_client()
+    start = time.perf_counter()
+    client.post(
+        "/api/artists/bulk",
+        json=[artist(index) for index in range(ROWS)],
+        headers=headers,
+    )
+    bulk = time.perf_counter() - start
+
+    print(f"{'endpoint':<22}{'rows/s':>12}")
+    print(f"{'POST /api/artists':<22}{ROWS / single:>12.0f}")
+    print(f"{'POST /api/artists/bulk':<22}{ROWS / bulk:>12.0f}")
+    print(f"speedup: {single / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Benchmark the main endpoints through the Flask test client at several catalog
+sizes and compare the results against a stored JSON baseline.
+
+Run with:
+    python -m benchmarks.bench_endpoints --sizes 1000 100000 1000000
+    python -m benchmarks.bench_endpoints --save  # record a new baseline
+"""
+
+from itertools import count
+from pathlib import Path
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.commands.db_manage_commands import generate
+
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "endpoints.json"
+ALBUMS_PER_ARTIST = 10
+ALLOC_REQUESTS = 5
+
+ENDPOINTS = (
+    # name, method, path, body, authenticated, requests
+    ("get_artists", "GET", lambda i: "/api/artists", None, False, None),
+    ("get_albums", "GET", lambda i: "/api/albums", None, False, None),
+    (
+        "get_artist_detail",
+        "GET",
+        lambda i: f"/api/artists/{i % 100 + 1}",
+        None,
+        False,
+        None,
+    ),
+    (
+        "get_all_artist_albums",
+        "GET",
+        lambda i: f"/api/artists/{i % 100 + 1}/albums",
+        None,
+        False,
+        None,
+    ),
+    (
+        "login",
+        "POST",
+        lambda i: "/api/auth/login",
+        lambda i: {"username": "bench", "password": "Benchpass"},
+        False,
+        10,
+    ),
+    (
+        "create_artist",
+        "POST",
+        lambda i: "/api/artists",
+        lambda i: {"name": f"Bench {i}", "label": "Label", "birth_date": "10-08-1998"},
+        True,
+        None,
+    ),
+    (
+        "update_artist",
+        "PUT",
+        lambda i: f"/api/artists/{i % 100 + 1}",
+        lambda i: {"name": f"Bench {i}", "label": "Label", "birth_date": "10-08-1998"},
+        True,
+        None,
+    ),
+    (
+        "create_album",
+        "POST",
+        lambda i: f"/api/artist/{i % 100 + 1}/albums",
+        lambda i: {"title": f"Bench {i}", "number_of_songs": 10, "release_year": 2020},
+        True,
+        None,
+    ),
+    (
+        "delete_album",
+        "DELETE",
+        lambda i: f"/api/albums/{i + 1}",
+        None,
+        True,
+        None,
+    ),
+)
+
+
+def make_client(size, directory):
+    app = create_app(
+        "testing",
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{Path(directory) / f'bench_{size}.db'}",
+        RESPONSE_CACHE_MAX_BYTES=0,
+    )
+    with app.app_context():
+        db.create_all()
+    result = app.test_cli_runner().invoke(
+        generate,
+        [
+            "--artists",
+            str(max(size // ALBUMS_PER_ARTIST, 100)),
+            "--albums-per-artist",
+            str(ALBUMS_PER_ARTIST),
+            "--seed",
+            "0",
+        ],
+    )
+    if result.exit_code:
+        raise RuntimeError(result.output) from result.exception
+
+    client = app.test_client()
+    credentials = {"username": "bench", "password": "Benchpass"}
+    client.post("/api/auth/register", json={**credentials, "email": "b@example.com"})
+    token = client.post("/api/auth/login", json=credentials).get_json()["token"]
+    return app, client, {"Authorization": f"Bearer {token}"}
+
+
+def bench_endpoint(app, client, headers, endpoint, requests):
+    name, method, path, body, authenticated, endpoint_requests = endpoint
+    requests = endpoint_requests or requests
+    index = count()
+    statements = []
+
+    def call():
+        i = next(index)
+        response = client.open(
+            path(i),
+            method=method,
+            json=body(i) if body else None,
+            headers=headers if authenticated else None,
+        )
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name}: {response.status_code} {response.get_data()}")
+
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            call()
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    tracemalloc.start()
+    peaks = []
+    for _ in range(ALLOC_REQUESTS):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        call()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p99_ms": round(latencies[max(int(len(latencies) * 0.99) - 1, 0)], 3),
+        "queries": round(len(statements) / requests, 2),
+        "alloc_bytes": int(statistics.mean(peaks)),
+    }
+
+
+def find_regressions(results, baseline, threshold):
+    """Returns descriptions of metrics that got worse than the baseline allows."""
+    regressions = []
+    for size, endpoints in results.items():
+        for name, metrics in endpoints.items():
+            expected = baseline.get(size, {}).get(name)
+            if expected is None:
+                continue
+            if metrics["queries"] > expected["queries"]:
+                regressions.append(
+                    f"{name} @ {size}: queries {expected['queries']} -> "
+                    f"{metrics['queries']}"
+                )
+            for metric in ("mean_ms", "p50_ms", "alloc_bytes"):
+                if metrics[metric] > expected[metric] * (1 + threshold):
+                    regressions.append(
+                        f"{name} @ {size}: {metric} {expected[metric]} -> "
+                        f"{metrics[metric]}"
+                    )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--save", action="store_true", help="Store as new baseline.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            app, client, headers = make_client(size, directory)
+            results[str(size)] = {
+                endpoint[0]: bench_endpoint(
+                    app, client, headers, endpoint, args.requests
+                )
+                for endpoint in ENDPOINTS
+            }
+            with app.app_context():
+                db.engine.dispose()
+
+    print(
+        f"{'endpoint':<24}{'rows':>9}{'mean':>11}{'p50':>11}{'p99':>11}"
+        f"{'queries':>9}{'alloc':>11}"
+    )
+    for size, endpoints in results.items():
+        for name, metrics in endpoints.items():
+            print(
+                f"{name:<24}{size:>9}{metrics['mean_ms']:>8.2f} ms"
+                f"{metrics['p50_ms']:>8.2f} ms{metrics['p99_ms']:>8.2f} ms"
+                f"{metrics['queries']:>9}{metrics['alloc_bytes'] / 1024:>8.0f} KB"
+            )
+
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline = (
+            json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        )
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True))
+        print(f"Baseline saved to {args.baseline}.")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --save to create one.")
+        return 0
+    regressions = find_regressions(
+        results, json.loads(args.baseline.read_text()), args.threshold
+    )
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
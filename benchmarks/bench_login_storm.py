@@ -0,0 +1,102 @@
+"""
+Benchmark latency of a non-auth endpoint while a login storm is running,
+with password hashing inline and in a process pool.
+
+Run with:
+    python -m benchmarks.bench_login_storm
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Event, Thread
+import json
+import statistics
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app import create_app, db
+from app.passwords import password_hasher
+
+
+LOGIN_THREADS = 16
+PROBE_REQUESTS = 50
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def request(url, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(req) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def run(workers):
+    db_path = Path(tempfile.mkdtemp()) / "bench.db"
+    app = create_app(
+        "testing",
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}",
+        PASSWORD_HASH_WORKERS=workers,
+        PASSWORD_HASH_QUEUE_SIZE=64,
+        RESPONSE_CACHE_MAX_BYTES=0,
+    )
+    with app.app_context():
+        db.create_all()
+
+    server = make_server(
+        "127.0.0.1", 0, app, threaded=True, request_handler=QuietRequestHandler
+    )
+    Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/api"
+    credentials = {"username": "bench", "password": "Benchpass"}
+    request(f"{base_url}/auth/register", {**credentials, "email": "b@example.com"})
+
+    stop = Event()
+
+    def storm():
+        while not stop.is_set():
+            request(f"{base_url}/auth/login", credentials)
+
+    with ThreadPoolExecutor(LOGIN_THREADS) as executor:
+        for _ in range(LOGIN_THREADS):
+            executor.submit(storm)
+        time.sleep(0.5)
+        latencies = []
+        for _ in range(PROBE_REQUESTS):
+            start = time.perf_counter()
+            request(f"{base_url}/artists")
+            latencies.append((time.perf_counter() - start) * 1000)
+        stop.set()
+
+    server.shutdown()
+    password_hasher.configure()
+    latencies.sort()
+    return (
+        statistics.mean(latencies),
+        latencies[len(latencies) // 2],
+        latencies[int(len(latencies) * 0.99) - 1],
+    )
+
+
+def main():
+    print(f"{'hashing':<18}{'mean':>10}{'p50':>10}{'p99':>10}")
+    for label, workers in (("inline", 0), ("process pool (4)", 4)):
+        mean, p50, p99 = run(workers)
+        print(f"{label:<18}{mean:>7.1f} ms{p50:>7.1f} ms{p99:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark full-text search against a LIKE '%q%' scan over the same columns.
+
+Run with:
+    python -m benchmarks.bench_search
+"""
+
+from pathlib import Path
+import tempfile
+import timeit
+
+from sqlalchemy import func, or_, select
+
+from app import create_app, db
+from app.commands.db_manage_commands import generate
+from app.models import Artist, Album
+from app.search.search import search_catalog
+
+
+ARTISTS = 10000
+ALBUMS_PER_ARTIST = 10
+QUERIES = ("velvet", "storm light", "neon")
+LIMIT = 20
+
+
+def like_search(words, limit):
+    """Pages through matches the way a client-side LIKE search would."""
+    artist_criteria = [
+        or_(Artist.name.ilike(f"%{word}%"), Artist.label.ilike(f"%{word}%"))
+        for word in words
+    ]
+    album_criteria = [
+        or_(Album.title.ilike(f"%{word}%"), Album.description.ilike(f"%{word}%"))
+        for word in words
+    ]
+    artists = db.session.scalars(select(Artist).where(*artist_criteria).limit(limit))
+    albums = db.session.scalars(select(Album).where(*album_criteria).limit(limit))
+    artist_count = select(func.count()).select_from(Artist).where(*artist_criteria)
+    album_count = select(func.count()).select_from(Album).where(*album_criteria)
+    total = db.session.scalar(artist_count) + db.session.scalar(album_count)
+    return [*artists, *albums], total
+
+
+def bench(func, *args):
+    return min(timeit.repeat(lambda: func(*args), number=5, repeat=3)) / 5
+
+
+def main():
+    db_path = Path(tempfile.mkdtemp()) / "bench.db"
+    app = create_app("testing", SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}")
+    with app.app_context():
+        db.create_all()
+    app.test_cli_runner().invoke(
+        generate,
+        ["--artists", str(ARTISTS), "--albums-per-artist", str(ALBUMS_PER_ARTIST)],
+    )
+
+    with app.app_context():
+        albums = db.session.scalar(select(func.count()).select_from(Album))
+        print(f"{ARTISTS} artists, {albums} albums")
+        print(f"{'query':<16}{'hits':>8}{'fts':>12}{'like':>12}{'speedup':>10}")
+        for query in QUERIES:
+            words = query.split()
+            _, total = search_catalog(words, LIMIT)
+            fts = bench(search_catalog, words, LIMIT)
+            like = bench(like_search, words, LIMIT)
+            print(
+                f"{query:<16}{total:>8}{fts * 1000:>9.2f} ms{like * 1000:>9.2f} ms"
+                f"{like / fts:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
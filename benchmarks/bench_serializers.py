@@ -0,0 +1,69 @@
+"""
+Benchmark compiled serializers against plain marshmallow Schema.dump.
+
+Run with:
+    python -m benchmarks.bench_serializers
+"""
+
+from datetime import date
+import timeit
+
+from app.models import Artist, ArtistSchema, Album, AlbumSchema
+from app.serializers import get_serializer
+
+
+ROW_COUNTS = (10, 100, 1000)
+
+
+def make_artists(count):
+    """Builds transient artists with three albums each."""
+    artists = []
+    for index in range(count):
+        artist = Artist(
+            id=index,
+            name=f"Artist {index}",
+            label=f"Label {index % 17}",
+            birth_date=date(1970 + index % 30, 1 + index % 12, 1 + index % 28),
+        )
+        artist.albums = [
+            Album(
+                id=index * 3 + offset,
+                title=f"Album {index}-{offset}",
+                number_of_songs=10 + offset,
+                description="Lorem ipsum " * 8,
+                release_year=2000 + offset,
+            )
+            for offset in range(3)
+        ]
+        artists.append(artist)
+    return artists
+
+
+def bench(schema_class, items, number):
+    schema = schema_class(many=True)
+    serializer = get_serializer(schema_class, many=True)
+    assert serializer.dump(items) == schema.dump(items)
+    plain = timeit.timeit(lambda: schema.dump(items), number=number) / number
+    compiled = timeit.timeit(lambda: serializer.dump(items), number=number) / number
+    return plain, compiled
+
+
+def main():
+    print(
+        f"{'schema':<14}{'rows':>6}{'Schema.dump':>16}{'compiled':>14}{'speedup':>10}"
+    )
+    for count in ROW_COUNTS:
+        artists = make_artists(count)
+        albums = [album for artist in artists for album in artist.albums]
+        number = max(5, 5000 // count)
+        for schema_class, items in ((ArtistSchema, artists), (AlbumSchema, albums)):
+            plain, compiled = bench(schema_class, items[:count], number)
+            print(
+                f"{schema_class.__name__:<14}{count:>6}"
+                f"{plain * 1000:>13.3f} ms{compiled * 1000:>11.3f} ms"
+                f"{plain / compiled:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,11 @@ env_file = base_dir / ".env"
 load_dotenv()
 
 
+def env_flag(name):
+    """Reads a boolean environment variable; unset, 0 and false are off."""
+    return os.getenv(name, "").lower() in {"1", "true", "yes", "on"}
+
+
 class Config:
     DEBUG = os.getenv("FLASK_DEBUG")
     ENV = os.getenv("FLASK_ENV")
@@ -17,7 +22,41 @@ class Config:
     SQLALCHEMY_DATABASE_URI = ""
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     PER_PAGE = 5
+    PAGINATION_COUNT = "exact"
+    PAGINATION_COUNT_TTL = 60
+    BULK_MAX_ITEMS = 1000
+    EXPORT_BATCH_SIZE = 1000
     JWT_EXPIRED_MINUTES = 60
+    TOKEN_CACHE_SIZE = 10000
+    TOKEN_CACHE_TTL = 300
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_QUEUE_SIZE = 32
+    PASSWORD_HASH_METHOD = "scrypt:32768:8:1"
+    PASSWORD_SALT_LENGTH = 16
+    TABLE_VERSIONS_PATH = os.getenv("TABLE_VERSIONS_PATH")
+    RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH")
+    RESPONSE_CACHE_SHARED_MAX_BYTES = 256 * 1024 * 1024
+    # Applies only without TABLE_VERSIONS_PATH, see the README.
+    RESPONSE_CACHE_TTL = 5
+    INSTRUMENTATION_ENABLED = env_flag("INSTRUMENTATION_ENABLED")
+    INSTRUMENTATION_LOG = env_flag("INSTRUMENTATION_LOG")
+    QUERY_DETECTOR_ENABLED = None
+    QUERY_REPEAT_THRESHOLD = 3
+    ACCESS_PATTERN_LOG = os.getenv("ACCESS_PATTERN_LOG")
+    METRICS_ENABLED = True
+    METRICS_DIR = os.getenv("METRICS_DIR")
+    METRICS_FLUSH_INTERVAL = 5
+    AUTOCOMPLETE_MAX_LENGTH = 50
+    AUTOCOMPLETE_MAX_LIMIT = 50
+    AUTOCOMPLETE_WARMUP = True
+    READ_REPLICA_URIS = [
+        uri for uri in os.getenv("READ_REPLICA_URIS", "").split(",") if uri
+    ]
+    READ_REPLICA_STICKY_SECONDS = 5
+    READ_REPLICA_CHECK_INTERVAL = 10
+    ASYNC_DATABASE_URI = os.getenv("ASYNC_DATABASE_URI")
+    ASYNC_ENGINE_OPTIONS = {}
 
 
 class DevelopmentConfig(Config):
@@ -29,6 +68,8 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{DB_FILE_PATH}"
     DEBUG = True
     TESTING = True
+    PASSWORD_HASH_WORKERS = 0
+    AUTOCOMPLETE_WARMUP = False
 
 
 config = {
@@ -87,9 +87,17 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info("No changes in schema detected.")
 
+    # full-text search tables are created and synced by DDL, see app.models
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (
+            type_ == "table" and reflected and name.split("_")[0].endswith("Search")
+        )
+
     conf_args = current_app.extensions["migrate"].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
@@ -0,0 +1,73 @@
+"""total statistics
+
+Revision ID: 3e8d5b2c7f16
+Revises: 7c2f9a4e1b30
+Create Date: 2026-10-18 17:42:09.517364
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3e8d5b2c7f16"
+down_revision = "7c2f9a4e1b30"
+branch_labels = None
+depends_on = None
+
+
+def trigger_statements(dialect):
+    if dialect == "mysql":
+        upsert = (
+            "INSERT INTO TotalStats (id, albums, songs) "
+            "VALUES (1, {albums}, {songs}) "
+            "ON DUPLICATE KEY UPDATE albums = albums + VALUES(albums), "
+            "songs = songs + VALUES(songs);"
+        )
+        create = "CREATE TRIGGER Albums_totals_{action} {timing} ON Albums FOR EACH ROW"
+        update = "AFTER UPDATE"
+    else:
+        upsert = (
+            'INSERT INTO "TotalStats" (id, albums, songs) '
+            "VALUES (1, {albums}, {songs}) "
+            "ON CONFLICT (id) DO UPDATE SET albums = albums + excluded.albums, "
+            "songs = songs + excluded.songs;"
+        )
+        create = 'CREATE TRIGGER "Albums_totals_{action}" {timing} ON "Albums"'
+        update = "AFTER UPDATE OF number_of_songs"
+    new, old = "COALESCE(new.number_of_songs, 0)", "COALESCE(old.number_of_songs, 0)"
+    triggers = {
+        "insert": ("AFTER INSERT", 1, new),
+        "delete": ("AFTER DELETE", -1, f"-{old}"),
+        "update": (update, 0, f"{new} - {old}"),
+    }
+    return [
+        f"{create.format(action=action, timing=timing)} "
+        f"BEGIN {upsert.format(albums=albums, songs=songs)} END"
+        for action, (timing, albums, songs) in triggers.items()
+    ]
+
+
+def upgrade():
+    op.create_table(
+        "TotalStats",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("albums", sa.Integer(), nullable=False),
+        sa.Column("songs", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute(
+        "INSERT INTO TotalStats (id, albums, songs) "
+        "SELECT 1, COUNT(*), COALESCE(SUM(number_of_songs), 0) FROM Albums"
+    )
+    dialect = op.get_bind().dialect.name
+    if dialect in ("sqlite", "mysql"):
+        for statement in trigger_statements(dialect):
+            op.execute(statement)
+
+
+def downgrade():
+    for action in ("insert", "delete", "update"):
+        op.execute(f"DROP TRIGGER IF EXISTS Albums_totals_{action}")
+    op.drop_table("TotalStats")
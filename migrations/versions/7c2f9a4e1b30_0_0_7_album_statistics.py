@@ -0,0 +1,120 @@
+"""album statistics
+
+Revision ID: 7c2f9a4e1b30
+Revises: d41c7e3b8f65
+Create Date: 2026-10-18 09:31:27.184406
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7c2f9a4e1b30"
+down_revision = "d41c7e3b8f65"
+branch_labels = None
+depends_on = None
+
+
+def changes(dialect, row, sign):
+    if dialect == "mysql":
+        artist_stats, year_stats, albums = "ArtistStats", "YearStats", "Albums"
+        artist_upsert = year_upsert = (
+            "ON DUPLICATE KEY UPDATE albums = albums + VALUES(albums), "
+            "songs = songs + VALUES(songs)"
+        )
+        dual = " FROM DUAL"
+    else:
+        artist_stats, year_stats, albums = '"ArtistStats"', '"YearStats"', '"Albums"'
+        update = (
+            "DO UPDATE SET albums = albums + excluded.albums, "
+            "songs = songs + excluded.songs"
+        )
+        artist_upsert = f"ON CONFLICT (artist_id) {update}"
+        year_upsert = f"ON CONFLICT (release_year) {update}"
+        dual = ""
+    songs = f"{sign} * COALESCE({row}.number_of_songs, 0)"
+    artist = f"artist_id = {row}.artist_id"
+    year = f"release_year = {row}.release_year"
+    return [
+        f"INSERT INTO {artist_stats} (artist_id, albums, songs) "
+        f"VALUES ({row}.artist_id, {sign}, {songs}) {artist_upsert};",
+        f"UPDATE {artist_stats} SET "
+        f"first_release_year = (SELECT MIN(release_year) FROM {albums} "
+        f"WHERE {artist}), "
+        f"last_release_year = (SELECT MAX(release_year) FROM {albums} "
+        f"WHERE {artist}) WHERE {artist};",
+        f"DELETE FROM {artist_stats} WHERE {artist} AND albums = 0;",
+        f"INSERT INTO {year_stats} (release_year, albums, songs) "
+        f"SELECT {row}.release_year, {sign}, {songs}{dual} "
+        f"WHERE {row}.release_year IS NOT NULL {year_upsert};",
+        f"DELETE FROM {year_stats} WHERE {year} AND albums = 0;",
+    ]
+
+
+def trigger_statements(dialect):
+    triggers = {
+        "insert": ("AFTER INSERT", changes(dialect, "new", 1)),
+        "delete": ("AFTER DELETE", changes(dialect, "old", -1)),
+        "update": (
+            (
+                "AFTER UPDATE"
+                if dialect == "mysql"
+                else "AFTER UPDATE OF artist_id, number_of_songs, release_year"
+            ),
+            changes(dialect, "old", -1) + changes(dialect, "new", 1),
+        ),
+    }
+    if dialect == "mysql":
+        return [
+            f"CREATE TRIGGER Albums_stats_{action} {timing} ON Albums "
+            f"FOR EACH ROW BEGIN {' '.join(body)} END"
+            for action, (timing, body) in triggers.items()
+        ]
+    return [
+        f'CREATE TRIGGER "Albums_stats_{action}" {timing} ON "Albums" '
+        f"BEGIN {' '.join(body)} END"
+        for action, (timing, body) in triggers.items()
+    ]
+
+
+def upgrade():
+    op.create_table(
+        "ArtistStats",
+        sa.Column("artist_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("albums", sa.Integer(), nullable=False),
+        sa.Column("songs", sa.Integer(), nullable=False),
+        sa.Column("first_release_year", sa.Integer(), nullable=True),
+        sa.Column("last_release_year", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("artist_id"),
+    )
+    op.create_table(
+        "YearStats",
+        sa.Column("release_year", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("albums", sa.Integer(), nullable=False),
+        sa.Column("songs", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("release_year"),
+    )
+    op.execute(
+        "INSERT INTO ArtistStats "
+        "(artist_id, albums, songs, first_release_year, last_release_year) "
+        "SELECT artist_id, COUNT(*), COALESCE(SUM(number_of_songs), 0), "
+        "MIN(release_year), MAX(release_year) FROM Albums GROUP BY artist_id"
+    )
+    op.execute(
+        "INSERT INTO YearStats (release_year, albums, songs) "
+        "SELECT release_year, COUNT(*), COALESCE(SUM(number_of_songs), 0) "
+        "FROM Albums WHERE release_year IS NOT NULL GROUP BY release_year"
+    )
+    dialect = op.get_bind().dialect.name
+    if dialect in ("sqlite", "mysql"):
+        for statement in trigger_statements(dialect):
+            op.execute(statement)
+
+
+def downgrade():
+    for action in ("insert", "delete", "update"):
+        op.execute(f"DROP TRIGGER IF EXISTS Albums_stats_{action}")
+    op.drop_table("YearStats")
+    op.drop_table("ArtistStats")
@@ -0,0 +1,67 @@
+"""full text search
+
+Revision ID: d41c7e3b8f65
+Revises: 9b3e6f1d2a84
+Create Date: 2026-10-18 09:17:05.631822
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "d41c7e3b8f65"
+down_revision = "9b3e6f1d2a84"
+branch_labels = None
+depends_on = None
+
+
+SEARCH_COLUMNS = {"Artists": ("name", "label"), "Albums": ("title", "description")}
+
+
+def sqlite_statements(table, columns):
+    search = f"{table}Search"
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    delete = (
+        f'INSERT INTO "{search}"("{search}", rowid, {names}) '
+        f"VALUES ('delete', old.id, {old});"
+    )
+    insert = f'INSERT INTO "{search}"(rowid, {names}) VALUES (new.id, {new});'
+    return [
+        f'CREATE VIRTUAL TABLE "{search}" USING fts5({names}, '
+        f"content='{table}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        f'CREATE TRIGGER "{table}_search_insert" AFTER INSERT ON "{table}" '
+        f"BEGIN {insert} END",
+        f'CREATE TRIGGER "{table}_search_delete" AFTER DELETE ON "{table}" '
+        f"BEGIN {delete} END",
+        f'CREATE TRIGGER "{table}_search_update" AFTER UPDATE OF {names} '
+        f'ON "{table}" BEGIN {delete} {insert} END',
+        f'INSERT INTO "{search}"("{search}") VALUES (\'rebuild\')',
+    ]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table, columns in SEARCH_COLUMNS.items():
+        if dialect == "sqlite":
+            for statement in sqlite_statements(table, columns):
+                op.execute(statement)
+        elif dialect == "mysql":
+            op.execute(
+                f"ALTER TABLE {table} ADD FULLTEXT INDEX "
+                f"ix_{table}_fulltext ({', '.join(columns)})"
+            )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCH_COLUMNS:
+        if dialect == "sqlite":
+            for action in ("insert", "delete", "update"):
+                op.execute(f'DROP TRIGGER IF EXISTS "{table}_search_{action}"')
+            op.execute(f'DROP TABLE IF EXISTS "{table}Search"')
+        elif dialect == "mysql":
+            op.execute(f"ALTER TABLE {table} DROP INDEX ix_{table}_fulltext")
@@ -4,14 +4,16 @@ Config for Pytest.
 
 
 import pytest
+from sqlalchemy import event
 
 from app import create_app, db
+from app.utils import count_cache
 from app.commands.db_manage_commands import add_data
 
 
 @pytest.fixture
-def app():
-    app = create_app("testing")
+def app(tmp_path):
+    app = create_app("testing", TABLE_VERSIONS_PATH=tmp_path / "versions.db")
 
     with app.app_context():
         db.create_all()
@@ -19,6 +21,7 @@ def app():
     yield app
 
     app.config["DB_FILE_PATH"].unlink(missing_ok=True)
+    count_cache.clear()
 
 
 @pytest.fixture
@@ -27,6 +30,20 @@ def client(app):
         yield client
 
 
+@pytest.fixture
+def recorded_queries(app):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
 @pytest.fixture
 def user(client):
     user = {
@@ -2,6 +2,8 @@
 Tests for albums model.
 """
 
+import json
+
 import pytest
 
 
@@ -15,6 +17,7 @@ def test_get_albums(client, sample_data):
     assert res_data["number_of_records"]
     assert len(res_data["data"]) == 5
     assert res_data["pagination"] == {
+        "count_strategy": "exact",
         "total_pages": 4,
         "total_records": 18,
         "current_page": "/api/albums?page=1",
@@ -31,6 +34,7 @@ def test_get_albums_with_params(client, sample_data):
     assert res_data["number_of_records"] == 2
     assert len(res_data["data"]) == 2
     assert res_data["pagination"] == {
+        "count_strategy": "exact",
         "total_pages": 9,
         "total_records": 18,
         "current_page": "/api/albums?page=2&fields=title&sort=-id&limit=2",
@@ -162,4 +166,107 @@ def test_delete_artist(client, artist, token, sample_data):
                                })
     assert delete_res.status_code == 200
     get_res = client.get("api/albums/1")
-    assert get_res.status_code == 404
\ No newline at end of file
+    assert get_res.status_code == 404
+
+def test_get_albums_cursor_pagination_with_ties(client, sample_data):
+    res = client.get("/api/albums?fields=id&sort=release_year&limit=4&cursor=")
+    res_data = res.get_json()
+    ids = [item["id"] for item in res_data["data"]]
+    while "next_page" in res_data["pagination"]:
+        res_data = client.get(res_data["pagination"]["next_page"]).get_json()
+        ids.extend(item["id"] for item in res_data["data"])
+
+    offset_res = client.get("/api/albums?fields=id&sort=release_year,id&limit=20")
+    assert ids == [item["id"] for item in offset_res.get_json()["data"]]
+    assert len(ids) == 18
+
+
+def test_get_albums_fields_projection(client, sample_data, recorded_queries):
+    res = client.get("/api/albums?fields=title,unknown&sort=release_year")
+    res_data = res.get_json()
+    assert res.status_code == 200
+    assert all(list(item) == ["title"] for item in res_data["data"])
+
+    select = next(query for query in recorded_queries if "LIMIT" in query)
+    assert '"Albums".title' in select
+    assert '"Albums".release_year' in select
+    assert '"Albums".description' not in select
+    assert '"Albums".number_of_songs' not in select
+
+
+def test_get_albums_constant_number_of_queries(client, sample_data, recorded_queries):
+    client.get("/api/albums?limit=1")
+    single_page_queries = len(recorded_queries)
+    recorded_queries.clear()
+
+    res = client.get("/api/albums?limit=18")
+    assert len(res.get_json()["data"]) == 18
+    assert all("artist" in item for item in res.get_json()["data"])
+    assert len(recorded_queries) == single_page_queries == 2
+
+
+def test_get_single_album_single_query(client, sample_data, recorded_queries):
+    res = client.get("/api/albums/2")
+    assert res.get_json()["data"]["artist"]["name"] == "VNM"
+    assert len(recorded_queries) == 1
+
+
+def test_create_albums_bulk_partial(client, token, sample_data, album):
+    items = [
+        {**album, "artist_id": 1},
+        {**album, "artist_id": 100},
+        {**album, "number_of_songs": 0, "artist_id": 1},
+        {**album, "artist_id": 2},
+    ]
+    res = client.post("/api/albums/bulk?partial=true",
+                      json=items,
+                      headers={"Authorization": f"Bearer {token}"})
+    res_data = res.get_json()
+    assert res.status_code == 201
+    assert res_data["data"]["created"] == 2
+    assert res_data["data"]["errors"]["1"] == {"artist_id": ["Artist does not exist."]}
+    assert "2" in res_data["data"]["errors"]
+
+    res = client.get("/api/artists/1/albums")
+    assert res.get_json()["number_of_records"] == 3
+
+
+def test_create_albums_bulk_missing_artist(client, token, sample_data, album):
+    res = client.post("/api/albums/bulk",
+                      json=[album],
+                      headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 400
+    assert res.get_json()["message"] == {"0": {"artist_id": ["Artist does not exist."]}}
+
+
+def test_update_and_delete_albums_bulk(client, token, sample_data):
+    headers = {"Authorization": f"Bearer {token}"}
+    res = client.patch("/api/albums/bulk",
+                       json={"ids": [1, 2, 3], "data": {"number_of_songs": 20}},
+                       headers=headers)
+    assert res.get_json()["data"] == {"updated": 3}
+    res = client.get("/api/albums?number_of_songs=20")
+    assert res.get_json()["pagination"]["total_records"] == 3
+
+    res = client.delete("/api/albums/bulk",
+                        json={"filter": {"number_of_songs": 20}},
+                        headers=headers)
+    assert res.get_json()["data"] == {"deleted": 3}
+    res = client.get("/api/albums")
+    assert res.get_json()["pagination"]["total_records"] == 15
+
+
+def test_update_albums_bulk_unknown_artist(client, token, sample_data):
+    res = client.patch("/api/albums/bulk",
+                       json={"ids": [1], "data": {"artist_id": 100}},
+                       headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 404
+
+
+def test_export_albums_includes_artist_id(client, sample_data):
+    res = client.get("/api/albums/export?artist_id=1&fields=title,artist_id&sort=title")
+    rows = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert rows == [
+        {"title": "EDKT", "artist_id": 1},
+        {"title": "Propejn", "artist_id": 1},
+    ]
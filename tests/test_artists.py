@@ -2,7 +2,17 @@
 Tests for artist model.
 """
 
+from datetime import date
+import json
+import os
+import resource
+
 import pytest
+from sqlalchemy import insert, text
+
+from app import db
+from app.cache import table_versions
+from app.models import Artist
 
 
 def test_get_artists_no_records(client):
@@ -12,6 +22,7 @@ def test_get_artists_no_records(client):
             "data": [],
             "number_of_records": 0,
             "pagination": {
+                "count_strategy": "exact",
                 "total_pages": 0,
                 "total_records": 0,
                 "current_page": "/api/artists?page=1"
@@ -31,6 +42,7 @@ def test_get_artists(client, sample_data):
     assert res_data["number_of_records"] == 5
     assert len(res_data["data"]) == 5
     assert res_data["pagination"] == {
+        "count_strategy": "exact",
         "total_pages": 2,
         "total_records": 7,
         "current_page": "/api/artists?page=1",
@@ -47,6 +59,7 @@ def test_get_artists_with_params(client, sample_data):
     assert res_data["number_of_records"] == 2
     assert len(res_data["data"]) == 2
     assert res_data["pagination"] == {
+        "count_strategy": "exact",
         "total_pages": 4,
         "total_records": 7,
         "current_page": "/api/artists?page=2&fields=name&sort=-id&limit=2",
@@ -199,4 +212,300 @@ def test_delete_artist(client, artist, token, sample_data):
                                })
     assert delete_res.status_code == 200
     get_res = client.get("api/artists/1")
-    assert get_res.status_code == 404
\ No newline at end of file
+    assert get_res.status_code == 404
+
+def test_get_artists_cursor_pagination(client, sample_data):
+    res = client.get("api/artists?fields=name&sort=-name&limit=3&cursor=")
+    res_data = res.get_json()
+    assert res.status_code == 200
+    assert res_data["number_of_records"] == 3
+    assert "total_records" not in res_data["pagination"]
+    assert res_data["pagination"]["current_page"] == (
+        "/api/artists?cursor=&fields=name&sort=-name&limit=3"
+    )
+
+    names = [item["name"] for item in res_data["data"]]
+    while "next_page" in res_data["pagination"]:
+        res = client.get(res_data["pagination"]["next_page"])
+        res_data = res.get_json()
+        assert res.status_code == 200
+        names.extend(item["name"] for item in res_data["data"])
+
+    offset_res = client.get("api/artists?fields=name&sort=-name&limit=10")
+    expected = [item["name"] for item in offset_res.get_json()["data"]]
+    assert names == expected
+    assert len(names) == 7
+
+
+def test_get_artists_invalid_cursor(client, sample_data):
+    res = client.get("api/artists?cursor=not-a-cursor")
+    res_data = res.get_json()
+    assert res.status_code == 400
+    assert res_data["success"] is False
+    assert res_data["message"] == "Invalid cursor."
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_get_artists_cursor_invalid_limit(client, sample_data, limit):
+    res = client.get(f"api/artists?cursor=&limit={limit}")
+    res_data = res.get_json()
+    assert res.status_code == 400
+    assert res_data["success"] is False
+    assert res_data["message"] == "Limit must be a positive integer."
+
+
+def test_get_artists_cached_count_invalidated_on_write(client, token, artist, sample_data):
+    res = client.get("api/artists?count=cached")
+    pagination = res.get_json()["pagination"]
+    assert pagination["count_strategy"] == "cached"
+    assert pagination["total_records"] == 7
+
+    client.post("api/artists", json=artist, headers={"Authorization": f"Bearer {token}"})
+    res = client.get("api/artists?count=cached")
+    assert res.get_json()["pagination"]["total_records"] == 8
+
+
+@pytest.mark.parametrize(
+    "params, strategy, total_records",
+    [
+        ("count=estimated", "exact", 7),
+        ("count=estimated&name=VNM", "exact", 1),
+        ("count=none", "none", None),
+    ]
+)
+def test_get_artists_count_strategies(client, sample_data, params, strategy, total_records):
+    res = client.get(f"api/artists?{params}")
+    pagination = res.get_json()["pagination"]
+    assert res.status_code == 200
+    assert pagination["count_strategy"] == strategy
+    assert pagination.get("total_records") == total_records
+
+
+def test_get_artists_estimated_count_uses_statistics(app, client, sample_data):
+    with app.app_context():
+        db.session.execute(insert(Artist), [{"name": f"New {n}"} for n in range(3)])
+        db.session.execute(text("ANALYZE"))
+        db.session.execute(text("DELETE FROM Artists WHERE name LIKE 'New %'"))
+        db.session.commit()
+
+    res = client.get("api/artists?count=estimated")
+    pagination = res.get_json()["pagination"]
+    assert pagination["count_strategy"] == "estimated"
+    assert pagination["total_records"] == 10
+
+
+def test_get_artists_count_none_next_page(client, sample_data):
+    res = client.get("api/artists?count=none&limit=7")
+    pagination = res.get_json()["pagination"]
+    assert "total_pages" not in pagination
+    assert pagination["next_page"] == "/api/artists?page=2&count=none&limit=7"
+
+
+def test_get_artists_invalid_count(client):
+    res = client.get("api/artists?count=fast")
+    assert res.status_code == 400
+    assert res.get_json()["success"] is False
+
+
+def test_get_artists_constant_number_of_queries(client, sample_data, recorded_queries):
+    client.get("api/artists?limit=1")
+    single_page_queries = len(recorded_queries)
+    recorded_queries.clear()
+
+    res = client.get("api/artists?limit=7")
+    assert len(res.get_json()["data"]) == 7
+    assert len(recorded_queries) == single_page_queries == 3
+
+
+def test_get_artists_not_modified(client, sample_data, recorded_queries):
+    res = client.get("api/artists?sort=name")
+    etag = res.headers["ETag"]
+    recorded_queries.clear()
+
+    res = client.get("api/artists?sort=name", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.headers["ETag"] == etag
+    assert res.data == b""
+    assert recorded_queries == []
+
+    res = client.get("api/artists?sort=-name", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+
+
+def test_get_artist_etag_changes_after_write(client, token, sample_data):
+    etag = client.get("api/artists/1").headers["ETag"]
+    client.put("api/artists/1",
+               json={"name": "Flojd", "birth_date": "21-03-1990", "label": "DNB"},
+               headers={"Authorization": f"Bearer {token}"})
+    res = client.get("api/artists/1", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+
+def test_update_artist_if_match(client, token, sample_data):
+    updated_data = {"name": "Flojd", "birth_date": "21-03-1990", "label": "DNB"}
+    etag = client.get("api/artists/1").headers["ETag"]
+
+    res = client.put("api/artists/1",
+                     json=updated_data,
+                     headers={"Authorization": f"Bearer {token}", "If-Match": etag})
+    assert res.status_code == 200
+    new_etag = res.headers["ETag"]
+    assert new_etag != etag
+    assert client.get("api/artists/1").headers["ETag"] == new_etag
+
+    res = client.delete("api/artists/1",
+                        headers={"Authorization": f"Bearer {token}", "If-Match": etag})
+    res_data = res.get_json()
+    assert res.status_code == 412
+    assert res_data["success"] is False
+    assert client.get("api/artists/1").status_code == 200
+
+
+def test_detail_etags_without_shared_table_versions(client, token, sample_data):
+    table_versions.configure(None)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert "ETag" not in client.get("api/artists").headers
+    etag = client.get("api/artists/1").headers["ETag"]
+    assert client.get("api/artists/1", headers={"If-None-Match": etag}).status_code == 304
+
+    client.put("api/artists/2",
+               json={"name": "Other", "birth_date": "21-03-1990", "label": "DNB"},
+               headers=headers)
+    res = client.put("api/artists/1",
+                     json={"name": "Flojd", "birth_date": "21-03-1990", "label": "DNB"},
+                     headers={**headers, "If-Match": etag})
+    assert res.status_code == 200
+
+    res = client.delete("api/artists/1", headers={**headers, "If-Match": "x"})
+    assert res.status_code == 412
+
+
+def test_create_artists_bulk(client, token, artist, recorded_queries):
+    items = [{**artist, "name": f"Artist {index}"} for index in range(50)]
+    res = client.post("api/artists/bulk",
+                      json=items,
+                      headers={"Authorization": f"Bearer {token}"})
+    res_data = res.get_json()
+    assert res.status_code == 201
+    assert res_data["data"] == {"created": 50, "errors": {}}
+    assert sum("INSERT" in query for query in recorded_queries) == 1
+    assert client.get("api/artists").get_json()["pagination"]["total_records"] == 50
+
+
+def test_create_artists_bulk_invalid_item(client, token, artist):
+    res = client.post("api/artists/bulk",
+                      json=[artist, {"name": "No label"}],
+                      headers={"Authorization": f"Bearer {token}"})
+    res_data = res.get_json()
+    assert res.status_code == 400
+    assert "label" in res_data["message"]["1"]
+    assert client.get("api/artists").get_json()["pagination"]["total_records"] == 0
+
+
+def test_create_artists_bulk_partial(client, token, artist):
+    res = client.post("api/artists/bulk?partial=true",
+                      json=[artist, {"name": "No label"}, artist],
+                      headers={"Authorization": f"Bearer {token}"})
+    res_data = res.get_json()
+    assert res.status_code == 201
+    assert res_data["data"]["created"] == 2
+    assert list(res_data["data"]["errors"]) == ["1"]
+
+
+def test_create_artists_bulk_too_many_items(app, client, token, artist):
+    app.config["BULK_MAX_ITEMS"] = 2
+    res = client.post("api/artists/bulk",
+                      json=[artist] * 3,
+                      headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 400
+    assert res.get_json()["success"] is False
+
+
+def test_update_artists_bulk(client, token, sample_data, recorded_queries):
+    res = client.patch("api/artists/bulk",
+                       json={"filter": {"birth_date[lt]": "01-01-1986"},
+                             "data": {"label": "Legends"}},
+                       headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert res.get_json()["data"] == {"updated": 4}
+    assert sum("UPDATE" in query for query in recorded_queries) == 1
+
+    res = client.get("api/artists?label=Legends&fields=name&sort=name&limit=10")
+    names = [item["name"] for item in res.get_json()["data"]]
+    assert names == ["Ero", "PeeRZet", "Pyskaty", "VNM"]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"data": {"label": "X"}},
+        {"filter": {"unknown": "1"}, "data": {"label": "X"}},
+        {"ids": [1, 2]},
+        {"ids": [1], "data": {"name": "x" * 51}},
+    ]
+)
+def test_update_artists_bulk_invalid(client, token, sample_data, body):
+    res = client.patch("api/artists/bulk",
+                       json=body,
+                       headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 400
+    assert res.get_json()["success"] is False
+
+
+def test_delete_artists_bulk_removes_albums(client, token, sample_data):
+    res = client.delete("api/artists/bulk",
+                        json={"ids": [1, 3], "filter": {"label": "DNB"}},
+                        headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert res.get_json()["data"] == {"deleted": 1, "deleted_albums": 2}
+    assert client.get("api/artists/1").status_code == 404
+    assert client.get("api/artists/3").status_code == 200
+    assert client.get("api/albums").get_json()["pagination"]["total_records"] == 16
+
+
+def test_export_artists_ndjson(client, sample_data):
+    res = client.get("api/artists/export?sort=-id&label=DNB")
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert rows == [{"id": 1, "name": "VNM", "label": "DNB", "birth_date": "25-01-1984"}]
+
+
+def test_export_artists_csv(client, sample_data):
+    res = client.get("api/artists/export?fields=id,name&sort=id",
+                     headers={"Accept": "text/csv"})
+    assert res.status_code == 200
+    assert res.mimetype == "text/csv"
+    lines = res.get_data(as_text=True).splitlines()
+    assert lines[0] == "id,name"
+    assert lines[1] == "1,VNM"
+    assert len(lines) == 8
+
+
+@pytest.mark.skipif(
+    not os.getenv("RUN_SLOW_TESTS"), reason="set RUN_SLOW_TESTS=1 to export 1M rows"
+)
+def test_export_artists_memory_is_flat(app, client):
+    rows = 1_000_000
+    rss_budget = 64 * 1024 * 1024
+    with app.app_context():
+        for start in range(0, rows, 50_000):
+            db.session.execute(insert(Artist), [
+                {"name": f"Artist {index}", "label": "Label", "birth_date": date(1990, 1, 1)}
+                for index in range(start, start + 50_000)
+            ])
+        db.session.commit()
+
+    def current_rss():
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+
+    res = client.get("api/artists/export")
+    baseline = current_rss()
+    exported = peak = 0
+    for chunk in res.response:
+        exported += chunk.count(b"\n")
+        peak = max(peak, current_rss())
+    assert exported == rows
+    assert peak - baseline < rss_budget
@@ -0,0 +1,131 @@
+"""
+Tests for the ASGI serving mode.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from app.asgi import AsyncApp
+
+
+@pytest.fixture
+def asgi(app, sample_data):
+    asgi_app = AsyncApp(app)
+    loop = asyncio.new_event_loop()
+
+    def call(path, method="GET", headers=(), body=None):
+        path, _, query = path.partition("?")
+        payload = json.dumps(body).encode() if body is not None else b""
+        messages = [{"type": "http.request", "body": payload}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "query_string": query.encode(),
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in [("Content-Type", "application/json"), *headers]
+            ],
+        }
+        loop.run_until_complete(asgi_app(scope, receive, send))
+        start, *bodies = sent
+        assert all(body.get("more_body") for body in bodies[:-1])
+        assert not bodies[-1].get("more_body")
+        call.chunks = [body["body"] for body in bodies]
+        headers = {name.decode(): value.decode() for name, value in start["headers"]}
+        body = b"".join(call.chunks)
+        if headers.get("content-type") == "application/x-ndjson":
+            return start["status"], headers, body
+        data = json.loads(body) if body else None
+        return start["status"], headers, data
+
+    yield call
+    loop.run_until_complete(asgi_app.engine.dispose())
+    loop.close()
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/api/artists",
+        "/api/artists?sort=-name&limit=2&page=2",
+        "/api/artists?fields=name&birth_date[gte]=01-01-1990&count=cached",
+        "/api/albums?fields=title,artist&count=estimated",
+        "/api/albums?sort=-release_year&cursor=&limit=3",
+        "/api/albums?count=none&limit=4",
+        "/api/albums?count=bogus",
+        "/api/artists/1",
+        "/api/artists/999",
+        "/api/albums/1",
+        "/api/artists/1/albums",
+        "/api/artists/999/albums",
+    ],
+)
+def test_async_views_match_sync_views(client, asgi, url):
+    expected = client.get(url)
+
+    status, headers, data = asgi(url)
+
+    assert status == expected.status_code
+    assert data == expected.get_json()
+    assert headers.get("etag") == expected.headers.get("ETag")
+
+
+def test_async_cursor_pages_follow_next_links(asgi):
+    _, _, data = asgi("/api/albums?sort=title&cursor=&limit=3")
+    albums = data["data"]
+    while "next_page" in data["pagination"]:
+        _, _, data = asgi(data["pagination"]["next_page"])
+        albums += data["data"]
+
+    _, _, data = asgi("/api/albums")
+    titles = [album["title"] for album in albums]
+    assert titles == sorted(titles)
+    assert len({album["id"] for album in albums}) == data["pagination"]["total_records"]
+
+
+def test_async_views_honor_etags(asgi):
+    _, headers, _ = asgi("/api/artists")
+
+    status, _, data = asgi("/api/artists", headers=[("If-None-Match", headers["etag"])])
+
+    assert status == 304
+    assert data is None
+
+
+def test_other_endpoints_served_by_flask_app(asgi, artist):
+    user = {"username": "Async", "password": "Testpass", "email": "a@test.com"}
+    status, _, data = asgi("/api/auth/register", method="POST", body=user)
+    assert status == 201
+    headers = [("Authorization", f"Bearer {data['token']}")]
+
+    status, _, data = asgi("/api/artists", method="POST", headers=headers, body=artist)
+
+    assert status == 201
+    status, _, data = asgi(f"/api/artists/{data['data']['id']}")
+    assert status == 200
+    assert data["data"]["name"] == "Oki"
+
+
+def test_exports_are_streamed_in_chunks(app, client, asgi):
+    app.config["EXPORT_BATCH_SIZE"] = 2
+    expected = client.get("/api/albums/export").data
+
+    status, _, body = asgi("/api/albums/export")
+
+    assert status == 200
+    assert body == expected
+    rows = len(expected.splitlines())
+    assert len([chunk for chunk in asgi.chunks if chunk]) == (rows + 1) // 2
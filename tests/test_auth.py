@@ -2,7 +2,15 @@
 Tests for authentication.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import active_children
+
 import pytest
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User
+from app.passwords import PasswordHasher, password_hasher
 
 
 def test_registration(client):
@@ -93,3 +101,93 @@ def test_get_current_user_missing_token(client):
     assert res.headers["Content-Type"] == "application/json"
     assert res_data["success"] is False
     assert "data" not in res_data
+
+
+def test_token_verification_cached(client, user, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get("api/auth/me", headers=headers)
+    client.get("api/auth/me", headers=headers)
+    stats = client.get("api/cache/stats").get_json()["data"]["tokens"]
+    assert stats == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+
+def test_update_password_evicts_cached_tokens(client, user, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get("api/auth/me", headers=headers)
+    res = client.put("api/auth/update/password",
+                     json={"current_password": user["password"], "new_password": "Newpass123"},
+                     headers=headers)
+    assert res.status_code == 200
+    stats = client.get("api/cache/stats").get_json()["data"]["tokens"]
+    assert stats["entries"] == 0
+
+
+def test_login_rehashes_outdated_password(app, client, user):
+    with app.app_context():
+        db_user = User.query.filter(User.username == user["username"]).first()
+        db_user.password = generate_password_hash(user["password"], "pbkdf2:sha256:1000")
+        db.session.commit()
+
+    res = client.post("api/auth/login", json={
+        "username": user["username"],
+        "password": user["password"],
+    })
+    assert res.status_code == 200
+
+    with app.app_context():
+        db_user = User.query.filter(User.username == user["username"]).first()
+        assert db_user.password.startswith("scrypt:32768:8:1$")
+        assert not db_user.needs_rehash()
+
+
+def test_login_saturated_hash_pool(app, user):
+    with app.app_context():
+        db_user = User.query.filter(User.username == user["username"]).first()
+        db_user.password = generate_password_hash(
+            user["password"], "pbkdf2:sha256:2000000"
+        )
+        db.session.commit()
+
+    def login(_):
+        with app.test_client() as client:
+            return client.post("api/auth/login", json={
+                "username": user["username"],
+                "password": user["password"],
+            })
+
+    password_hasher.configure(workers=1, queue_size=0)
+    try:
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            responses = list(pool.map(login, range(3)))
+    finally:
+        password_hasher.configure()
+    rejected = [res for res in responses if res.status_code == 503]
+    assert 200 in {res.status_code for res in responses}
+    assert rejected
+    assert rejected[0].get_json()["success"] is False
+
+
+def test_password_hasher_process_pool():
+    hasher = PasswordHasher()
+    hasher.configure(workers=1, queue_size=1, method="pbkdf2:sha256:1000")
+    try:
+        pwhash = hasher.hash("Testpass")
+        assert pwhash.startswith("pbkdf2:sha256:1000$")
+        assert hasher.verify(pwhash, "Testpass")
+        assert not hasher.verify(pwhash, "Wrongpass")
+    finally:
+        hasher.configure()
+
+
+def test_password_hasher_replaces_broken_pool():
+    hasher = PasswordHasher()
+    hasher.configure(workers=1, queue_size=1, method="pbkdf2:sha256:1000")
+    try:
+        hasher.hash("Testpass")
+        for process in active_children():
+            process.terminate()
+            process.join()
+        pwhash = hasher.hash("Testpass")
+        assert hasher.verify(pwhash, "Testpass")
+    finally:
+        hasher.configure()
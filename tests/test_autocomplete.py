@@ -0,0 +1,77 @@
+"""
+Tests for name autocomplete.
+"""
+
+import pytest
+
+from app.autocomplete import PrefixIndex, autocomplete
+
+
+def test_prefix_index_search_is_case_insensitive_and_bounded():
+    index = PrefixIndex(max_length=8)
+    index.build([(1, "Taco Hemingway"), (2, "Taconafide"), (3, "Tede"), (4, "")])
+
+    assert index.search("TAC", 10) == [
+        {"id": 1, "name": "Taco Hem"},
+        {"id": 2, "name": "Taconafi"},
+    ]
+    assert index.search("tac", 1) == [{"id": 1, "name": "Taco Hem"}]
+    assert index.search("x", 10) == []
+    assert len(index) == 3
+
+    index.remove(1, "Taco Hemingway")
+    index.add(5, "tacos")
+    assert [match["id"] for match in index.search("taco", 10)] == [2, 5]
+
+    index.add(5, "tacos")
+    assert [match["id"] for match in index.search("taco", 10)] == [2, 5]
+
+
+def test_autocomplete_warms_up_before_first_request(app, client, sample_data):
+    app.config["AUTOCOMPLETE_WARMUP"] = True
+    autocomplete.init_app(app)
+
+    client.get("/api/artists/1")
+
+    assert set(autocomplete._indexes) == {"artist", "album"}
+
+
+def test_autocomplete_artists_and_albums(client, sample_data):
+    res = client.get("/api/autocomplete?prefix=t&limit=2")
+    assert res.status_code == 200
+    body = res.get_json()
+    assert body["success"] is True
+    assert body["number_of_records"] == len(body["data"]) <= 2
+    assert all(match["name"].lower().startswith("t") for match in body["data"])
+
+    res = client.get("/api/autocomplete?prefix=hipo&type=album")
+    assert [match["name"] for match in res.get_json()["data"]] == ["Hipocentrum"]
+
+
+def test_autocomplete_follows_writes(client, token, artist, sample_data):
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/autocomplete?prefix=oki").get_json()["data"] == []
+    index = autocomplete._indexes["artist"]
+
+    res = client.post("/api/artists", json=artist, headers=headers)
+    artist_id = res.get_json()["data"]["id"]
+    res = client.get("/api/autocomplete?prefix=oki")
+    assert res.get_json()["data"] == [{"id": artist_id, "name": "Oki"}]
+
+    client.put(
+        f"/api/artists/{artist_id}", json={**artist, "name": "Renamed"}, headers=headers
+    )
+    assert client.get("/api/autocomplete?prefix=oki").get_json()["data"] == []
+    res = client.get("/api/autocomplete?prefix=ren")
+    assert res.get_json()["data"] == [{"id": artist_id, "name": "Renamed"}]
+    assert autocomplete._indexes["artist"] is index
+
+    client.delete("/api/artists/bulk", json={"ids": [artist_id]}, headers=headers)
+    assert client.get("/api/autocomplete?prefix=ren").get_json()["data"] == []
+
+
+@pytest.mark.parametrize("query", ["", "prefix=", "prefix=a&type=label"])
+def test_autocomplete_rejects_invalid_queries(client, query):
+    res = client.get(f"/api/autocomplete?{query}")
+    assert res.status_code == 400
+    assert res.get_json()["success"] is False
@@ -0,0 +1,36 @@
+"""
+Tests for the benchmark regression check.
+"""
+
+from benchmarks.bench_endpoints import find_regressions
+
+
+def metrics(mean_ms=10.0, p50_ms=8.0, alloc_bytes=1000, queries=3):
+    return {
+        "mean_ms": mean_ms,
+        "p50_ms": p50_ms,
+        "p99_ms": 50.0,
+        "queries": queries,
+        "alloc_bytes": alloc_bytes,
+    }
+
+
+def test_find_regressions():
+    baseline = {"1000": {"get_artists": metrics(), "get_albums": metrics()}}
+    results = {
+        "1000": {
+            "get_artists": metrics(mean_ms=12.6, alloc_bytes=1200, queries=4),
+            "get_albums": metrics(mean_ms=12.4, p50_ms=9.9, alloc_bytes=1240),
+            "search": metrics(mean_ms=500.0, queries=40),
+        },
+        "100000": {"get_artists": metrics(mean_ms=500.0)},
+    }
+
+    assert find_regressions(results, baseline, 0.25) == [
+        "get_artists @ 1000: queries 3 -> 4",
+        "get_artists @ 1000: mean_ms 10.0 -> 12.6",
+    ]
+    assert find_regressions(results, baseline, 0.3) == [
+        "get_artists @ 1000: queries 3 -> 4",
+    ]
+    assert find_regressions(results, {}, 0.25) == []
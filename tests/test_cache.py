@@ -0,0 +1,117 @@
+"""
+Tests for caching helpers.
+"""
+
+import time
+
+import pytest
+
+from app import create_app
+from app.cache import TableVersions, ResponseCache, TokenCache
+
+
+def test_table_versions_shared_between_processes(tmp_path):
+    path = tmp_path / "versions.db"
+    first, second = TableVersions(), TableVersions()
+    first.configure(path)
+    second.configure(path)
+    assert first.epoch == second.epoch
+
+    first.bump("Artists")
+    first.bump("Artists", "Albums")
+    assert second.get("Artists", "Albums", "Users") == (2, 1, 0)
+
+
+def test_table_versions_in_memory():
+    versions = TableVersions()
+    versions.bump("Artists")
+    assert versions.get("Artists", "Albums") == (1, 0)
+
+
+def test_response_cache_evicts_by_bytes():
+    cache = ResponseCache()
+    cache.configure(max_bytes=10)
+    cache.set("a", b"12345", ["Artists"])
+    cache.set("b", b"12345", ["Albums"])
+    assert cache.get("a") == b"12345"
+    cache.set("c", b"123", ["Albums"])
+    assert cache.get("b") is None
+    assert cache.get("a") == b"12345"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 8
+
+
+def test_response_cache_ttl():
+    cache = ResponseCache()
+    cache.configure(max_bytes=10, ttl=0.05)
+    cache.set("a", b"12345", ["Artists"])
+    assert cache.get("a") == b"12345"
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_shared_response_cache_needs_shared_versions(tmp_path):
+    with pytest.raises(RuntimeError):
+        create_app("testing", RESPONSE_CACHE_PATH=tmp_path / "responses.db")
+
+
+def test_response_cache_shared_tier(tmp_path):
+    path = tmp_path / "responses.db"
+    first, second = ResponseCache(), ResponseCache()
+    first.configure(1024, path, 1024)
+    second.configure(1024, path, 1024)
+
+    first.set("key", b"body", ["Artists", "Albums"])
+    assert second.get("key") == b"body"
+    assert second.stats()["shared_hits"] == 1
+
+    first.invalidate("Albums")
+    second.clear()
+    assert second.get("key") is None
+    assert second.stats()["misses"] == 1
+    assert second.stats()["shared_entries"] == 0
+
+
+def test_cached_responses_and_invalidation(client, token, artist, sample_data, recorded_queries):
+    first = client.get("api/artists?sort=name")
+    recorded_queries.clear()
+    second = client.get("api/artists?sort=name")
+    assert second.get_json() == first.get_json()
+    assert recorded_queries == []
+
+    client.post("api/artists", json=artist, headers={"Authorization": f"Bearer {token}"})
+    res = client.get("api/artists?sort=name")
+    assert res.get_json()["pagination"]["total_records"] == 8
+
+    stats = client.get("api/cache/stats").get_json()["data"]["responses"]
+    assert stats["local_hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_token_cache_expires_with_token():
+    cache = TokenCache()
+    cache.configure(maxsize=2)
+    cache.set("expired", {"user_id": 1, "exp": time.time() - 1}, ttl=60)
+    cache.set("short", {"user_id": 1, "exp": time.time() + 0.05}, ttl=60)
+    assert cache.get("expired") is None
+    assert cache.get("short") == {"user_id": 1, "exp": pytest.approx(time.time(), abs=1)}
+    time.sleep(0.06)
+    assert cache.get("short") is None
+
+
+def test_token_cache_bounded_and_evicts_user():
+    cache = TokenCache()
+    cache.configure(maxsize=2)
+    exp = time.time() + 60
+    cache.set("a", {"user_id": 1, "exp": exp}, ttl=60)
+    cache.set("b", {"user_id": 2, "exp": exp}, ttl=60)
+    cache.set("c", {"user_id": 1, "exp": exp}, ttl=60)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 2
+
+    cache.evict_user(1)
+    assert cache.get("c") is None
+    assert cache.get("b")["user_id"] == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
@@ -0,0 +1,241 @@
+"""
+Tests for db manage commands.
+"""
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.commands.db_manage_commands import (
+    generate,
+    import_data,
+    index_advice,
+    iter_json_records,
+    rebuild_indexes,
+)
+from app.commands.perf_commands import run as perf_run
+from app.models import Artist, Album, ImportProgress
+from app.triggers import maintenance_triggers
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        '[{"a": 1}, {"a": "x]"},\n {"a": [3]}]',
+        '{"a": 1}\n{"a": "x]"}\n{"a": [3]}\n',
+        "[]",
+    ]
+)
+def test_iter_json_records(content):
+    records = list(iter_json_records(io.StringIO(content), chunk_size=3))
+    assert records == ([] if content == "[]" else [{"a": 1}, {"a": "x]"}, {"a": [3]}])
+
+
+def test_iter_json_records_fails_fast_on_malformed_record():
+    file = io.StringIO('{"a": 1}\n{"a": broken}\n' + '{"a": 2}\n' * 100000)
+
+    with pytest.raises(ValueError, match="Malformed record 1 at offset 9"):
+        list(iter_json_records(file, chunk_size=64))
+    assert file.tell() < 1000
+
+
+def test_import_artists_in_batches(app, tmp_path):
+    path = tmp_path / "artists.json"
+    artists = [
+        {"name": f"Artist {index}", "label": "Label", "birth_date": "10-08-1998"}
+        for index in range(7)
+    ]
+    artists[3]["birth_date"] = "not a date"
+    path.write_text(json.dumps(artists))
+
+    result = app.test_cli_runner().invoke(
+        import_data, [str(path), "--model", "artists", "--batch-size", "3"]
+    )
+    assert result.exit_code == 0
+    assert "Record 3 skipped" in result.output
+    assert "Imported 6 records, skipped 1" in result.output
+    with app.app_context():
+        assert Artist.query.count() == 6
+
+
+def test_import_resumes_after_last_committed_batch(app, sample_data, tmp_path):
+    path = tmp_path / "albums.ndjson"
+    albums = [
+        {"title": f"Album {index}", "number_of_songs": 10,
+         "release_year": 2020, "artist_id": 1}
+        for index in range(6)
+    ]
+    lines = [json.dumps(album) for album in albums]
+    path.write_text("\n".join(lines[:4] + ['{"title": broken'] + lines[5:]))
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(
+        import_data, [str(path), "--model", "albums", "--batch-size", "2"]
+    )
+    assert result.exit_code != 0
+    with app.app_context():
+        assert Album.query.count() == 18 + 4
+        assert ImportProgress.query.one().records == 4
+
+    path.write_text("\n".join(lines))
+    result = runner.invoke(
+        import_data, [str(path), "--model", "albums", "--batch-size", "2", "--resume"]
+    )
+    assert result.exit_code == 0
+    assert "Resumed after 4" in result.output
+    with app.app_context():
+        assert Album.query.count() == 18 + 6
+        assert ImportProgress.query.one().records == 6
+
+
+def test_export_import_round_trip(app, client, sample_data, tmp_path):
+    exports = {}
+    for model in ("artists", "albums"):
+        exports[model] = client.get(f"/api/{model}/export?sort=id").data
+        (tmp_path / f"{model}.ndjson").write_bytes(exports[model])
+    with app.app_context():
+        db.session.query(Album).delete()
+        db.session.query(Artist).delete()
+        db.session.commit()
+    runner = app.test_cli_runner()
+
+    for model in ("artists", "albums"):
+        path = str(tmp_path / f"{model}.ndjson")
+        result = runner.invoke(import_data, [path, "--model", model])
+        assert result.exit_code == 0
+        assert "skipped 0" in result.output
+        assert client.get(f"/api/{model}/export?sort=id").data == exports[model]
+
+    result = runner.invoke(
+        import_data, [str(tmp_path / "artists.ndjson"), "--model", "artists"]
+    )
+    assert "Record 0 skipped: {'id': ['Record with this id already exists.']}" in (
+        result.output
+    )
+
+
+def test_generate_is_deterministic(app):
+    runner = app.test_cli_runner()
+    args = ["--artists", "50", "--albums-per-artist", "4", "--seed", "7"]
+
+    catalogs = []
+    for _ in range(2):
+        result = runner.invoke(generate, args + ["--batch-size", "40"])
+        assert result.exit_code == 0
+        with app.app_context():
+            catalogs.append(
+                (
+                    [(a.name, a.label, a.birth_date) for a in Artist.query.all()],
+                    [(a.title, a.release_year, a.artist_id) for a in Album.query.all()],
+                )
+            )
+            db.session.query(Album).delete()
+            db.session.query(Artist).delete()
+            db.session.commit()
+
+    assert catalogs[0] == catalogs[1]
+    artists, albums = catalogs[0]
+    assert len(artists) == 50
+    assert 100 < len(albums) < 400
+    assert all(
+        release_year >= artists[artist_id - 1][2].year + 16
+        for _, release_year, artist_id in albums
+    )
+
+
+def test_generate_rebuilds_search_and_stats(app, client, sample_data):
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(
+        generate, ["--artists", "20", "--batch-size", "30", "--defer-triggers"]
+    )
+
+    assert result.exit_code == 0
+    with app.app_context():
+        triggers = db.session.scalar(
+            text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'")
+        )
+        albums = Album.query.order_by(Album.id.desc()).first()
+        count = Album.query.count()
+    assert triggers == len(maintenance_triggers("sqlite"))
+    word = albums.title.split()[0]
+    res = client.get(f"/api/search?q={word}&limit=50")
+    assert albums.id in {
+        hit["item"]["id"] for hit in res.get_json()["data"] if hit["type"] == "album"
+    }
+    assert client.get("/api/stats").get_json()["data"]["albums"] == count
+
+
+def test_rebuild_indexes_restores_triggers(app, sample_data):
+    with app.app_context():
+        db.session.execute(text('DROP TRIGGER "Albums_stats_insert"'))
+        db.session.commit()
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(generate, ["--artists", "5"])
+    assert result.exit_code != 0
+    assert "Maintenance triggers are missing: Albums_stats_insert." in result.output
+
+    result = runner.invoke(rebuild_indexes)
+
+    assert result.exit_code == 0
+    with app.app_context():
+        triggers = db.session.scalar(
+            text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'")
+        )
+    assert triggers == len(maintenance_triggers("sqlite"))
+
+
+def test_perf_run_replays_scenario(app, sample_data):
+    scenario = Path(__file__).parent.parent / "benchmarks/scenarios/default.json"
+
+    result = app.test_cli_runner().invoke(
+        perf_run,
+        [str(scenario), "--concurrency", "2", "--requests", "20", "--duration", "30"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith("20 requests in")
+    assert "0.0% errors" in result.output
+    assert "list artists" in result.output
+
+
+def test_perf_run_rejects_invalid_scenario(app, tmp_path):
+    path = tmp_path / "scenario.json"
+    path.write_text(json.dumps({"requests": [{"name": "list", "weight": 1}]}))
+
+    result = app.test_cli_runner().invoke(perf_run, [str(path)])
+
+    assert result.exit_code == 2
+    assert "missing path" in result.output
+
+
+def test_index_advice(app, tmp_path):
+    runner = app.test_cli_runner()
+    runner.invoke(generate, ["--artists", "30", "--albums-per-artist", "5"])
+    log = tmp_path / "access.log"
+    entries = [
+        {"table": "Albums", "filters": [["number_of_songs", "=="]], "sort": []},
+        {"table": "Albums", "filters": [["number_of_songs", "=="]], "sort": []},
+        {
+            "table": "Albums",
+            "filters": [["artist_id", "=="]],
+            "sort": [["release_year", "desc"]],
+        },
+        {"table": "Artists", "filters": [], "sort": [["name", "asc"]]},
+    ]
+    log.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+
+    result = runner.invoke(index_advice, [str(log)])
+
+    assert result.exit_code == 0, result.output
+    assert "Albums (number_of_songs ==) seen 2x" in result.output
+    assert "CREATE INDEX ix_Albums_number_of_songs ON Albums (number_of_songs);" in (
+        result.output
+    )
+    assert "artist_id" not in result.output
+    assert "Artists" not in result.output
@@ -0,0 +1,118 @@
+"""
+Tests for request instrumentation.
+"""
+
+import json
+import logging
+import shutil
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app, db
+from app.commands.db_manage_commands import add_data
+from app.instrumentation import instrumentation
+from config import env_flag
+
+
+@pytest.fixture
+def instrumented_app():
+    app = create_app(
+        "testing",
+        INSTRUMENTATION_ENABLED=True,
+        INSTRUMENTATION_LOG=True,
+        RESPONSE_CACHE_MAX_BYTES=0,
+    )
+    with app.app_context():
+        db.create_all()
+    app.test_cli_runner().invoke(add_data)
+
+    yield app
+
+    app.config["DB_FILE_PATH"].unlink(missing_ok=True)
+    instrumentation.configure()
+
+
+def parse_server_timing(header):
+    metrics = {}
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+def test_server_timing_header(instrumented_app, caplog):
+    client = instrumented_app.test_client()
+
+    with caplog.at_level(logging.INFO):
+        response = client.get("/api/albums?release_year[gte]=2000&sort=-title")
+
+    assert response.status_code == 200
+    metrics = parse_server_timing(response.headers["Server-Timing"])
+    assert {"query", "count", "serialize", "json", "sql", "total"} <= set(metrics)
+    assert metrics["sql"]["desc"] == '"2 statements"'
+    assert float(metrics["total"]["dur"]) >= float(metrics["sql"]["dur"])
+
+    line = json.loads(caplog.records[-1].getMessage())
+    assert line["endpoint"] == "albums.get_albums"
+    assert line["status"] == 200
+    assert line["statements"] == 2
+
+
+def test_server_timing_auth_and_args(instrumented_app, artist):
+    client = instrumented_app.test_client()
+    credentials = {"username": "Test", "password": "Testpass"}
+    client.post("/api/auth/register", json={**credentials, "email": "t@example.com"})
+    token = client.post("/api/auth/login", json=credentials).get_json()["token"]
+
+    response = client.post(
+        "/api/artists", json=artist, headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert response.status_code == 201
+    metrics = parse_server_timing(response.headers["Server-Timing"])
+    assert {"auth", "args"} <= set(metrics)
+
+
+def test_no_server_timing_when_disabled(client):
+    response = client.get("/api/albums")
+    assert "Server-Timing" not in response.headers
+
+
+def test_failed_statement_leaves_no_start_time(instrumented_app):
+    with instrumented_app.app_context():
+        with db.engine.connect() as conn:
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT * FROM missing_table"))
+            assert "query_start" not in conn.info
+            conn.execute(text("SELECT 1"))
+            assert "query_start" not in conn.info
+
+
+def test_server_timing_counts_replica_statements(tmp_path):
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+    app = create_app(
+        "testing",
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{primary}",
+        READ_REPLICA_URIS=[f"sqlite:///{replica}"],
+        INSTRUMENTATION_ENABLED=True,
+        RESPONSE_CACHE_MAX_BYTES=0,
+    )
+    with app.app_context():
+        db.create_all()
+    app.test_cli_runner().invoke(add_data)
+    shutil.copy(primary, replica)
+
+    response = app.test_client().get("/api/albums/1")
+
+    instrumentation.configure()
+    metrics = parse_server_timing(response.headers["Server-Timing"])
+    assert metrics["sql"]["desc"] == '"2 statements"'
+
+
+@pytest.mark.parametrize(
+    "value, enabled", [("1", True), ("true", True), ("0", False), ("false", False)]
+)
+def test_env_flag(monkeypatch, value, enabled):
+    monkeypatch.setenv("INSTRUMENTATION_ENABLED", value)
+    assert env_flag("INSTRUMENTATION_ENABLED") is enabled
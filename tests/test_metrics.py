@@ -0,0 +1,101 @@
+"""
+Tests for the Prometheus metrics endpoint.
+"""
+
+import json
+import os
+import re
+
+import pytest
+
+from app import create_app, db
+
+
+def get_sample(text, name, labels=""):
+    pattern = "^" + re.escape(f"{name}{{{labels}}}" if labels else name) + r" (\S+)$"
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def test_metrics_endpoint(client, sample_data):
+    client.get("/api/artists")
+    client.get("/api/artists")
+    client.get("/api/artists/999")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    labels = 'blueprint="artists",endpoint="artists.get_artists"'
+    detail_labels = 'blueprint="artists",endpoint="artists.get_artist_detail"'
+    requests = get_sample(
+        text, "http_requests_total", f'{labels},method="GET",status="200"'
+    )
+    not_found = get_sample(
+        text, "http_requests_total", f'{detail_labels},method="GET",status="404"'
+    )
+    assert requests == 2
+    assert not_found == 1
+    bucket_labels = f'{labels},le="+Inf"'
+    assert get_sample(text, "http_request_duration_seconds_count", labels) == 2
+    assert get_sample(text, "http_request_duration_seconds_bucket", bucket_labels) == 2
+    assert get_sample(text, "db_pool_checkouts_total") >= 3
+    assert get_sample(text, "db_pool_wait_seconds_count") >= 1
+    assert get_sample(text, "db_pool_size") == 5
+    assert "# TYPE response_cache_hits_total counter" in text
+
+
+@pytest.fixture
+def shared_app(tmp_path):
+    app = create_app("testing", METRICS_DIR=tmp_path)
+    with app.app_context():
+        db.create_all()
+    yield app
+    app.config["DB_FILE_PATH"].unlink(missing_ok=True)
+
+
+def write_snapshot(path, pid, started, requests, checked_out=0):
+    labels = 'blueprint="auth",endpoint="auth.login",method="POST",status="401"'
+    path.write_text(
+        json.dumps(
+            {
+                "pid": pid,
+                "started": started,
+                "counters": [["http_requests_total", labels, requests]],
+                "gauges": [["db_pool_checked_out", "", checked_out]],
+                "histograms": [],
+            }
+        )
+    )
+
+
+def test_metrics_aggregated_across_processes(shared_app, tmp_path):
+    labels = 'blueprint="auth",endpoint="auth.login",method="POST",status="401"'
+    write_snapshot(tmp_path / "999999999-a.json", 999999999, 1.0, 3, checked_out=4)
+    client = shared_app.test_client()
+    client.post("/api/auth/login", json={"username": "nobody", "password": "Secret1"})
+
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert get_sample(text, "http_requests_total", labels) == 4
+    assert get_sample(text, "db_pool_checked_out") == 0
+    assert len(list(tmp_path.glob(f"{os.getpid()}-*.json"))) == 1
+
+
+def test_metrics_retire_dead_and_reused_pids(shared_app, tmp_path):
+    labels = 'blueprint="auth",endpoint="auth.login",method="POST",status="401"'
+    write_snapshot(tmp_path / "999999999-a.json", 999999999, 1.0, 3)
+    write_snapshot(tmp_path / "999999999-b.json", 999999999, 2.0, 5)
+    write_snapshot(tmp_path / f"{os.getpid()}-old.json", os.getpid(), 1.0, 7)
+    client = shared_app.test_client()
+
+    for _ in range(2):
+        text = client.get("/metrics").get_data(as_text=True)
+        assert get_sample(text, "http_requests_total", labels) == 15
+
+    assert not list(tmp_path.glob("999999999-*.json"))
+    assert not (tmp_path / f"{os.getpid()}-old.json").exists()
+    retired = json.loads((tmp_path / "retired.json").read_text())
+    assert retired["counters"] == [["http_requests_total", labels, 15]]
+    assert retired["gauges"] == []
@@ -0,0 +1,68 @@
+"""
+Tests for query recording and query budgets.
+"""
+
+import logging
+
+import pytest
+
+from app import db
+from app.models import Album
+from app.queries import normalize, query_budget
+
+
+def test_normalize_collapses_literals_and_in_lists():
+    assert normalize(
+        "SELECT * FROM Albums\n WHERE id IN (?, ?, ?) AND title = 'x' LIMIT 5"
+    ) == normalize("SELECT * FROM Albums WHERE id IN (?) AND title = 'it''s' LIMIT 10")
+
+
+@pytest.mark.parametrize(
+    "url, limit",
+    [
+        ("/api/artists", 3),
+        ("/api/artists/1", 2),
+        ("/api/albums?fields=title,artist", 3),
+        ("/api/albums/1", 2),
+        ("/api/artists/1/albums", 2),
+    ],
+)
+def test_read_endpoints_query_budget(client, sample_data, url, limit):
+    with query_budget(limit, repeats=1):
+        response = client.get(url)
+    assert response.status_code == 200
+
+
+def test_query_budget_fails_when_exceeded(app, sample_data):
+    with pytest.raises(AssertionError, match="Repeated statements"):
+        with query_budget(100, repeats=1), app.app_context():
+            for album in Album.query.all():
+                album.artist.name
+
+    with pytest.raises(AssertionError, match="Query budget exceeded: 2 > 1"):
+        with query_budget(1), app.app_context():
+            db.session.get(Album, 1)
+            db.session.get(Album, 2)
+
+
+def test_query_budget_as_decorator(app, sample_data):
+    @query_budget(1)
+    def load_albums():
+        with app.app_context():
+            return Album.query.all()
+
+    assert len(load_albums()) > 1
+
+
+def test_repeated_queries_logged_in_debug_mode(app, sample_data, caplog):
+    @app.route("/albums-with-artists")
+    def albums_with_artists():
+        return {"albums": [repr(album) for album in Album.query.all()]}
+
+    with caplog.at_level(logging.WARNING):
+        response = app.test_client().get("/albums-with-artists")
+
+    assert response.status_code == 200
+    [record] = caplog.records
+    assert "[albums_with_artists]" in record.getMessage()
+    assert 'FROM "Artists"' in record.getMessage()
@@ -0,0 +1,103 @@
+"""
+Tests for read replica routing.
+"""
+
+import shutil
+
+import pytest
+
+from app import create_app, db
+from app.commands.db_manage_commands import add_data
+from app.replicas import read_replicas
+
+
+def make_app(tmp_path, replica_uri):
+    primary = tmp_path / "primary.db"
+    app = create_app(
+        "testing",
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{primary}",
+        READ_REPLICA_URIS=[replica_uri],
+        READ_REPLICA_STICKY_SECONDS=60,
+        TABLE_VERSIONS_PATH=tmp_path / "versions.db",
+    )
+    with app.app_context():
+        db.create_all()
+    app.test_cli_runner().invoke(add_data)
+    return app
+
+
+def register(client, username):
+    res = client.post(
+        "/api/auth/register",
+        json={
+            "username": username,
+            "password": "Testpass",
+            "email": f"{username}@x.pl",
+        },
+    )
+    return {"Authorization": f"Bearer {res.get_json()['token']}"}
+
+
+@pytest.fixture
+def replicated_app(tmp_path):
+    """Primary and replica start as copies; later writes only reach the primary."""
+    app = make_app(tmp_path, f"sqlite:///{tmp_path / 'replica.db'}")
+    shutil.copy(tmp_path / "primary.db", tmp_path / "replica.db")
+    return app
+
+
+def test_reads_go_to_replica_and_writers_read_their_writes(replicated_app):
+    client = replicated_app.test_client()
+    writer = register(client, "writer")
+    res = client.post(
+        "/api/artists",
+        json={"name": "Oki", "label": "2020", "birth_date": "10-08-1998"},
+        headers=writer,
+    )
+    url = f"/api/artists/{res.get_json()['data']['id']}"
+
+    res = client.get(url)
+    assert res.status_code == 404
+    assert res.headers.get("ETag") is None
+    assert client.get(url, headers=writer).status_code == 200
+    invalid = {"Authorization": "Bearer invalid"}
+    assert client.get("/api/albums/1", headers=invalid).status_code == 200
+
+    names = {
+        artist["name"] for artist in client.get("/api/artists?limit=50").json["data"]
+    }
+    assert "Oki" not in names
+    res = client.get("/api/artists?limit=50", headers=writer)
+    assert "Oki" in {artist["name"] for artist in res.get_json()["data"]}
+    assert res.headers.get("ETag") is not None
+
+
+def test_me_reads_own_registration(replicated_app):
+    client = replicated_app.test_client()
+    headers = register(client, "newcomer")
+
+    res = client.get("/api/auth/me", headers=headers)
+
+    assert res.status_code == 200
+    assert res.get_json()["data"]["username"] == "newcomer"
+
+
+def test_unreachable_replica_falls_back_to_primary(tmp_path):
+    app = make_app(tmp_path, f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+
+    res = app.test_client().get("/api/artists")
+
+    assert res.status_code == 200
+    assert res.get_json()["number_of_records"] > 0
+    assert res.headers.get("ETag") is not None
+
+
+def test_failing_replica_retried_on_primary(tmp_path):
+    app = make_app(tmp_path, f"sqlite:///{tmp_path / 'empty.db'}")
+    client = app.test_client()
+
+    res = client.get("/api/albums/1")
+
+    assert res.status_code == 200
+    assert read_replicas._healthy("replica_1") is False
+    assert client.get("/api/albums/1").status_code == 200
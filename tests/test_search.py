@@ -0,0 +1,55 @@
+"""
+Tests for full-text search.
+"""
+
+import pytest
+
+
+def test_search_ranks_artists_and_albums(client, sample_data):
+    res = client.get("/api/search?q=hipocentrum")
+    assert res.status_code == 200
+    body = res.get_json()
+    assert body["success"] is True
+    assert body["number_of_records"] == 3
+    assert [hit["type"] for hit in body["data"]] == ["album", "artist", "artist"]
+    assert body["data"][0]["item"]["title"] == "Hipocentrum"
+    assert body["data"][0]["item"]["artist"]["name"]
+    assert {hit["item"]["label"] for hit in body["data"][1:]} == {"Hipocentrum"}
+    assert body["data"][0]["score"] >= body["data"][1]["score"]
+    assert body["pagination"] == {
+        "count_strategy": "exact",
+        "total_pages": 1,
+        "total_records": 3,
+        "current_page": "/api/search?page=1&q=hipocentrum",
+    }
+
+
+def test_search_prefix_and_pagination(client, sample_data):
+    res = client.get("/api/search?q=odi&limit=1")
+    body = res.get_json()
+    assert body["number_of_records"] == 1
+    assert body["pagination"]["total_records"] == 2
+    assert body["pagination"]["next_page"] == "/api/search?page=2&q=odi&limit=1"
+
+
+def test_search_follows_writes(client, token, artist, sample_data):
+    headers = {"Authorization": f"Bearer {token}"}
+    res = client.post("/api/artists", json=artist, headers=headers)
+    artist_id = res.get_json()["data"]["id"]
+    assert client.get("/api/search?q=oki").get_json()["number_of_records"] == 1
+
+    client.put(
+        f"/api/artists/{artist_id}", json={**artist, "name": "Renamed"}, headers=headers
+    )
+    assert client.get("/api/search?q=oki").get_json()["number_of_records"] == 0
+    assert client.get("/api/search?q=renamed").get_json()["number_of_records"] == 1
+
+    client.delete("/api/artists/bulk", json={"ids": [artist_id]}, headers=headers)
+    assert client.get("/api/search?q=renamed").get_json()["number_of_records"] == 0
+
+
+@pytest.mark.parametrize("query", ["", "q=", "q=%22*()"])
+def test_search_requires_words(client, query):
+    res = client.get(f"/api/search?{query}")
+    assert res.status_code == 400
+    assert res.get_json()["success"] is False
@@ -0,0 +1,32 @@
+"""
+Tests for compiled serializers.
+"""
+
+import pytest
+
+from app.models import Artist, ArtistSchema, Album, AlbumSchema
+from app.serializers import get_serializer
+
+
+@pytest.mark.parametrize(
+    "schema_class, model, schema_args",
+    [
+        (ArtistSchema, Artist, {"many": True}),
+        (ArtistSchema, Artist, {"many": True, "only": ["name", "birth_date"]}),
+        (AlbumSchema, Album, {"many": True}),
+        (AlbumSchema, Album, {"many": True, "exclude": ["artist"]}),
+        (AlbumSchema, Album, {"many": True, "only": ["title", "id"]}),
+    ]
+)
+def test_compiled_dump_matches_schema_dump(app, sample_data, schema_class, model, schema_args):
+    with app.app_context():
+        items = model.query.all()
+        expected = schema_class(**schema_args).dump(items)
+        assert get_serializer(schema_class, **schema_args).dump(items) == expected
+
+
+def test_get_serializer_is_cached_by_normalized_fields():
+    first = get_serializer(ArtistSchema, only=["name", "id"], many=True)
+    second = get_serializer(ArtistSchema, only=["id", "name", "id"], many=True)
+    assert first is second
+    assert get_serializer(ArtistSchema, many=True) is not first
@@ -0,0 +1,146 @@
+"""
+Tests for artist and release year statistics.
+"""
+
+from sqlalchemy import func, select, update
+
+from app import db
+from app.commands.db_manage_commands import rebuild_stats
+from app.models import Album, YearStats
+
+
+def expected_stats(app):
+    """Aggregates the albums directly, the way the summary tables should."""
+    with app.app_context():
+        artists = {
+            row.artist_id: {
+                "artist_id": row.artist_id,
+                "albums": row.albums,
+                "songs": row.songs,
+                "first_release_year": row.first,
+                "last_release_year": row.last,
+            }
+            for row in db.session.execute(
+                select(
+                    Album.artist_id,
+                    func.count().label("albums"),
+                    func.sum(Album.number_of_songs).label("songs"),
+                    func.min(Album.release_year).label("first"),
+                    func.max(Album.release_year).label("last"),
+                ).group_by(Album.artist_id)
+            )
+        }
+        years = [
+            {"release_year": row.release_year, "albums": row.albums, "songs": row.songs}
+            for row in db.session.execute(
+                select(
+                    Album.release_year,
+                    func.count().label("albums"),
+                    func.sum(Album.number_of_songs).label("songs"),
+                )
+                .where(Album.release_year.is_not(None))
+                .group_by(Album.release_year)
+                .order_by(Album.release_year)
+            )
+        ]
+        totals = db.session.execute(
+            select(func.count(), func.coalesce(func.sum(Album.number_of_songs), 0))
+        ).one()
+    return artists, years, totals
+
+
+def assert_stats_match(app, client, artist_ids):
+    artists, years, (albums, songs) = expected_stats(app)
+    for artist_id in artist_ids:
+        res = client.get(f"/api/artists/{artist_id}/stats")
+        assert res.status_code == 200
+        assert res.get_json()["data"] == artists.get(
+            artist_id,
+            {
+                "artist_id": artist_id,
+                "albums": 0,
+                "songs": 0,
+                "first_release_year": None,
+                "last_release_year": None,
+            },
+        )
+    data = client.get("/api/stats").get_json()["data"]
+    assert data["years"] == years
+    assert data["albums"] == albums
+    assert data["songs"] == songs
+
+
+def test_stats(client, app, sample_data):
+    res = client.get("/api/artists/6/stats")
+    assert res.status_code == 200
+    assert res.get_json()["data"]["albums"] == 6
+    assert_stats_match(app, client, range(1, 8))
+
+
+def test_stats_of_unknown_artist(client):
+    res = client.get("/api/artists/999/stats")
+    assert res.status_code == 404
+    assert res.get_json()["message"] == "Artist with id 999 not found."
+
+
+def test_stats_follow_album_writes(client, app, token, sample_data, album):
+    headers = {"Authorization": f"Bearer {token}"}
+    res = client.post(
+        "/api/artist/1/albums", json={**album, "release_year": 1990}, headers=headers
+    )
+    assert res.status_code == 201
+    assert_stats_match(app, client, [1])
+
+    res = client.put(
+        "/api/albums/1", json={**album, "release_year": 2030}, headers=headers
+    )
+    assert res.status_code == 200
+    assert client.delete("/api/albums/2", headers=headers).status_code == 200
+    assert_stats_match(app, client, [1, 2])
+
+    res = client.post(
+        "/api/albums/bulk", json=[{**album, "artist_id": 3}] * 3, headers=headers
+    )
+    assert res.get_json()["data"]["created"] == 3
+    res = client.patch(
+        "/api/albums/bulk",
+        json={"ids": [3, 4, 5], "data": {"artist_id": 7}},
+        headers=headers,
+    )
+    assert res.get_json()["data"] == {"updated": 3}
+    res = client.delete("/api/albums/bulk", json={"ids": [6, 7]}, headers=headers)
+    assert res.get_json()["data"] == {"deleted": 2}
+    assert_stats_match(app, client, range(1, 8))
+
+    res = client.delete("/api/artists/bulk", json={"ids": [6]}, headers=headers)
+    assert res.get_json()["data"]["deleted_albums"] > 0
+    assert client.delete("/api/artists/5", headers=headers).status_code == 200
+    assert_stats_match(app, client, range(1, 5))
+
+
+def test_stats_count_albums_without_release_year(client, app, sample_data):
+    with app.app_context():
+        db.session.add(Album(title="Demo", number_of_songs=4, artist_id=1))
+        db.session.commit()
+        db.session.execute(update(Album).where(Album.id == 1).values(release_year=None))
+        db.session.commit()
+
+    data = client.get("/api/stats").get_json()["data"]
+    assert data["albums"] == sum(year["albums"] for year in data["years"]) + 2
+    assert_stats_match(app, client, [1])
+
+    result = app.test_cli_runner().invoke(rebuild_stats)
+    assert result.exit_code == 0
+    assert_stats_match(app, client, [1])
+
+
+def test_rebuild_stats(client, app, sample_data):
+    with app.app_context():
+        db.session.execute(update(YearStats).values(albums=0))
+        db.session.execute(update(Album).values(number_of_songs=10))
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(rebuild_stats)
+
+    assert "Rebuilt statistics of 7 artists" in result.output
+    assert_stats_match(app, client, range(1, 8))
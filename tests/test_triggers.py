@@ -0,0 +1,45 @@
+"""
+Tests for the trigger DDL shared by db.create_all() and the migrations.
+"""
+
+from pathlib import Path
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+
+from app import db
+from app.triggers import SEARCH_COLUMNS, maintenance_triggers
+
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+BASE_REVISION = "9b3e6f1d2a84"
+
+
+def schema_objects(connection):
+    return dict(
+        connection.execute(
+            text(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                "OR (type = 'table' AND sql LIKE 'CREATE VIRTUAL TABLE%')"
+            )
+        ).all()
+    )
+
+
+def test_create_all_triggers_match_migrations(app):
+    script = ScriptDirectory(str(MIGRATIONS))
+    revisions = list(script.iterate_revisions("heads", BASE_REVISION))
+    with app.app_context(), db.engine.begin() as connection:
+        created = schema_objects(connection)
+        with Operations.context(MigrationContext.configure(connection)):
+            for revision in revisions:
+                revision.module.downgrade()
+            assert schema_objects(connection) == {}
+            for revision in reversed(revisions):
+                revision.module.upgrade()
+        migrated = schema_objects(connection)
+
+    assert len(created) == len(maintenance_triggers("sqlite")) + len(SEARCH_COLUMNS)
+    assert migrated == created